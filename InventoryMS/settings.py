@@ -1,20 +1,35 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def env_flag(name, default=False):
+    return os.environ.get(name, str(int(default))).lower() in (
+        '1', 'true', 'yes', 'on'
+    )
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-g_n2+2bznu6e@1wel!i(&-4tp86_7lop5395ww+i4x%9*7^old'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-g_n2+2bznu6e@1wel!i(&-4tp86_7lop5395ww+i4x%9*7^old',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_flag('DJANGO_DEBUG', True)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host
+]
 
 
 # Application definition
@@ -40,10 +55,14 @@ INSTALLED_APPS = [
     'transactions.apps.TransactionsConfig',
     'invoice.apps.InvoiceConfig',
     'bills.apps.BillsConfig',
+    'monitoring.apps.MonitoringConfig',
+    'reports.apps.ReportsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # First after the static files, so that it times everything below it.
+    'monitoring.middleware.ViewMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,17 +73,28 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'InventoryMS.urls'
 
+# Templates are compiled once per process by the cached loader. The
+# development server's autoreloader empties it when a template changes,
+# so edits still show up without a restart.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'store.fragments.fragments',
+            ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
             ],
         },
     },
@@ -77,12 +107,155 @@ WSGI_APPLICATION = 'InventoryMS.wsgi.application'
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+#
+# The database is chosen with DATABASE_ENGINE ('sqlite' or 'postgresql').
+#
+# PostgreSQL reads DATABASE_NAME, DATABASE_USER, DATABASE_PASSWORD,
+# DATABASE_HOST and DATABASE_PORT. Connections are either pooled with
+# psycopg's pool (DATABASE_POOL=1, sized by DATABASE_POOL_MIN_SIZE and
+# DATABASE_POOL_MAX_SIZE) or kept open between requests for
+# DATABASE_CONN_MAX_AGE seconds and health-checked before reuse.
+#
+# SQLite (the default, at SQLITE_PATH) runs in WAL mode so that readers do
+# not block the writer, waits up to SQLITE_BUSY_TIMEOUT milliseconds for a
+# lock instead of failing with "database is locked", and starts write
+# transactions with BEGIN IMMEDIATE so they queue for the lock up front
+# rather than deadlocking when a read turns into a write.
+
+
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    # Registers the index operator classes used by the search migrations.
+    INSTALLED_APPS.append('django.contrib.postgres')
+    DATABASE_POOL = env_flag('DATABASE_POOL')
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'inventoryms'),
+            'USER': os.environ.get('DATABASE_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            # Pooled connections go back to the pool after each request,
+            # so Django must not also keep them open itself.
+            'CONN_MAX_AGE': (
+                0 if DATABASE_POOL
+                else int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+            ),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if DATABASE_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        }
+elif DATABASE_ENGINE == 'sqlite':
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get(
+                'SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+            ),
+            'OPTIONS': {
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT};'
+                    'PRAGMA synchronous=NORMAL;'
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
+else:
+    raise ImproperlyConfigured(
+        f"Unsupported DATABASE_ENGINE {DATABASE_ENGINE!r}; "
+        f"use 'sqlite' or 'postgresql'."
+    )
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+#
+# Autocomplete results and template fragments live in process memory by
+# default. Point AUTOCOMPLETE_CACHE_URL and TEMPLATE_FRAGMENT_CACHE_URL at
+# a shared cache when running several worker processes, so that
+# invalidations reach all of them:
+#   file:///var/tmp/inventoryms-autocomplete
+#   redis://localhost:6379/1  (use maxmemory-policy allkeys-lru)
+
+
+def url_cache(url, location, timeout, max_entries):
+    """
+    Returns the settings of the cache at ``url``, or of a local-memory
+    cache named ``location`` when ``url`` is empty.
+    """
+    if url.startswith('file://'):
+        cache = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': url[len('file://'):],
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    elif url.startswith(('redis://', 'rediss://')):
+        cache = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+        }
+    else:
+        cache = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': location,
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    cache['TIMEOUT'] = timeout
+    return cache
+
+
+AUTOCOMPLETE_CACHE_URL = os.environ.get('AUTOCOMPLETE_CACHE_URL', '')
+AUTOCOMPLETE_CACHE_TIMEOUT = int(
+    os.environ.get('AUTOCOMPLETE_CACHE_TIMEOUT', 300)
+)
+AUTOCOMPLETE_CACHE_MAX_ENTRIES = int(
+    os.environ.get('AUTOCOMPLETE_CACHE_MAX_ENTRIES', 5000)
+)
+
+# Rendered sidebars and dashboard widgets (see store/fragments.py), kept
+# until the data they show changes or for TEMPLATE_FRAGMENT_TIMEOUT
+# seconds.
+TEMPLATE_FRAGMENT_CACHE_URL = os.environ.get(
+    'TEMPLATE_FRAGMENT_CACHE_URL', ''
+)
+TEMPLATE_FRAGMENT_TIMEOUT = int(
+    os.environ.get('TEMPLATE_FRAGMENT_TIMEOUT', 600)
+)
+TEMPLATE_FRAGMENT_MAX_ENTRIES = int(
+    os.environ.get('TEMPLATE_FRAGMENT_MAX_ENTRIES', 2000)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'autocomplete': url_cache(
+        AUTOCOMPLETE_CACHE_URL, 'autocomplete',
+        AUTOCOMPLETE_CACHE_TIMEOUT, AUTOCOMPLETE_CACHE_MAX_ENTRIES,
+    ),
+    'template_fragments': url_cache(
+        TEMPLATE_FRAGMENT_CACHE_URL, 'template-fragments',
+        TEMPLATE_FRAGMENT_TIMEOUT, TEMPLATE_FRAGMENT_MAX_ENTRIES,
+    ),
 }
+AUTOCOMPLETE_CACHE_ALIAS = 'autocomplete'
+
+# Per-view request statistics (see monitoring/stats.py): the number of
+# recent requests each process keeps, and the bearer token Prometheus
+# scrapes /monitoring/metrics/ with (superusers can read it when unset).
+MONITORING_BUFFER_SIZE = int(os.environ.get('MONITORING_BUFFER_SIZE', 10000))
+MONITORING_TOKEN = os.environ.get('MONITORING_TOKEN', '')
 
 
 # Password validation
@@ -125,9 +298,48 @@ LOGOUT_URL = 'logout'
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR,'static')
 ]
-MEDIA_ROOT = os.path.join(BASE_DIR, 'static/images')
+STATIC_ROOT = os.environ.get(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles')
+)
+
+# Outside DEBUG, WhiteNoise (from requirements-production.txt) serves the
+# files gathered by collectstatic straight from the WSGI process. They are
+# stored under content-hashed names with gzip and brotli copies made at
+# collectstatic time, so each is served precompressed and cached by
+# browsers for a year.
+if find_spec('whitenoise') is not None:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'whitenoise.middleware.WhiteNoiseMiddleware',
+    )
+    if not DEBUG:
+        STORAGES = {
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            },
+            'staticfiles': {
+                'BACKEND': (
+                    'whitenoise.storage.CompressedManifestStaticFilesStorage'
+                ),
+            },
+        }
+# Uploads; the Docker image keeps them on its data volume. Outside DEBUG
+# they are served by the web server in front of Gunicorn (see
+# deploy/nginx.conf), not by Django.
+MEDIA_ROOT = os.environ.get(
+    'MEDIA_ROOT', os.path.join(BASE_DIR, 'static/images')
+)
 MEDIA_URL = '/images/'
 
+# Profile pictures are resized on a worker thread rather than in the
+# upload request, and their resized copies are named after the upload and
+# the size so that browsers can cache them for good (see accounts/images.py).
+IMAGEKIT_DEFAULT_CACHEFILE_BACKEND = 'accounts.images.ThreadPool'
+IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY = 'accounts.images.Background'
+IMAGEKIT_SPEC_CACHEFILE_NAMER = (
+    'imagekit.cachefiles.namers.source_name_dot_hash'
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from accounts.views import media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -8,5 +11,15 @@ urlpatterns = [
     path('transactions/', include('transactions.urls')),
     path('accounts/', include('accounts.urls')),
     path('invoice/', include('invoice.urls')),
-    path('bills/', include('bills.urls'))
+    path('bills/', include('bills.urls')),
+    path('monitoring/', include('monitoring.urls')),
+    path('reports/', include('reports.urls')),
 ]
+
+# Uploads are only served by Django in development; in production the web
+# server serves MEDIA_ROOT (see "Production Serving" in the README).
+if settings.DEBUG:
+    urlpatterns.append(re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', media,
+        name='media',
+    ))
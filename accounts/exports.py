@@ -0,0 +1,21 @@
+from store.exports import StreamingExport
+from .models import Profile
+
+
+class ProfileExport(StreamingExport):
+    model = Profile
+    filename = 'profiles'
+    sheet_title = 'Profiles'
+    select_related = ('user',)
+    filters = {'status': 'status', 'role': 'role'}
+    ordering = ('slug',)
+    columns = (
+        ('Account ID', 'slug'),
+        ('Username', 'user.username'),
+        ('First Name', 'first_name'),
+        ('Last Name', 'last_name'),
+        ('Email', 'email'),
+        ('Telephone', lambda p: str(p.telephone or '')),
+        ('Status', lambda p: p.get_status_display()),
+        ('Role', lambda p: p.get_role_display() or ''),
+    )
@@ -0,0 +1,179 @@
+"""
+Module: images.py
+
+Contains the image pipeline behind profile pictures.
+
+Uploads are stored as they are, under a name derived from a hash of their
+content (``ContentHashedPath``), so that the upload request does no image
+processing. The sizes the pages show are ``ImageSpecField`` variants of
+the upload (see ``accounts.models.Profile``), generated by django-imagekit
+with the classes below, which the ``IMAGEKIT_DEFAULT_CACHEFILE_BACKEND``
+and ``IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY`` settings point at:
+
+- ``Background`` queues the variants of a picture as soon as it is saved,
+  and queues a missing variant (after a deploy that changed a size, or
+  when the cache directory was cleared) the first time it is asked for.
+- ``ThreadPool`` generates queued variants on a worker thread of each
+  process instead of in the request.
+
+Until a variant exists, ``Profile.picture_url()`` falls back to the
+uploaded picture. Variants are saved under ``IMAGEKIT_CACHEFILE_DIR``
+with names made of the upload's name and a hash of the variant's
+settings, so a name never points at different content and the ``media``
+view lets browsers cache them for good.
+
+Variants of pictures uploaded before the variants existed are created on
+first access, or all at once with
+``python manage.py generateimages 'accounts:profile:*'``.
+"""
+
+# Standard library imports
+import copy
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Django core imports
+from django.utils.deconstruct import deconstructible
+
+# Third-party packages
+from imagekit.cachefiles.backends import BaseAsync, CacheFileState
+from PIL import features
+
+logger = logging.getLogger(__name__)
+
+# Browsers all decode WebP, which is about a third smaller than JPEG at
+# the same quality; Pillow may be built without it.
+VARIANT_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}
+
+
+@deconstructible
+class ContentHashedPath:
+    """
+    ``upload_to`` callable naming an upload ``<directory>/<hash>.<ext>``
+    after the SHA-256 of its content.
+    """
+
+    def __init__(self, directory, field_name):
+        self.directory = directory
+        self.field_name = field_name
+
+    def __call__(self, instance, filename):
+        digest = hashlib.sha256()
+        for chunk in getattr(instance, self.field_name).chunks():
+            digest.update(chunk)
+        extension = os.path.splitext(filename)[1].lower()
+        return f'{self.directory}/{digest.hexdigest()[:32]}{extension}'
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ContentHashedPath)
+            and self.directory == other.directory
+            and self.field_name == other.field_name
+        )
+
+
+def get_executor():
+    """
+    Returns the executor generating variants, started on first use so
+    that Gunicorn workers forked from a preloaded master each get their
+    own.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # A single thread: while saving, pilkit points the process's
+            # stderr at /dev/null and back, which concurrent saves would
+            # leave pointing at /dev/null.
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='images'
+            )
+        return _executor
+
+
+def wait():
+    """
+    Blocks until the variants queued so far are generated.
+    """
+    with _executor_lock:
+        futures = [future for future in _pending.values() if future]
+    for future in futures:
+        future.result()
+
+
+def detach(file):
+    """
+    Returns a copy of the cache file ``file`` with a source file object
+    of its own. The spec opens and closes its source while generating,
+    which must not happen to the one the request thread is using.
+    """
+    generator = copy.copy(file.generator)
+    source = generator.source
+    generator.source = source.field.attr_class(
+        source.instance, source.field, source.name
+    )
+    detached = copy.copy(file)
+    detached.generator = generator
+    return detached
+
+
+class Background:
+    """
+    Cache file strategy queueing variants when their source is saved and
+    when a missing one is asked for.
+    """
+
+    def on_source_saved(self, file):
+        file.generate()
+
+    def on_existence_required(self, file):
+        if not file.cachefile_backend.exists(file):
+            file.generate()
+
+    def should_verify_existence(self, file):
+        return True
+
+
+class ThreadPool(BaseAsync):
+    """
+    Cache file backend generating variants on a worker thread.
+
+    Whether a variant exists is remembered in imagekit's cache (the
+    ``IMAGEKIT_CACHE_BACKEND`` alias), so pages do not check the storage
+    on every render.
+    """
+
+    def schedule_generation(self, file, force=False):
+        with _executor_lock:
+            if file.name in _pending:
+                return
+            _pending[file.name] = None
+        try:
+            future = get_executor().submit(
+                self._generate, detach(file), force
+            )
+        except RuntimeError:
+            # The interpreter is shutting down.
+            with _executor_lock:
+                _pending.pop(file.name, None)
+            return
+        with _executor_lock:
+            if file.name in _pending:
+                _pending[file.name] = future
+
+    def _generate(self, file, force):
+        try:
+            self.generate_now(file, force=force)
+        except Exception:
+            logger.exception('Could not generate %s.', file.name)
+            # Left as generating, it would never be tried again.
+            self.set_state(file, CacheFileState.DOES_NOT_EXIST)
+        finally:
+            with _executor_lock:
+                _pending.pop(file.name, None)
@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import Client
+
+from accounts.models import Profile
+from accounts.signals import handle_user_profile
+
+PROFILE_UPDATE = f'UPDATE "{Profile._meta.db_table}"'
+
+
+def save_whole_profile(sender, instance, created, **kwargs):
+    # The handler before profile changes were tracked.
+    if created:
+        Profile.objects.create(user=instance)
+    else:
+        instance.profile.save()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure login throughput and the queries each login makes, with '
+        'the profile signal handler and with the previous one, which '
+        'saved the whole profile on every user save (last_login included). '
+        'Everything is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins', type=int, default=500,
+            help='Logins per handler.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"profile handler":<26}{"logins/s":>10}{"queries":>9}'
+            f'{"profile writes":>16}'
+        )
+        with transaction.atomic():
+            user = User.objects.create_user(
+                'benchmark-logins', email='logins@example.com'
+            )
+            self.login('changed fields only', user, options['logins'])
+
+            post_save.disconnect(handle_user_profile, sender=User)
+            post_save.connect(save_whole_profile, sender=User)
+            try:
+                self.login('whole profile', user, options['logins'])
+            finally:
+                post_save.disconnect(save_whole_profile, sender=User)
+                post_save.connect(handle_user_profile, sender=User)
+            transaction.set_rollback(True)
+
+    def login(self, label, user, count):
+        counts = {'queries': 0, 'profile writes': 0}
+
+        def record(execute, sql, params, many, context):
+            counts['queries'] += 1
+            if sql.startswith(PROFILE_UPDATE):
+                counts['profile writes'] += 1
+            return execute(sql, params, many, context)
+
+        client = Client()
+        start = time.perf_counter()
+        with connection.execute_wrapper(record):
+            for _ in range(count):
+                # Each login loads the user afresh, as a login request does.
+                client.force_login(User.objects.get(pk=user.pk))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{label:<26}{count / elapsed:>10.0f}'
+            f'{counts["queries"] / count:>9.1f}'
+            f'{counts["profile writes"] / count:>16.1f}'
+        )
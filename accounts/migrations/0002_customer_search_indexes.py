@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# Indexes serving the case-insensitive prefix lookups (``istartswith``)
+# of the sale screen's customer picker.
+SEARCH_FIELDS = ('first_name', 'last_name', 'phone')
+
+
+def index_name(field):
+    return f'customers_{field}_prefix_idx'
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    Customer = apps.get_model('accounts', 'Customer')
+    table = schema_editor.quote_name(Customer._meta.db_table)
+
+    if connection.vendor == 'sqlite':
+        # SQLite only turns a case-insensitive LIKE 'abc%' into an index
+        # range scan when the index uses the NOCASE collation.
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name(field)} '
+                f'ON {table} ({field} COLLATE NOCASE)'
+            )
+
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import OpClass
+        from django.db.models import Index
+        from django.db.models.functions import Upper
+
+        # istartswith compiles to UPPER(column) LIKE UPPER('abc%'), which
+        # a pattern_ops index on the same expression can serve under any
+        # database collation.
+        for field in SEARCH_FIELDS:
+            schema_editor.add_index(Customer, Index(
+                OpClass(Upper(field), name='text_pattern_ops'),
+                name=index_name(field),
+            ))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(field)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['name', 'id'], name='vendor_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 13:19
+
+import accounts.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='profile_picture',
+            field=models.ImageField(default='profile_pics/default.jpg', upload_to=accounts.images.ContentHashedPath('profile_pics', 'profile_picture')),
+        ),
+    ]
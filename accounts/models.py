@@ -2,10 +2,12 @@ from django.db import models
 from django.contrib.auth.models import User
 
 from django_extensions.db.fields import AutoSlugField
-from imagekit.models import ProcessedImageField
+from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
 from phonenumber_field.modelfields import PhoneNumberField
 
+from .images import VARIANT_FORMAT, ContentHashedPath
+
 
 # Define choices for profile status and roles
 STATUS_CHOICES = [
@@ -31,14 +33,26 @@ class Profile(models.Model):
     slug = AutoSlugField(
         unique=True,
         verbose_name='Account ID',
-        populate_from='email'
+        populate_from='email',
+        overwrite_on_add=False
     )
-    profile_picture = ProcessedImageField(
+    profile_picture = models.ImageField(
         default='profile_pics/default.jpg',
-        upload_to='profile_pics',
-        format='JPEG',
-        processors=[ResizeToFill(150, 150)],
-        options={'quality': 100}
+        upload_to=ContentHashedPath('profile_pics', 'profile_picture')
+    )
+    # Sizes of the picture, at twice their CSS size for high density
+    # screens. They are generated in the background (see images.py).
+    avatar = ImageSpecField(
+        source='profile_picture',
+        processors=[ResizeToFill(300, 300)],
+        format=VARIANT_FORMAT,
+        options={'quality': 80}
+    )
+    thumbnail = ImageSpecField(
+        source='profile_picture',
+        processors=[ResizeToFill(96, 96)],
+        format=VARIANT_FORMAT,
+        options={'quality': 75}
     )
     telephone = PhoneNumberField(
         null=True, blank=True, verbose_name='Telephone'
@@ -77,6 +91,65 @@ class Profile(models.Model):
         except AttributeError:
             return ''
 
+    def picture_url(self, variant):
+        """
+        Returns the URL of the ``avatar`` or ``thumbnail`` variant of the
+        profile picture, or of the picture itself while the variant is
+        being generated.
+        """
+        file = getattr(self, variant)
+        if file:
+            return file.url
+        return self.image_url
+
+    @property
+    def avatar_url(self):
+        """
+        Returns the URL of the picture shown on the profile page.
+        """
+        return self.picture_url('avatar')
+
+    @property
+    def thumbnail_url(self):
+        """
+        Returns the URL of the picture shown in lists and the sidebar.
+        """
+        return self.picture_url('thumbnail')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded values, so that ``changed_fields()`` can tell
+        what changed since.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, update_fields=None, **kwargs):
+        """
+        Saves the profile and remembers the values written.
+        """
+        super().save(*args, update_fields=update_fields, **kwargs)
+        names = update_fields or [
+            field.attname for field in self._meta.concrete_fields
+        ]
+        self._saved_values = {
+            **getattr(self, '_saved_values', {}),
+            **{name: self.__dict__.get(name) for name in names},
+        }
+
+    def changed_fields(self):
+        """
+        Returns the names of the fields changed since the profile was
+        loaded or last saved.
+        """
+        saved = getattr(self, '_saved_values', {})
+        return [
+            name for name, value in saved.items()
+            if self.__dict__.get(name) != value
+        ]
+
     def __str__(self):
         """
         Returns a string representation of the profile.
@@ -98,6 +171,7 @@ class Vendor(models.Model):
     slug = AutoSlugField(
         unique=True,
         populate_from='name',
+        overwrite_on_add=False,
         verbose_name='Slug'
     )
     phone_number = models.BigIntegerField(
@@ -117,6 +191,9 @@ class Vendor(models.Model):
         """Meta options for the Vendor model."""
         verbose_name = 'Vendor'
         verbose_name_plural = 'Vendors'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='vendor_name_id_idx'),
+        ]
 
 
 class Customer(models.Model):
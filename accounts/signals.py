@@ -1,18 +1,65 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from django.contrib.auth.models import User
-from .models import Profile
+from store import caching, fragments
+from .models import Customer, Profile
+
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=User)
-def handle_user_profile(sender, instance, created, **kwargs):
+def handle_user_profile(sender, instance, created, update_fields=None,
+                        **kwargs):
     """
-    Signal handler to create or update a Profile when a User is saved.
+    Signal handler to create a Profile for a new User, and to save the
+    profile of a saved User along with it.
+
+    The profile is left alone for the ``last_login`` update made on every
+    login, when it was not loaded (so cannot have changed), and when none
+    of its fields changed; otherwise only the changed fields are written.
     """
     if created:
         Profile.objects.create(user=instance)
-        print('Profile created!')
-    else:
-        instance.profile.save()
-        print('Profile updated!')
+        logger.debug('Created the profile of %s.', instance.username)
+        return
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    if not User.profile.is_cached(instance):
+        # Not loaded, so nothing in it can have changed.
+        return
+    changed = instance.profile.changed_fields()
+    if changed:
+        instance.profile.save(update_fields=changed)
+        logger.debug(
+            'Updated the profile of %s: %s.',
+            instance.username, ', '.join(changed),
+        )
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_choices(sender, **kwargs):
+    """
+    Signal to drop the cached customer autocomplete results once a change
+    to a customer is committed.
+    """
+    transaction.on_commit(lambda: caching.invalidate(caching.CUSTOMERS))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_fragments(sender, update_fields=None, **kwargs):
+    """
+    Signal to drop the cached sidebar profile cards once a change to a
+    user or profile (whose name, picture and role they show) is
+    committed. The ``last_login`` update made on every login is skipped.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    fragments.invalidate(fragments.PROFILES)
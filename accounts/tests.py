@@ -1 +1,220 @@
-# tests
\ No newline at end of file
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from PIL import Image
+
+from store.pagination import encode_cursor
+
+from . import images
+from .models import Customer, Profile
+from .views import CUSTOMER_PAGE_SIZE, media
+
+AJAX = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+class CustomerPickerTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("cashier", password="secret")
+        self.client.force_login(user)
+        Customer.objects.bulk_create(
+            [
+                Customer(first_name=f"Jane{n:02}", last_name="Doe",
+                         phone=f"0712{n:06}")
+                for n in range(25)
+            ]
+            + [Customer(first_name="Peter", last_name="Janssen")]
+        )
+
+    def lookup(self, **data):
+        return self.client.post(reverse("get_customers"), data, **AJAX)
+
+    def test_pages_follow_the_cursor(self):
+        seen = []
+        data = {"term": "jan", "limit": 10}
+        while True:
+            page = self.lookup(**data).json()
+            seen += [choice["text"] for choice in page["results"]]
+            if not page["pagination"]["more"]:
+                break
+            data["cursor"] = page["next"]
+        self.assertEqual(len(seen), 26)
+        self.assertEqual(len(set(seen)), 26)
+        self.assertEqual(seen[0], "Jane00 Doe (0712000000)")
+        self.assertEqual(seen[-1], "Peter Janssen")
+
+    def test_matches_phone_prefix_and_caps_page_size(self):
+        page = self.lookup(term="071200001", limit=1000).json()
+        self.assertEqual(len(page["results"]), 10)
+        page = self.lookup(term="jan", limit=1000).json()
+        self.assertEqual(len(page["results"]), 26)
+        self.assertFalse(page["pagination"]["more"])
+
+    def test_rejects_bad_cursor(self):
+        response = self.lookup(term="jan", cursor="not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_cursor_with_bad_values(self):
+        # Well-formed tokens whose id the ordering field rejects.
+        for values in (["Jane", "garbage"], ["Jane", {"a": 1}],
+                       [None, 1], ["Jane"]):
+            with self.subTest(values=values):
+                response = self.lookup(
+                    term="jan", cursor=encode_cursor(values)
+                )
+                self.assertEqual(response.status_code, 400)
+        response = self.lookup(term="jan", limit="lots")
+        self.assertEqual(
+            len(response.json()["results"]), CUSTOMER_PAGE_SIZE
+        )
+
+
+class ProfileSyncTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "jane", email="jane@example.com", password="secret",
+            first_name="Jane",
+        )
+
+    def profile_writes(self, queries):
+        table = f'UPDATE "{Profile._meta.db_table}"'
+        return [q["sql"] for q in queries if q["sql"].startswith(table)]
+
+    def test_new_users_get_a_profile(self):
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+
+    def test_logins_leave_the_profile_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.login(username="jane", password="secret")
+        self.assertEqual(self.profile_writes(queries), [])
+
+    def test_unloaded_profile_is_not_saved(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.last_name = "Doe"
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(self.profile_writes(queries), [])
+        # User fields are not copied to the profile.
+        self.assertEqual(Profile.objects.get(user=user).last_name, "")
+
+    def test_unchanged_profile_is_not_saved(self):
+        user = User.objects.select_related("profile").get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(self.profile_writes(queries), [])
+
+    def test_only_changed_fields_are_written(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.role = "AD"
+        with self.assertLogs("accounts.signals", "DEBUG") as logs, \
+                CaptureQueriesContext(connection) as queries:
+            user.save()
+            user.save()
+        [sql] = self.profile_writes(queries)
+        self.assertIn('"role"', sql)
+        self.assertNotIn('"email"', sql)
+        self.assertIn("role", logs.output[0])
+        self.assertEqual(Profile.objects.get(user=user).role, "AD")
+
+    def test_benchmark_is_rolled_back(self):
+        out = StringIO()
+        call_command("benchmark_logins", logins=3, stdout=out)
+        self.assertIn("whole profile", out.getvalue())
+        self.assertFalse(User.objects.filter(
+            username="benchmark-logins"
+        ).exists())
+
+
+class ProfilePictureTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        shutil.copytree(
+            f"{settings.MEDIA_ROOT}/profile_pics", f"{media_root}/profile_pics"
+        )
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(images.wait)
+        # Imagekit remembers which variants exist in the default cache.
+        cache.clear()
+        self.user = User.objects.create_user("jane", password="secret")
+        images.wait()
+
+    def upload(self, size=(1200, 900)):
+        content = BytesIO()
+        Image.new("RGB", size, "teal").save(content, "JPEG")
+        profile = Profile.objects.get(user=self.user)
+        profile.profile_picture = SimpleUploadedFile(
+            "Jane.JPG", content.getvalue(), "image/jpeg"
+        )
+        profile.save()
+        return profile, content.getvalue()
+
+    def test_uploads_are_stored_as_they_are_under_their_hash(self):
+        profile, content = self.upload()
+        name = profile.profile_picture.name
+        self.assertRegex(name, r"^profile_pics/[0-9a-f]{32}\.jpg$")
+        with profile.profile_picture.open("rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_variants_are_generated_in_the_background(self):
+        profile, _ = self.upload()
+        images.wait()
+        for variant, size in (("avatar", 300), ("thumbnail", 96)):
+            url = profile.picture_url(variant)
+            self.assertTrue(url.startswith(
+                f"{settings.MEDIA_URL}{settings.IMAGEKIT_CACHEFILE_DIR}/"
+            ))
+            self.assertIn(profile.profile_picture.name[:-4], url)
+            with Image.open(getattr(profile, variant).path) as image:
+                self.assertEqual(image.size, (size, size))
+                self.assertEqual(image.format, images.VARIANT_FORMAT)
+
+    def test_missing_variants_fall_back_to_the_upload(self):
+        with mock.patch.object(images.ThreadPool, "schedule_generation"):
+            profile, _ = self.upload()
+            self.assertEqual(profile.thumbnail_url, profile.image_url)
+        # The first page asking for it queues it.
+        self.assertEqual(profile.thumbnail_url, profile.image_url)
+        images.wait()
+        cache.clear()
+        self.assertNotEqual(profile.thumbnail_url, profile.image_url)
+
+    def test_variants_are_served_as_immutable(self):
+        profile, _ = self.upload()
+        images.wait()
+        # The media route only exists with DEBUG, which tests run without.
+        factory = RequestFactory()
+
+        def get(url):
+            path = url.removeprefix(settings.MEDIA_URL)
+            return media(factory.get(url), path)
+
+        response = get(profile.thumbnail_url)
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=31536000, immutable"
+        )
+        response = get(profile.image_url)
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    def test_staff_list_shows_thumbnails(self):
+        profile, _ = self.upload()
+        images.wait()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("profile_list"))
+        self.assertContains(response, profile.thumbnail_url)
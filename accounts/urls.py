@@ -1,6 +1,4 @@
 # Django core imports
-from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 from django.contrib.auth import views as auth_views
 
@@ -59,5 +57,3 @@ urlpatterns = [
     path('vendors/<int:pk>/delete/', VendorDeleteView.as_view(),
          name='vendor-delete'),
 ]
-
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
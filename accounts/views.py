@@ -1,9 +1,13 @@
 # Django core imports
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from django.urls import reverse_lazy, reverse
+from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
+from django.views.static import serve
 
 # Authentication and permissions
 from django.contrib.auth.decorators import login_required
@@ -19,9 +23,12 @@ from django.views.generic import (
 
 # Third-party packages
 from django_tables2 import SingleTableView
-from django_tables2.export.views import ExportMixin
+from store import caching
+from store.exports import StreamingExportMixin
+from store.pagination import CursorPaginationMixin, akeyset_page
 
 # Local app imports
+from .exports import ProfileExport
 from .models import Profile, Customer, Vendor
 from .forms import (
     CreateUserForm, UserUpdateForm,
@@ -30,6 +37,12 @@ from .forms import (
 )
 from .tables import ProfileTable
 
+CUSTOMER_ORDERING = ('first_name', 'id')
+CUSTOMER_PAGE_SIZE = 20
+CUSTOMER_MAX_PAGE_SIZE = 50
+CUSTOMER_TERM_MAX_LENGTH = 64
+CUSTOMER_TERM_MAX_WORDS = 4
+
 
 def register(request):
     """
@@ -89,7 +102,25 @@ def profile_update(request):
     )
 
 
-class ProfileListView(LoginRequiredMixin, ExportMixin, SingleTableView):
+@require_GET
+def media(request, path):
+    """
+    Serve an uploaded file. Resized profile pictures never change under
+    a given name (see images.py), so browsers may keep them for a year
+    without checking back; other files are revalidated.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    cache_dir = settings.IMAGEKIT_CACHEFILE_DIR.rstrip('/') + '/'
+    if path.startswith(cache_dir):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+
+class ProfileListView(
+    LoginRequiredMixin, StreamingExportMixin, SingleTableView
+):
     """
     Display a list of profiles in a table format.
     Requires user to be logged in
@@ -102,6 +133,7 @@ class ProfileListView(LoginRequiredMixin, ExportMixin, SingleTableView):
     table_class = ProfileTable
     paginate_by = 10
     table_pagination = False
+    export_class = ProfileExport
 
 
 class ProfileCreateView(LoginRequiredMixin, CreateView):
@@ -228,25 +260,78 @@ def is_ajax(request):
     return request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
 
 
+async def customer_choices(term, cursor=None, size=CUSTOMER_PAGE_SIZE):
+    """
+    Returns one page of the sale screen's customer choices for ``term``.
+
+    Every word of ``term`` must start the customer's first name, last
+    name or phone number. Pages are keyset paginated on ``(first_name,
+    id)``: ``next`` is the cursor of the following page, or ``None``.
+    """
+    customers = Customer.objects.all()
+    for token in term.split()[:CUSTOMER_TERM_MAX_WORDS]:
+        customers = customers.filter(
+            Q(first_name__istartswith=token)
+            | Q(last_name__istartswith=token)
+            | Q(phone__istartswith=token)
+        )
+    rows, next_cursor = await akeyset_page(
+        customers.values('id', 'first_name', 'last_name', 'phone'),
+        CUSTOMER_ORDERING, cursor, size,
+    )
+    results = []
+    for row in rows:
+        text = ' '.join(filter(None, (row['first_name'], row['last_name'])))
+        if row['phone']:
+            text = f"{text} ({row['phone']})"
+        results.append({'id': row['id'], 'text': text})
+    return {
+        'results': results,
+        'pagination': {'more': next_cursor is not None},
+        'next': next_cursor,
+    }
+
+
 @csrf_exempt
 @require_POST
 @login_required
-def get_customers(request):
-    if is_ajax(request) and request.method == 'POST':
-        term = request.POST.get('term', '')
-        customers = Customer.objects.filter(
-            name__icontains=term
-        ).values('id', 'name')
-        customer_list = list(customers)
-        return JsonResponse(customer_list, safe=False)
-    return JsonResponse({'error': 'Invalid request method'}, status=400)
-
-
-class VendorListView(LoginRequiredMixin, ListView):
+async def get_customers(request):
+    """
+    Serves the sale screen's customer picker one page at a time.
+
+    Accepts ``term``, the ``cursor`` returned with the previous page and
+    a ``limit`` of at most ``CUSTOMER_MAX_PAGE_SIZE`` choices. Only the
+    first page of each term is cached.
+    """
+    if not is_ajax(request):
+        return JsonResponse({'error': 'Not an AJAX request'}, status=400)
+
+    term = request.POST.get('term', '')[:CUSTOMER_TERM_MAX_LENGTH]
+    cursor = request.POST.get('cursor') or None
+    try:
+        size = int(request.POST.get('limit', CUSTOMER_PAGE_SIZE))
+    except (ValueError, TypeError):
+        size = CUSTOMER_PAGE_SIZE
+    size = max(1, min(size, CUSTOMER_MAX_PAGE_SIZE))
+
+    if cursor is None and size == CUSTOMER_PAGE_SIZE:
+        data = await caching.acached_results(
+            caching.CUSTOMERS, term, customer_choices
+        )
+    else:
+        try:
+            data = await customer_choices(term, cursor, size)
+        except (ValueError, ValidationError, TypeError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(data)
+
+
+class VendorListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Vendor
     template_name = 'accounts/vendor_list.html'
     context_object_name = 'vendors'
     paginate_by = 10
+    cursor_ordering = ('name', 'id')
 
 
 class VendorCreateView(LoginRequiredMixin, CreateView):
@@ -17,6 +17,9 @@ class BillAdmin(admin.ModelAdmin):
         'amount',
         'status'
     )
+    readonly_fields = ('date',)
+    list_filter = ('status',)
+    ordering = ('-date',)
 
     list_display = (
         'slug',
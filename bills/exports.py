@@ -0,0 +1,22 @@
+from store.exports import StreamingExport
+from .models import Bill
+
+
+class BillExport(StreamingExport):
+    model = Bill
+    filename = 'bills'
+    sheet_title = 'Bills'
+    date_field = 'date'
+    filters = {'status': 'status'}
+    ordering = ('date', 'pk')
+    columns = (
+        ('Date', 'date'),
+        ('Institution', 'institution_name'),
+        ('Phone Number', 'phone_number'),
+        ('Email', 'email'),
+        ('Address', 'address'),
+        ('Description', 'description'),
+        ('Payment Details', 'payment_details'),
+        ('Total Amount Owing (Ksh)', 'amount'),
+        ('Paid', 'status'),
+    )
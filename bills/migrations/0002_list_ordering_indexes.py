@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['date', 'id'], name='bill_date_id_idx'),
+        ),
+    ]
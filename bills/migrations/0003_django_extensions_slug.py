@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 13:09
+
+import django_extensions.db.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0002_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bill',
+            name='slug',
+            field=django_extensions.db.fields.AutoSlugField(blank=True, editable=False, populate_from='date', unique=True),
+        ),
+    ]
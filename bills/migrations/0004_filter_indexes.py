@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0003_django_extensions_slug'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('status', False)), fields=['date', 'id'], name='bill_unpaid_date_idx'),
+        ),
+    ]
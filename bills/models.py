@@ -1,11 +1,13 @@
 from django.db import models
-from autoslug import AutoSlugField
+from django_extensions.db.fields import AutoSlugField
 
 
 class Bill(models.Model):
     """Model representing a bill with various details and payment status."""
 
-    slug = AutoSlugField(unique=True, populate_from='date')
+    slug = AutoSlugField(
+        unique=True, populate_from='date', overwrite_on_add=False
+    )
     date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Date (e.g., 2022/11/22)'
@@ -55,3 +57,12 @@ class Bill(models.Model):
 
     def __str__(self):
         return self.institution_name
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='bill_date_id_idx'),
+            models.Index(
+                fields=['date', 'id'], condition=models.Q(status=False),
+                name='bill_unpaid_date_idx',
+            ),
+        ]
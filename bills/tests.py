@@ -1 +1,23 @@
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from store.testing import QueryBudgetMixin
+from .models import Bill
+
+
+class BillQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+
+    def add_bills(self, count):
+        for _ in range(count):
+            Bill.objects.create(
+                institution_name="Power Co", payment_details="Paybill",
+                amount=100,
+            )
+
+    def test_bill_list(self):
+        self.assertQueryBudget(reverse("bill_list"), self.add_bills, 6)
@@ -13,22 +13,32 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 
 # Third-party packages
 from django_tables2 import SingleTableView
-from django_tables2.export.views import ExportMixin
+from store.exports import StreamingExportMixin
+from store.pagination import CursorPaginationMixin
 
 # Local app imports
+from .exports import BillExport
 from .models import Bill
 from .tables import BillTable
 from accounts.models import Profile
 
 
-class BillListView(LoginRequiredMixin, ExportMixin, SingleTableView):
+class BillListView(
+    LoginRequiredMixin,
+    StreamingExportMixin,
+    CursorPaginationMixin,
+    SingleTableView,
+):
     """View for listing bills."""
     model = Bill
     table_class = BillTable
     template_name = 'bills/bill_list.html'
     context_object_name = 'bills'
     paginate_by = 10
+    cursor_ordering = ('date', 'id')
+    paginate_count = True
     SingleTableView.table_pagination = False
+    export_class = BillExport
 
 
 class BillCreateView(LoginRequiredMixin, CreateView):
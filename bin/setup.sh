@@ -10,12 +10,21 @@ if [ $? -ne 0 ]; then
   exit 1
 fi
 
+echo "🗃️ Applying database migrations..."
+docker run --rm -v inventoryms-data:/data sales-and-inventory-management:1.0 \
+  python manage.py migrate --noinput
+
+if [ $? -ne 0 ]; then
+  echo "❌ Error: Database migrations failed!"
+  exit 1
+fi
+
 echo "🚀 Starting Docker containers in detached mode..."
-docker run -d -p 8000:8000 sales-and-inventory-management:1.0
+docker run -d -p 8000:8000 -v inventoryms-data:/data sales-and-inventory-management:1.0
 
 if [ $? -ne 0 ]; then
   echo "❌ Error: Docker container failed to start!"
   exit 1
 fi
 
-echo "✔️ Setup completed successfully!"
\ No newline at end of file
+echo "✔️ Setup completed successfully!"
@@ -0,0 +1,50 @@
+"""
+Module: gunicorn.conf.py
+
+Contains the Gunicorn settings used to serve the project in production.
+Gunicorn reads this file from the working directory on start:
+
+    gunicorn InventoryMS.wsgi:application
+
+Every setting can be overridden from the environment:
+- GUNICORN_BIND: Address to listen on (``0.0.0.0:8000``).
+- WEB_CONCURRENCY: Worker processes (two per CPU, plus one).
+- GUNICORN_THREADS: Threads per worker (``2``).
+- GUNICORN_WORKER_CLASS: ``gthread`` by default; use
+  ``uvicorn_worker.UvicornWorker`` with ``InventoryMS.asgi:application``
+  to serve the ASGI application, where the async point-of-sale views run
+  natively, instead.
+- GUNICORN_PRELOAD: Import the project once in the master process before
+  forking, so that workers start without importing it again (``1``).
+- GUNICORN_TIMEOUT: Seconds before a silent worker is restarted (``30``).
+- GUNICORN_MAX_REQUESTS: Requests after which a worker is recycled, to
+  bound slow memory growth (``1000``, ``0`` to disable).
+"""
+
+# Standard library imports
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(
+    os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in (
+    '1', 'true', 'yes', 'on'
+)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # A connection (or connection pool) opened while the master preloaded
+    # the project must not be shared by the forked workers.
+    from django.db import connections
+    connections.close_all()
@@ -15,3 +15,4 @@ class InvoiceAdmin(admin.ModelAdmin):
         'price_per_item', 'quantity', 'shipping', 'total',
         'grand_total'
     )
+    list_select_related = ('item__category',)
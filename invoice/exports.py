@@ -0,0 +1,24 @@
+from store.exports import StreamingExport
+from .models import Invoice
+
+
+class InvoiceExport(StreamingExport):
+    model = Invoice
+    filename = 'invoices'
+    sheet_title = 'Invoices'
+    select_related = ('item',)
+    date_field = 'date'
+    filters = {'item': 'item'}
+    ordering = ('date', 'pk')
+    columns = (
+        ('Invoice', 'slug'),
+        ('Date', 'date'),
+        ('Customer', 'customer_name'),
+        ('Contact Number', 'contact_number'),
+        ('Item', 'item.name'),
+        ('Price Per Item (Ksh)', 'price_per_item'),
+        ('Quantity', 'quantity'),
+        ('Shipping and Handling', 'shipping'),
+        ('Total Amount (Ksh)', 'total'),
+        ('Grand Total (Ksh)', 'grand_total'),
+    )
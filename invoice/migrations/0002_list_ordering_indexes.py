@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoice', '0001_initial'),
+        ('store', '0004_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['date', 'id'], name='invoice_date_id_idx'),
+        ),
+    ]
@@ -21,7 +21,9 @@ class Invoice(models.Model):
         grand_total (float): Total including shipping.
     """
 
-    slug = AutoSlugField(unique=True, populate_from='date')
+    slug = AutoSlugField(
+        unique=True, populate_from='date', overwrite_on_add=False
+    )
     date = models.DateTimeField(
         auto_now=True,
         verbose_name='Date (e.g., 2022/11/22)'
@@ -52,3 +54,8 @@ class Invoice(models.Model):
         Return the invoice's slug.
         """
         return self.slug
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='invoice_date_id_idx'),
+        ]
@@ -1,3 +1,38 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from store.models import Category, Item
+from store.testing import QueryBudgetMixin
+from .models import Invoice
+
+
+class InvoiceQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        self.serial = 0
+
+    def add_invoices(self, count):
+        for _ in range(count):
+            self.serial += 1
+            item = Item.objects.create(
+                name=f"Item {self.serial}", description="Test item",
+                category=Category.objects.create(name=f"C{self.serial}"),
+            )
+            Invoice.objects.create(
+                customer_name="Jane", contact_number="0712000000",
+                item=item, price_per_item=10, quantity=1, shipping=0,
+            )
+
+    def test_invoice_list(self):
+        self.assertQueryBudget(reverse("invoicelist"), self.add_invoices, 6)
+
+    def test_invoice_detail(self):
+        self.add_invoices(1)
+        invoice = Invoice.objects.get()
+        self.assertQueryBudget(
+            reverse("invoice-detail", args=[invoice.slug]),
+            lambda count: None, 4, sizes=(1,),
+        )
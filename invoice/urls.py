@@ -1,7 +1,5 @@
 # Django core imports
 from django.urls import path
-from django.conf import settings
-from django.conf.urls.static import static
 
 # Local app imports
 from .views import (
@@ -41,10 +39,3 @@ urlpatterns = [
         name='invoice-delete'
     ),
 ]
-
-# Static media files configuration for development
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
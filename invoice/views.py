@@ -11,23 +11,34 @@ from django.views.generic import (
 
 # Third-party packages
 from django_tables2 import SingleTableView
-from django_tables2.export.views import ExportMixin
+from store.exports import StreamingExportMixin
+from store.pagination import CursorPaginationMixin
 
 # Local app imports
+from .exports import InvoiceExport
 from .models import Invoice
 from .tables import InvoiceTable
 
 
-class InvoiceListView(LoginRequiredMixin, ExportMixin, SingleTableView):
+class InvoiceListView(
+    LoginRequiredMixin,
+    StreamingExportMixin,
+    CursorPaginationMixin,
+    SingleTableView,
+):
     """
     View for listing invoices with table export functionality.
     """
     model = Invoice
+    queryset = Invoice.objects.select_related('item')
     table_class = InvoiceTable
     template_name = 'invoice/invoicelist.html'
     context_object_name = 'invoices'
     paginate_by = 10
+    cursor_ordering = ('date', 'id')
+    paginate_count = True
     table_pagination = False  # Disable table pagination
+    export_class = InvoiceExport
 
 
 class InvoiceDetailView(DetailView):
@@ -35,6 +46,7 @@ class InvoiceDetailView(DetailView):
     View for displaying invoice details.
     """
     model = Invoice
+    queryset = Invoice.objects.select_related('item')
     template_name = 'invoice/invoicedetail.html'
 
     def get_success_url(self):
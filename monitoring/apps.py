@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    """Configuration for the Monitoring application."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        import monitoring.signals
@@ -0,0 +1,186 @@
+"""
+Module: middleware.py
+
+Contains ``ViewMetricsMiddleware``, which measures every request and
+records it in ``monitoring.stats``:
+
+- The time from entering the middleware to the last byte of the
+  response body. This includes the middleware listed after it, the view,
+  and the rendering of streamed exports.
+- The SQL queries run meanwhile, and the time they took.
+- The queries repeated with the same SQL and parameters, a sign of a
+  missing ``select_related``/``prefetch_related`` or of a lookup that
+  belongs outside a loop.
+- The size of the response body.
+
+It handles sync and async requests alike, so the async point-of-sale
+views keep running natively under ASGI. Queries are counted by
+``record_query``, which ``monitoring.signals`` installs on every database
+connection and which reports to the measurement of the current request
+through a context variable: async views run their queries on another
+thread, with a connection of that thread.
+"""
+
+# Standard library imports
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+# Django core imports
+from django.http import FileResponse
+
+# Third-party packages
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# Local app imports
+from . import stats
+
+# Characters of the most repeated query kept with a sample.
+DUPLICATE_SQL_LENGTH = 300
+
+_current = ContextVar('measurement', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing a query for the current request.
+    """
+    measurement = _current.get()
+    if measurement is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        measurement.add_query(sql, params, many, time.perf_counter() - start)
+
+
+class Measurement:
+    """
+    Times a request and counts the queries it runs on every database.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.seen = Counter()
+        self.size = 0
+
+    def add_query(self, sql, params, many, duration):
+        self.query_time += duration
+        self.queries += 1
+        if not many:
+            self.seen[sql, repr(params)] += 1
+
+    def finish(self, request, response):
+        """
+        Records the request, once its response body has been sent.
+        """
+        match = request.resolver_match
+        duplicates = sum(count - 1 for count in self.seen.values())
+        duplicate_sql = ''
+        if duplicates:
+            (sql, _), _ = self.seen.most_common(1)[0]
+            duplicate_sql = sql[:DUPLICATE_SQL_LENGTH]
+        stats.record(stats.Sample(
+            view=match.view_name if match else stats.UNRESOLVED,
+            status=response.status_code,
+            duration=time.perf_counter() - self.start,
+            queries=self.queries,
+            query_time=self.query_time,
+            duplicates=duplicates,
+            duplicate_sql=duplicate_sql,
+            size=self.size,
+        ))
+
+    def count(self, request, response, content):
+        # Exports run their queries as the body is produced.
+        content = iter(content)
+        try:
+            while True:
+                token = _current.set(self)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                self.size += len(chunk)
+                yield chunk
+        finally:
+            self.finish(request, response)
+
+    async def acount(self, request, response, content):
+        content = aiter(content)
+        try:
+            while True:
+                token = _current.set(self)
+                try:
+                    chunk = await anext(content)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                self.size += len(chunk)
+                yield chunk
+        finally:
+            self.finish(request, response)
+
+    def track(self, request, response):
+        """
+        Records ``response`` now, or as its last chunk is sent when it
+        is streamed.
+        """
+        if not response.streaming:
+            self.size = len(response.content)
+            self.finish(request, response)
+        elif isinstance(response, FileResponse):
+            # Wrapping the file would keep the server from sending it
+            # with sendfile().
+            self.size = int(response.get('Content-Length', 0))
+            self.finish(request, response)
+        elif response.is_async:
+            response.streaming_content = self.acount(
+                request, response, response.streaming_content
+            )
+        else:
+            response.streaming_content = self.count(
+                request, response, response.streaming_content
+            )
+        return response
+
+
+class ViewMetricsMiddleware:
+    """
+    Middleware recording the latency, queries and response size of every
+    request per URL name (see ``monitoring.stats``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measurement = Measurement()
+        token = _current.set(measurement)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return measurement.track(request, response)
+
+    async def __acall__(self, request):
+        measurement = Measurement()
+        token = _current.set(measurement)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return measurement.track(request, response)
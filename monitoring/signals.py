@@ -0,0 +1,16 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .middleware import record_query
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Signal to time the queries of every new database connection for
+    ``ViewMetricsMiddleware``.
+    """
+    if record_query not in connection.execute_wrappers:
+        # First, as execute_wrapper() blocks remove the last wrapper when
+        # they end and a connection may be opened inside one.
+        connection.execute_wrappers.insert(0, record_query)
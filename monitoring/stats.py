@@ -0,0 +1,196 @@
+"""
+Module: stats.py
+
+Contains the in-process store of the request measurements taken by
+``monitoring.middleware.ViewMetricsMiddleware``.
+
+Each request is recorded as a ``Sample`` under the name of the view it
+resolved to. Samples are kept in a ring buffer holding the last
+``MONITORING_BUFFER_SIZE`` requests, from which ``summary()`` computes
+latency percentiles, query counts and response sizes per view on demand.
+Running totals are kept per view beside the buffer, so that the counters
+exported by ``prometheus_text()`` keep growing after samples drop out of
+it. Memory is bounded by the buffer size and the number of views.
+
+Every process keeps its own buffer: under Gunicorn, each worker reports
+the requests it served.
+"""
+
+# Standard library imports
+import math
+import threading
+from collections import defaultdict, deque, namedtuple
+
+# Django core imports
+from django.conf import settings
+
+# Name recorded for requests that matched no URL pattern.
+UNRESOLVED = '<unresolved>'
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+METRIC_PREFIX = 'inventoryms_view'
+
+Sample = namedtuple('Sample', [
+    'view', 'status', 'duration', 'queries', 'query_time', 'duplicates',
+    'duplicate_sql', 'size',
+])
+
+_lock = threading.Lock()
+_samples = deque()
+_totals = defaultdict(lambda: defaultdict(float))
+
+
+def buffer_size():
+    """
+    Returns the number of requests kept in the ring buffer.
+    """
+    return getattr(settings, 'MONITORING_BUFFER_SIZE', 10000)
+
+
+def record(sample):
+    """
+    Adds ``sample`` to the ring buffer and the totals of its view.
+    """
+    global _samples
+    with _lock:
+        if _samples.maxlen != buffer_size():
+            _samples = deque(_samples, maxlen=buffer_size())
+        _samples.append(sample)
+        totals = _totals[sample.view]
+        totals['requests'] += 1
+        totals['errors'] += sample.status >= 500
+        totals['duration'] += sample.duration
+        totals['queries'] += sample.queries
+        totals['query_time'] += sample.query_time
+        totals['duplicates'] += sample.duplicates
+        totals['size'] += sample.size
+
+
+def clear():
+    """
+    Forgets every sample and total.
+    """
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+
+
+def samples():
+    """
+    Returns the samples in the ring buffer, oldest first.
+    """
+    with _lock:
+        return list(_samples)
+
+
+def percentile(values, quantile):
+    """
+    Returns the nearest-rank ``quantile`` of the sorted ``values``.
+    """
+    if not values:
+        return 0
+    return values[max(math.ceil(quantile * len(values)) - 1, 0)]
+
+
+def summary():
+    """
+    Returns a dict of statistics per view over the ring buffer, slowest
+    views (by total time spent) first.
+    """
+    by_view = defaultdict(list)
+    for sample in samples():
+        by_view[sample.view].append(sample)
+
+    rows = []
+    for view, view_samples in by_view.items():
+        count = len(view_samples)
+        durations = sorted(sample.duration for sample in view_samples)
+        queries = [sample.queries for sample in view_samples]
+        sizes = [sample.size for sample in view_samples]
+        duplicated = [
+            sample for sample in view_samples if sample.duplicates
+        ]
+        rows.append({
+            'view': view,
+            'requests': count,
+            'errors': sum(sample.status >= 500 for sample in view_samples),
+            'total_time': sum(durations),
+            'percentiles': {
+                quantile: percentile(durations, quantile)
+                for quantile in QUANTILES
+            },
+            'max_time': durations[-1],
+            'mean_queries': sum(queries) / count,
+            'max_queries': max(queries),
+            'mean_query_time': sum(
+                sample.query_time for sample in view_samples
+            ) / count,
+            'duplicated_requests': len(duplicated),
+            'max_duplicates': max(
+                (sample.duplicates for sample in duplicated), default=0
+            ),
+            'duplicate_sql': next(
+                (sample.duplicate_sql for sample in reversed(duplicated)),
+                '',
+            ),
+            'mean_size': sum(sizes) / count,
+            'max_size': max(sizes),
+        })
+    rows.sort(key=lambda row: row['total_time'], reverse=True)
+    return rows
+
+
+def _label(value):
+    value = value.replace('\\', '\\\\').replace('"', '\\"')
+    return value.replace('\n', '\\n')
+
+
+def prometheus_text():
+    """
+    Returns the statistics in the Prometheus text exposition format.
+
+    Counters are running totals since the process started; the latency
+    quantiles are computed over the ring buffer.
+    """
+    with _lock:
+        totals = {view: dict(values) for view, values in _totals.items()}
+    quantiles = {row['view']: row['percentiles'] for row in summary()}
+
+    counters = (
+        ('requests_total', 'requests', 'Requests served.'),
+        ('errors_total', 'errors', 'Requests answered with a 5xx status.'),
+        ('queries_total', 'queries', 'SQL queries run.'),
+        ('query_seconds_total', 'query_time',
+         'Time spent running SQL queries.'),
+        ('duplicate_queries_total', 'duplicates',
+         'SQL queries repeated with the same parameters in a request.'),
+        ('response_bytes_total', 'size', 'Response body bytes sent.'),
+    )
+    lines = []
+    for name, key, help_text in counters:
+        lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_{name} counter')
+        for view, values in sorted(totals.items()):
+            lines.append(
+                f'{METRIC_PREFIX}_{name}{{view="{_label(view)}"}} '
+                f'{values[key]:g}'
+            )
+
+    name = f'{METRIC_PREFIX}_duration_seconds'
+    lines.append(
+        f'# HELP {name} Request latency; quantiles over the last '
+        f'{buffer_size()} requests.'
+    )
+    lines.append(f'# TYPE {name} summary')
+    for view, values in sorted(totals.items()):
+        label = _label(view)
+        for quantile, value in quantiles.get(view, {}).items():
+            lines.append(
+                f'{name}{{view="{label}",quantile="{quantile}"}} {value:g}'
+            )
+        lines.append(f'{name}_sum{{view="{label}"}} {values["duration"]:g}')
+        lines.append(
+            f'{name}_count{{view="{label}"}} {values["requests"]:g}'
+        )
+    return '\n'.join(lines) + '\n'
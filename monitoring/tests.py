@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.urls import include, path
+
+from . import stats
+
+
+def repeated_lookups(request):
+    for _ in range(3):
+        User.objects.filter(username="jane").exists()
+    User.objects.count()
+    return HttpResponse("done")
+
+
+def streamed(request):
+    return StreamingHttpResponse(b"x" * 10 for _ in range(5))
+
+
+async def async_view(request):
+    await User.objects.filter(username="jane").aexists()
+    return HttpResponse("async")
+
+
+urlpatterns = [
+    path("repeated/", repeated_lookups, name="repeated"),
+    path("streamed/", streamed, name="streamed"),
+    path("async/", async_view, name="async"),
+    path("", include("InventoryMS.urls")),
+]
+
+
+@override_settings(ROOT_URLCONF="monitoring.tests")
+class ViewMetricsTests(TestCase):
+
+    def setUp(self):
+        stats.clear()
+
+    def row(self, view):
+        return next(row for row in stats.summary() if row["view"] == view)
+
+    def test_counts_queries_and_duplicates(self):
+        self.client.get("/repeated/")
+        self.client.get("/repeated/")
+        row = self.row("repeated")
+        self.assertEqual(row["requests"], 2)
+        self.assertEqual(row["max_queries"], 4)
+        self.assertEqual(row["duplicated_requests"], 2)
+        self.assertEqual(row["max_duplicates"], 2)
+        self.assertIn("auth_user", row["duplicate_sql"])
+        self.assertEqual(row["max_size"], len("done"))
+
+    def test_streamed_responses_are_recorded_once_sent(self):
+        response = self.client.get("/streamed/")
+        self.assertEqual(stats.samples(), [])
+        b"".join(response.streaming_content)
+        self.assertEqual(self.row("streamed")["max_size"], 50)
+
+    async def test_async_views(self):
+        await self.async_client.get("/async/")
+        self.assertEqual(self.row("async")["max_queries"], 1)
+
+    def test_unresolved_requests(self):
+        self.client.get("/missing/")
+        self.assertEqual(stats.samples()[0].status, 404)
+        self.assertEqual(stats.samples()[0].view, stats.UNRESOLVED)
+
+    @override_settings(MONITORING_BUFFER_SIZE=3)
+    def test_buffer_is_bounded(self):
+        for _ in range(5):
+            self.client.get("/repeated/")
+        self.assertEqual(len(stats.samples()), 3)
+        self.assertIn(
+            'inventoryms_view_requests_total{view="repeated"} 5',
+            stats.prometheus_text(),
+        )
+
+
+@override_settings(ROOT_URLCONF="monitoring.tests", MONITORING_TOKEN="s3cret")
+class MonitoringViewTests(TestCase):
+
+    def setUp(self):
+        stats.clear()
+        self.client.get("/repeated/")
+
+    def test_stats_page_is_for_superusers(self):
+        user = User.objects.create_user("jane", password="secret")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/monitoring/").status_code, 302)
+        user.is_superuser = True
+        user.save()
+        response = self.client.get("/monitoring/")
+        self.assertContains(response, "<code>repeated</code>")
+
+    def test_prometheus_endpoint(self):
+        response = self.client.get(
+            "/monitoring/metrics/", HTTP_AUTHORIZATION="Bearer s3cret"
+        )
+        self.assertEqual(
+            response["Content-Type"],
+            "text/plain; version=0.0.4; charset=utf-8",
+        )
+        text = response.content.decode()
+        self.assertIn('inventoryms_view_queries_total{view="repeated"} 4', text)
+        self.assertIn(
+            'inventoryms_view_duration_seconds_count{view="repeated"} 1', text
+        )
+        self.assertIn(
+            'inventoryms_view_duration_seconds{view="repeated",'
+            'quantile="0.99"}', text
+        )
+
+    def test_prometheus_endpoint_needs_the_token(self):
+        response = self.client.get(
+            "/monitoring/metrics/", HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get("/monitoring/metrics/")
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,11 @@
+# Django core imports
+from django.urls import path
+
+# Local app imports
+from .views import prometheus_metrics, view_stats
+
+# URL patterns
+urlpatterns = [
+    path('', view_stats, name='monitoring-stats'),
+    path('metrics/', prometheus_metrics, name='monitoring-metrics'),
+]
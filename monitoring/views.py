@@ -0,0 +1,61 @@
+# Django core imports
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+# Authentication and permissions
+from django.contrib.auth.decorators import user_passes_test
+
+# Local app imports
+from . import stats
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def is_superuser(user):
+    """
+    Check if the user is a superuser.
+    """
+    return user.is_superuser
+
+
+@require_GET
+@user_passes_test(is_superuser)
+def view_stats(request):
+    """
+    Render the latency, query and response size statistics of every view
+    over the requests in the ring buffer. Superusers only.
+    """
+    return render(request, 'monitoring/stats.html', {
+        'rows': stats.summary(),
+        'buffer_size': stats.buffer_size(),
+        'quantiles': stats.QUANTILES,
+    })
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Serve the statistics in the Prometheus text format.
+
+    Scrapers authenticate with ``Authorization: Bearer <MONITORING_TOKEN>``
+    when the setting is set; superusers can also read it in a browser.
+    """
+    token = getattr(settings, 'MONITORING_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    scheme, _, credentials = authorization.partition(' ')
+    authorized = request.user.is_superuser or (
+        token and scheme.lower() == 'bearer'
+        and constant_time_compare(credentials, token)
+    )
+    if not authorized:
+        if authorization or request.user.is_authenticated:
+            raise PermissionDenied
+        return redirect_to_login(request.get_full_path())
+    return HttpResponse(
+        stats.prometheus_text(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,407 @@
+"""
+Module: analytics.py
+
+Contains the sales history analyses served by the analytics API and the
+``analyse_sales`` management command.
+
+Over a range of days, an analysis gives:
+- the revenue, units and sales of every day, with their moving averages;
+- the distribution of basket sizes (units per sale);
+- the velocity (units sold per day), sell-through rate and days of cover
+  of the best selling items.
+
+Engines:
+- NumpyAnalytics: reads the sale and line columns in chunks into NumPy
+  arrays (the lines straight from the cursor, without the ORM's per-value
+  conversions) and sums them with ``bincount``, so memory grows with the
+  number of days, items and sales, not of lines.
+- PythonAnalytics: the same figures from per-object loops over the
+  sales and their lines, used when NumPy is not installed.
+
+``get_engine()`` returns the NumPy engine when NumPy is installed.
+"""
+
+# Standard library imports
+import math
+import statistics
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+# Django core imports
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+# Third-party packages
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Local app imports
+from store.models import Item
+from transactions.models import Sale, SaleDetail
+
+# Rows read from the database at a time.
+CHUNK_SIZE = 10000
+
+# Days averaged by the moving averages, and best sellers listed.
+DEFAULT_WINDOW = 7
+DEFAULT_LIMIT = 50
+
+# Percentile of basket sizes reported besides the median.
+BASKET_PERCENTILE = 0.9
+
+
+def sales_between(start, end):
+    """
+    Returns the sales made between the local dates ``start`` and ``end``,
+    both included.
+    """
+    return Sale.objects.filter(
+        date_added__gte=timezone.make_aware(datetime.combine(start, time())),
+        date_added__lt=timezone.make_aware(
+            datetime.combine(end + timedelta(days=1), time())
+        ),
+    )
+
+
+def lines_between(start, end):
+    """
+    Returns the lines of the sales made between ``start`` and ``end``.
+    """
+    return SaleDetail.objects.filter(sale__in=sales_between(start, end))
+
+
+def chunks(queryset, size=CHUNK_SIZE):
+    """
+    Yields the rows of ``queryset`` as lists of at most ``size`` rows.
+    """
+    rows = queryset.iterator(chunk_size=size)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def nearest_rank(ordered, quantile):
+    """
+    Returns the ``quantile`` of the sorted values ``ordered``.
+    """
+    return ordered[max(math.ceil(quantile * len(ordered)) - 1, 0)]
+
+
+class PythonAnalytics:
+    """
+    Analyses the sales with per-object loops over the sales and lines.
+    """
+    name = 'python'
+
+    def analyse(self, start, end, window=DEFAULT_WINDOW,
+                limit=DEFAULT_LIMIT):
+        """
+        Returns the analysis of the sales between ``start`` and ``end``
+        as a JSON serializable dict.
+        """
+        days = (end - start).days + 1
+        revenue, units, sales, baskets, items = self.totals(start, end, days)
+        top = self.best_sellers(items, limit)
+        stock = {
+            pk: (name, quantity)
+            for pk, name, quantity in Item.objects.filter(
+                pk__in=[pk for pk, _, _ in top]
+            ).values_list('pk', 'name', 'quantity')
+        }
+        return {
+            'engine': self.name,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'window': window,
+            'daily': {
+                'dates': [
+                    (start + timedelta(days=day)).isoformat()
+                    for day in range(days)
+                ],
+                'sales': [int(count) for count in sales],
+                'units': [int(count) for count in units],
+                'revenue': [round(float(total), 2) for total in revenue],
+                'units_average': [
+                    round(float(average), 2)
+                    for average in self.moving_average(units, window)
+                ],
+                'revenue_average': [
+                    round(float(average), 2)
+                    for average in self.moving_average(revenue, window)
+                ],
+            },
+            'baskets': self.basket_sizes(baskets),
+            'items': [
+                self.item_row(pk, *stock[pk], units, revenue, days)
+                for pk, units, revenue in top
+                if pk in stock
+            ],
+        }
+
+    def totals(self, start, end, days):
+        """
+        Returns the revenue, units and number of sales of every day, the
+        units of every sale and the ``(units, revenue)`` of every item.
+        """
+        revenue = [0.0] * days
+        units = [0] * days
+        sales = [0] * days
+        sale_days = {}
+        for sale in sales_between(start, end).only('date_added').iterator(
+            chunk_size=CHUNK_SIZE
+        ):
+            day = (timezone.localdate(sale.date_added) - start).days
+            sale_days[sale.pk] = day
+            sales[day] += 1
+
+        baskets = dict.fromkeys(sale_days, 0)
+        items = defaultdict(lambda: [0, 0.0])
+        lines = lines_between(start, end).only(
+            'sale_id', 'item_id', 'quantity', 'total_detail'
+        )
+        for line in lines.iterator(chunk_size=CHUNK_SIZE):
+            if line.sale_id not in sale_days:
+                continue
+            day = sale_days[line.sale_id]
+            total = float(line.total_detail)
+            revenue[day] += total
+            units[day] += line.quantity
+            baskets[line.sale_id] += line.quantity
+            items[line.item_id][0] += line.quantity
+            items[line.item_id][1] += total
+        return revenue, units, sales, list(baskets.values()), items
+
+    def moving_average(self, values, window):
+        """
+        Returns the trailing ``window`` day averages of ``values``; the
+        first days average the days there are.
+        """
+        averages = []
+        total = 0
+        for day, value in enumerate(values):
+            total += value
+            if day >= window:
+                total -= values[day - window]
+            averages.append(total / min(day + 1, window))
+        return averages
+
+    def basket_sizes(self, baskets):
+        """
+        Returns the statistics and distribution of the units per sale.
+        """
+        if not baskets:
+            return {
+                'sales': 0, 'mean': 0, 'median': 0, 'p90': 0,
+                'distribution': [],
+            }
+        ordered = sorted(baskets)
+        counts = defaultdict(int)
+        for size in ordered:
+            counts[size] += 1
+        return {
+            'sales': len(ordered),
+            'mean': round(statistics.fmean(ordered), 2),
+            'median': float(statistics.median(ordered)),
+            'p90': int(nearest_rank(ordered, BASKET_PERCENTILE)),
+            'distribution': [
+                {'units': size, 'sales': count}
+                for size, count in counts.items()
+            ],
+        }
+
+    def best_sellers(self, items, limit):
+        """
+        Returns the ``(item id, units, revenue)`` of the ``limit`` items
+        that sold the most units.
+        """
+        ranked = sorted(
+            (pair for pair in items.items() if pair[1][0]),
+            key=lambda pair: (-pair[1][0], pair[0]),
+        )
+        return [
+            (pk, units, revenue) for pk, (units, revenue) in ranked[:limit]
+        ]
+
+    def item_row(self, pk, name, stock, units, revenue, days):
+        """
+        Returns the figures of one best seller. The sell-through rate is
+        the share of the units sold out of those sold and left in stock.
+        """
+        stock = max(stock, 0)
+        velocity = units / days
+        return {
+            'id': int(pk),
+            'name': name,
+            'units': int(units),
+            'revenue': round(float(revenue), 2),
+            'stock': stock,
+            'velocity': round(float(velocity), 3),
+            'sell_through': round(float(units / (units + stock)), 4),
+            'days_of_cover': round(float(stock / velocity), 1),
+        }
+
+
+class NumpyAnalytics(PythonAnalytics):
+    """
+    Analyses the sales with NumPy over columns read in chunks.
+    """
+    name = 'numpy'
+
+    def totals(self, start, end, days):
+        # The instants local days start at, so that sales are put in
+        # their day by a binary search whatever the time zone.
+        midnights = numpy.array([
+            timezone.make_aware(
+                datetime.combine(start + timedelta(days=day), time())
+            ).timestamp()
+            for day in range(days + 1)
+        ])
+        sale_ids = []
+        sale_days = []
+        rows = (
+            sales_between(start, end)
+            .values_list('pk', 'date_added')
+            .order_by('pk')
+        )
+        for chunk in chunks(rows):
+            sale_ids.append(
+                numpy.fromiter((pk for pk, _ in chunk), numpy.int64)
+            )
+            instants = numpy.fromiter(
+                (added.timestamp() for _, added in chunk), numpy.float64
+            )
+            sale_days.append(
+                numpy.searchsorted(midnights, instants, side='right') - 1
+            )
+        sale_ids = numpy.concatenate(sale_ids or [[]]).astype(numpy.int64)
+        sale_days = numpy.concatenate(sale_days or [[]]).astype(numpy.int64)
+
+        revenue = numpy.zeros(days)
+        units = numpy.zeros(days)
+        baskets = numpy.zeros(len(sale_ids))
+        item_units = numpy.zeros(0)
+        item_revenue = numpy.zeros(0)
+        lines = lines_between(start, end).values_list(
+            'sale_id', 'item_id', 'quantity',
+            Cast('total_detail', FloatField()),
+        ).order_by()
+        for columns in self.columns(lines) if len(sale_ids) else ():
+            line_sales = columns[:, 0].astype(numpy.int64)
+            # Sales made since they were read are left out.
+            positions = numpy.searchsorted(sale_ids, line_sales)
+            positions[positions == len(sale_ids)] = 0
+            known = sale_ids[positions] == line_sales
+            positions = positions[known]
+            item_ids = columns[known, 1].astype(numpy.int64)
+            quantities = columns[known, 2]
+            line_totals = columns[known, 3]
+
+            line_days = sale_days[positions]
+            revenue += numpy.bincount(
+                line_days, weights=line_totals, minlength=days
+            )
+            units += numpy.bincount(
+                line_days, weights=quantities, minlength=days
+            )
+            baskets += numpy.bincount(
+                positions, weights=quantities, minlength=len(sale_ids)
+            )
+            item_units = self.add(
+                item_units, numpy.bincount(item_ids, weights=quantities)
+            )
+            item_revenue = self.add(
+                item_revenue, numpy.bincount(item_ids, weights=line_totals)
+            )
+
+        sales = numpy.bincount(sale_days, minlength=days)
+        return (
+            revenue, units.astype(numpy.int64), sales,
+            baskets.astype(numpy.int64), (item_units, item_revenue),
+        )
+
+    @staticmethod
+    def columns(queryset, size=CHUNK_SIZE):
+        """
+        Yields the numeric rows of ``queryset`` as arrays of at most
+        ``size`` rows. They are read with a plain (server-side where
+        supported) cursor, skipping the ORM's per-value conversions.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(size):
+                yield numpy.array(rows, dtype=numpy.float64)
+
+    @staticmethod
+    def add(total, values):
+        """
+        Returns the sum of two arrays of possibly different lengths.
+        """
+        if len(values) > len(total):
+            total, values = values, total
+        total[:len(values)] += values
+        return total
+
+    def moving_average(self, values, window):
+        sums = numpy.cumsum(values, dtype=numpy.float64)
+        sums[window:] = sums[window:] - sums[:-window]
+        return sums / numpy.minimum(numpy.arange(1, len(sums) + 1), window)
+
+    def basket_sizes(self, baskets):
+        if not len(baskets):
+            return super().basket_sizes([])
+        ordered = numpy.sort(baskets)
+        sizes, counts = numpy.unique(ordered, return_counts=True)
+        return {
+            'sales': len(ordered),
+            'mean': round(float(ordered.mean()), 2),
+            'median': float(numpy.median(ordered)),
+            'p90': int(nearest_rank(ordered, BASKET_PERCENTILE)),
+            'distribution': [
+                {'units': size, 'sales': count}
+                for size, count in zip(sizes.tolist(), counts.tolist())
+            ],
+        }
+
+    def best_sellers(self, items, limit):
+        units, revenue = items
+        sold = numpy.flatnonzero(units)
+        top = sold[numpy.lexsort((sold, -units[sold]))][:limit]
+        return list(zip(
+            top.tolist(), units[top].tolist(), revenue[top].tolist()
+        ))
+
+
+ENGINES = {
+    PythonAnalytics.name: PythonAnalytics,
+    NumpyAnalytics.name: NumpyAnalytics,
+}
+
+
+def get_engine(name=None):
+    """
+    Returns the engine called ``name``, by default the NumPy engine when
+    NumPy is installed and the Python one otherwise.
+    """
+    if name is None:
+        name = NumpyAnalytics.name if numpy else PythonAnalytics.name
+    if name == NumpyAnalytics.name and numpy is None:
+        raise ImproperlyConfigured(
+            'The numpy analytics engine needs NumPy, from '
+            'requirements-production.txt.'
+        )
+    return ENGINES[name]()
+
+
+def analyse(start, end, window=DEFAULT_WINDOW, limit=DEFAULT_LIMIT,
+            engine=None):
+    """
+    Returns the analysis of the sales between ``start`` and ``end`` made
+    by ``engine`` (see ``get_engine``).
+    """
+    return get_engine(engine).analyse(start, end, window, limit)
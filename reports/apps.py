@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ReportsConfig(AppConfig):
+    """Configuration for the Reports application."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reports'
+
+    def ready(self):
+        import reports.signals
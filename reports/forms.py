@@ -0,0 +1,148 @@
+"""
+Module: forms.py
+
+Contains the forms validating the parameters of the sales reports.
+
+- TopSalesForm: The best sellers (or best customers) of one period.
+- SalesTrendForm: The sales of the best keys over a range of periods.
+- AnalyticsForm: The range of days analysed by the analytics API.
+"""
+
+# Standard library imports
+from datetime import timedelta
+
+# Django core imports
+from django import forms
+from django.utils import timezone
+
+# Local app imports
+from store import metrics
+from .analytics import DEFAULT_LIMIT, DEFAULT_WINDOW
+from .models import PERIOD_CHOICES
+from .rollups import CATEGORY, CUSTOMER, ITEM
+
+DIMENSION_CHOICES = [
+    (ITEM, 'Items'), (CATEGORY, 'Categories'), (CUSTOMER, 'Customers'),
+]
+
+# Rows shown by default, and the most that can be asked for.
+DEFAULT_ROWS = 20
+MAX_ROWS = 100
+
+# Periods shown by default by the trend report, and the most it shows.
+TREND_PERIODS = 12
+MAX_TREND_PERIODS = 60
+
+# Days analysed by default by the analytics API, and the most it analyses.
+ANALYTICS_DAYS = 90
+MAX_ANALYTICS_DAYS = 731
+MAX_WINDOW = 90
+
+
+class ReportForm(forms.Form):
+    """
+    Base form of the reports: what sales are broken down by, per which
+    period, and how many rows are shown.
+    """
+    dimension = forms.ChoiceField(choices=DIMENSION_CHOICES, required=False)
+    period = forms.ChoiceField(choices=PERIOD_CHOICES, required=False)
+    limit = forms.IntegerField(
+        min_value=1, max_value=MAX_ROWS, required=False
+    )
+
+    default_period = metrics.MONTH
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data['dimension'] = cleaned_data.get('dimension') or ITEM
+        cleaned_data['period'] = (
+            cleaned_data.get('period') or self.default_period
+        )
+        cleaned_data['limit'] = cleaned_data.get('limit') or DEFAULT_ROWS
+        return cleaned_data
+
+
+class TopSalesForm(ReportForm):
+    """
+    A form selecting the period containing ``date`` (today by default).
+    """
+    date = forms.DateField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        day = cleaned_data.get('date') or timezone.localdate()
+        cleaned_data['start'] = metrics.bucket_start(
+            day, cleaned_data['period']
+        )
+        return cleaned_data
+
+
+class SalesTrendForm(ReportForm):
+    """
+    A form selecting the periods between ``start`` and ``end``, the last
+    ``TREND_PERIODS`` weeks by default.
+    """
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+
+    default_period = metrics.WEEK
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        period = cleaned_data['period']
+        end = cleaned_data.get('end') or timezone.localdate()
+        start = cleaned_data.get('start')
+        if start is None:
+            start = end
+            for _ in range(TREND_PERIODS - 1):
+                start = metrics.bucket_start(start, period) - timedelta(1)
+        if start > end:
+            raise forms.ValidationError('The start is after the end.')
+        start = metrics.bucket_start(start, period)
+        if metrics.bucket_count(start, end, period) > MAX_TREND_PERIODS:
+            raise forms.ValidationError(
+                f'The range holds more than {MAX_TREND_PERIODS} '
+                f'{period}s; use a longer period.'
+            )
+        cleaned_data.update(start=start, end=end)
+        return cleaned_data
+
+
+class AnalyticsForm(forms.Form):
+    """
+    A form selecting the days between ``start`` and ``end`` (the last
+    ``ANALYTICS_DAYS`` by default), the days averaged by the moving
+    averages and the number of best sellers listed.
+    """
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    window = forms.IntegerField(
+        min_value=1, max_value=MAX_WINDOW, required=False
+    )
+    limit = forms.IntegerField(
+        min_value=1, max_value=MAX_ROWS, required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        end = cleaned_data.get('end') or timezone.localdate()
+        start = cleaned_data.get('start') or (
+            end - timedelta(days=ANALYTICS_DAYS - 1)
+        )
+        if start > end:
+            raise forms.ValidationError('The start is after the end.')
+        if (end - start).days >= MAX_ANALYTICS_DAYS:
+            raise forms.ValidationError(
+                f'The range holds more than {MAX_ANALYTICS_DAYS} days.'
+            )
+        cleaned_data.update(
+            start=start,
+            end=end,
+            window=cleaned_data.get('window') or DEFAULT_WINDOW,
+            limit=cleaned_data.get('limit') or DEFAULT_LIMIT,
+        )
+        return cleaned_data
@@ -0,0 +1,53 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.analytics import ENGINES, analyse
+from reports.forms import AnalyticsForm
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the analysis of the sales between --start and --end as JSON: '
+        'daily figures with their moving averages, basket sizes and the '
+        'velocity and sell-through of the best selling items.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', help='First day analysed (ISO date).',
+        )
+        parser.add_argument(
+            '--end', help='Last day analysed (ISO date), today by default.',
+        )
+        parser.add_argument(
+            '--window', type=int,
+            help='Days averaged by the moving averages.',
+        )
+        parser.add_argument(
+            '--limit', type=int, help='Best selling items listed.',
+        )
+        parser.add_argument(
+            '--engine', choices=sorted(ENGINES),
+            help='Engine used, numpy when NumPy is installed by default.',
+        )
+        parser.add_argument('--indent', type=int, default=2)
+
+    def handle(self, *args, **options):
+        form = AnalyticsForm({
+            name: options[name]
+            for name in ('start', 'end', 'window', 'limit')
+            if options[name] is not None
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        data = form.cleaned_data
+        try:
+            result = analyse(
+                data['start'], data['end'], data['window'], data['limit'],
+                engine=options['engine'],
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        self.stdout.write(json.dumps(result, indent=options['indent']))
@@ -0,0 +1,89 @@
+import math
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from reports.analytics import NumpyAnalytics, PythonAnalytics, numpy
+from store.sample_data import MODELS, SampleData, scaled_counts
+
+
+def same(first, second):
+    """
+    Returns whether two analyses match, up to the rounding of sums made
+    in a different order.
+    """
+    if isinstance(first, dict):
+        return first.keys() == second.keys() and all(
+            same(first[key], second[key]) for key in first
+            if key != 'engine'
+        )
+    if isinstance(first, list):
+        return len(first) == len(second) and all(map(same, first, second))
+    if isinstance(first, float) or isinstance(second, float):
+        return math.isclose(first, second, rel_tol=1e-9, abs_tol=0.011)
+    return first == second
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the NumPy sales analytics against the per-object Python '
+        'loops on generated data sets of each of --scales sales. The data '
+        'is generated inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', nargs='+', type=int, default=[10000, 100000],
+            help='Numbers of sales benchmarked.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Days the sales are spread over, all analysed.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Analyses timed per engine and scale.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if numpy is None:
+            raise CommandError('NumPy is not installed.')
+        end = timezone.localdate()
+        start = end - timedelta(days=options['days'] - 1)
+        engines = [PythonAnalytics(), NumpyAnalytics()]
+
+        self.stdout.write(
+            f'{"sales":>9}  {"engine":<10}{"median s":>10}{"speedup":>9}'
+            f'{"same":>6}'
+        )
+        with transaction.atomic():
+            generator = SampleData(seed=options['seed'], days=options['days'])
+            generated = dict.fromkeys(MODELS, 0)
+            for scale in sorted(set(options['scales'])):
+                wanted = scaled_counts(scale)
+                generator.generate({
+                    name: wanted[name] - generated[name] for name in MODELS
+                })
+                generated = wanted
+
+                baseline = None
+                for engine in engines:
+                    timings = []
+                    for _ in range(options['repeat']):
+                        began = time.perf_counter()
+                        result = engine.analyse(start, end)
+                        timings.append(time.perf_counter() - began)
+                    seconds = statistics.median(timings)
+                    if baseline is None:
+                        baseline = (seconds, result)
+                    self.stdout.write(
+                        f'{scale:>9}  {engine.name:<10}{seconds:>10.3f}'
+                        f'{baseline[0] / seconds:>8.1f}x'
+                        f'{"yes" if same(baseline[1], result) else "NO":>6}'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reports.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the item, category and customer sales rollups behind '
+        'the reports from the sale lines.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild()
+        self.stdout.write(self.style.SUCCESS('Sales reports rebuilt.'))
@@ -0,0 +1,140 @@
+# Generated by Django 5.1 on 2026-10-18 13:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DateField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Trunc
+
+PERIODS = ('day', 'week', 'month')
+
+BATCH_SIZE = 2000
+
+
+def sales_totals(apps, dimension, period):
+    """
+    Returns the sales of every key of ``dimension`` per ``period``, as
+    dicts of ``start``, ``key_id``, ``revenue``, ``units`` and ``count``.
+    """
+    Sale = apps.get_model('transactions', 'Sale')
+    SaleDetail = apps.get_model('transactions', 'SaleDetail')
+    if dimension == 'customer':
+        units = (
+            SaleDetail.objects.filter(sale=OuterRef('pk'))
+            .values('sale').annotate(units=Sum('quantity')).values('units')
+        )
+        return Sale.objects.annotate(
+            sale_units=Coalesce(Subquery(units), 0)
+        ).values(
+            start=Trunc('date_added', period, output_field=DateField()),
+            key_id=F('customer'),
+        ).annotate(
+            revenue=Sum('grand_total'),
+            units=Sum('sale_units'),
+            count=Count('pk'),
+        ).order_by()
+
+    key = 'item' if dimension == 'item' else 'item__category'
+    return SaleDetail.objects.values(
+        start=Trunc('sale__date_added', period, output_field=DateField()),
+        key_id=F(key),
+    ).annotate(
+        revenue=Sum('total_detail'),
+        units=Sum('quantity'),
+        count=Count('sale', distinct=True),
+    ).order_by()
+
+
+def populate_rollups(apps, schema_editor):
+    """
+    Computes the rollups of the existing sales. A frozen copy of
+    ``reports.rollups.rebuild``.
+    """
+    for dimension, model_name in (
+        ('item', 'ItemSales'),
+        ('category', 'CategorySales'),
+        ('customer', 'CustomerSales'),
+    ):
+        model = apps.get_model('reports', model_name)
+        key = f'{dimension}_id'
+        for period in PERIODS:
+            batch = []
+            rows = sales_totals(apps, dimension, period)
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(model(
+                    period=period,
+                    start=row['start'],
+                    revenue=row['revenue'],
+                    quantity=row['units'],
+                    sales_count=row['count'],
+                    **{key: row['key_id']},
+                ))
+                if len(batch) == BATCH_SIZE:
+                    model.objects.bulk_create(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0004_profile_picture_variants'),
+        ('store', '0007_daily_sales_updated_at'),
+        ('transactions', '0006_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='store.category')),
+            ],
+            options={
+                'verbose_name_plural': 'Category sales',
+                'indexes': [models.Index(fields=['period', 'start', '-revenue', 'category'], name='category_sales_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'start', 'category'), name='category_sales_period_category')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.customer')),
+            ],
+            options={
+                'verbose_name_plural': 'Customer sales',
+                'indexes': [models.Index(fields=['period', 'start', '-revenue', 'customer'], name='customer_sales_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'start', 'customer'), name='customer_sales_period_customer')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='store.item')),
+            ],
+            options={
+                'verbose_name_plural': 'Item sales',
+                'indexes': [models.Index(fields=['period', 'start', '-revenue', 'item'], name='item_sales_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'start', 'item'), name='item_sales_period_item')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,127 @@
+"""
+Module: models.py
+
+Contains the sales rollups the reports are read from.
+
+This module defines the following classes:
+- SalesRollup: Abstract base of the rollups: the sales of one item,
+  category or customer over one day, week or month.
+- ItemSales: Represents the sales of an item over a period.
+- CategorySales: Represents the sales of a category over a period.
+- CustomerSales: Represents the purchases of a customer over a period.
+
+The rows are kept in step with sales by ``reports.rollups``.
+"""
+
+from django.db import models
+
+from accounts.models import Customer
+from store.metrics import DAY, MONTH, WEEK
+from store.models import Category, Item
+
+PERIOD_CHOICES = [(DAY, 'Day'), (WEEK, 'Week'), (MONTH, 'Month')]
+
+
+class SalesRollup(models.Model):
+    """
+    Abstract base of the sales rollups.
+
+    ``start`` is the first day of the period (a Monday for weeks). The
+    revenue of items and categories is the sum of their sale lines, before
+    tax; that of customers is the sum of their sales' grand totals.
+    ``sales_count`` counts the sales the item, category or customer was
+    part of.
+    """
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantity = models.BigIntegerField(default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ItemSales(SalesRollup):
+    """
+    Represents the sales of an item over a day, week or month.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+
+    def __str__(self):
+        """
+        String representation of the rollup.
+        """
+        return f"Item {self.item_id}, {self.period} of {self.start}"
+
+    class Meta:
+        verbose_name_plural = 'Item sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'start', 'item'],
+                name='item_sales_period_item',
+            ),
+        ]
+        indexes = [
+            # Best sellers of a period, read in order.
+            models.Index(
+                fields=['period', 'start', '-revenue', 'item'],
+                name='item_sales_top_idx',
+            ),
+        ]
+
+
+class CategorySales(SalesRollup):
+    """
+    Represents the sales of a category over a day, week or month.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+
+    def __str__(self):
+        """
+        String representation of the rollup.
+        """
+        return f"Category {self.category_id}, {self.period} of {self.start}"
+
+    class Meta:
+        verbose_name_plural = 'Category sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'start', 'category'],
+                name='category_sales_period_category',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['period', 'start', '-revenue', 'category'],
+                name='category_sales_top_idx',
+            ),
+        ]
+
+
+class CustomerSales(SalesRollup):
+    """
+    Represents the purchases of a customer over a day, week or month.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+
+    def __str__(self):
+        """
+        String representation of the rollup.
+        """
+        return f"Customer {self.customer_id}, {self.period} of {self.start}"
+
+    class Meta:
+        verbose_name_plural = 'Customer sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'start', 'customer'],
+                name='customer_sales_period_customer',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['period', 'start', '-revenue', 'customer'],
+                name='customer_sales_top_idx',
+            ),
+        ]
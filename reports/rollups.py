@@ -0,0 +1,208 @@
+"""
+Module: rollups.py
+
+Keeps the sales rollups behind the reports in step with sales.
+
+Every sale adds to the day, week and month of its local date: the units
+and line totals of each item it sold and of each category sold from, and
+the units and grand total of its customer. ``record_sale`` is called by
+``transactions.services.commit_sale`` inside the sale's transaction, and
+``remove_sale`` by the ``pre_delete`` handler of sales. Either runs two
+queries per rollup table however many lines the sale has: a bulk insert
+of the missing rows (skipping those that exist) and a single ``UPDATE``
+adding to every row with ``F()``, so concurrent sales never lose each
+other's changes.
+
+``rebuild`` recomputes every rollup from the sale lines with one grouped
+query per table and period. It is used by the ``rebuild_reports``
+management command and after data is loaded in bulk; the initial
+migration runs a frozen copy of it.
+Lines count towards the category their item is in when this runs, which
+may differ from the one it was in when the sale was recorded.
+"""
+
+# Standard library imports
+import operator
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+
+# Django core imports
+from django.apps import apps as global_apps
+from django.db.models import (
+    Case, Count, DateField, DecimalField, F, IntegerField, OuterRef, Q,
+    Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+# Local app imports
+from store.metrics import BUCKETS, bucket_start
+
+ITEM = 'item'
+CATEGORY = 'category'
+CUSTOMER = 'customer'
+
+# The rollup model of each dimension the reports break sales down by.
+DIMENSIONS = {
+    ITEM: 'ItemSales',
+    CATEGORY: 'CategorySales',
+    CUSTOMER: 'CustomerSales',
+}
+
+PERIODS = BUCKETS
+
+# Rows written per bulk insert by ``rebuild``.
+BATCH_SIZE = 2000
+
+
+def rollup_model(dimension, apps=global_apps):
+    """
+    Returns the rollup model of ``dimension``.
+    """
+    return apps.get_model('reports', DIMENSIONS[dimension])
+
+
+def record_sale(sale, lines, sign=1):
+    """
+    Adds ``sale`` to the rollups. ``lines`` are its ``(item_id,
+    category_id, quantity, total)`` tuples. With a ``sign`` of -1 the sale
+    is taken out instead.
+    """
+    day = timezone.localdate(sale.date_added)
+    totals = {
+        ITEM: defaultdict(lambda: [0, 0]),
+        CATEGORY: defaultdict(lambda: [0, 0]),
+    }
+    units = 0
+    for item_id, category_id, quantity, total in lines:
+        for dimension, key in ((ITEM, item_id), (CATEGORY, category_id)):
+            totals[dimension][key][0] += Decimal(str(total))
+            totals[dimension][key][1] += quantity
+        units += quantity
+    totals[CUSTOMER] = {
+        sale.customer_id: [Decimal(str(sale.grand_total)), units]
+    }
+
+    for dimension, by_key in totals.items():
+        _add(dimension, {
+            (period, bucket_start(day, period), key): (
+                sign * revenue, sign * quantity, sign
+            )
+            for period in PERIODS
+            for key, (revenue, quantity) in by_key.items()
+        })
+
+
+def remove_sale(sale):
+    """
+    Takes ``sale`` out of the rollups, before it is deleted.
+    """
+    lines = sale.saledetail_set.values_list(
+        'item_id', 'item__category_id', 'quantity', 'total_detail'
+    )
+    record_sale(sale, list(lines), sign=-1)
+
+
+def _add(dimension, deltas):
+    """
+    Adds the ``(revenue, quantity, sales count)`` deltas, keyed by
+    ``(period, start, key)``, to the rollup rows of ``dimension``.
+    """
+    if not deltas:
+        return
+    model = rollup_model(dimension)
+    key = f'{dimension}_id'
+    model.objects.bulk_create(
+        [
+            model(period=period, start=start, **{key: key_id})
+            for period, start, key_id in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    matches = [
+        (Q(period=period, start=start, **{key: key_id}), delta)
+        for (period, start, key_id), delta in deltas.items()
+    ]
+
+    def added(name, index, output_field):
+        return F(name) + Case(
+            *(
+                When(match, then=Value(delta[index]))
+                for match, delta in matches
+            ),
+            default=Value(0),
+            output_field=output_field,
+        )
+
+    model.objects.filter(
+        reduce(operator.or_, (match for match, _ in matches))
+    ).update(
+        revenue=added(
+            'revenue', 0, DecimalField(max_digits=14, decimal_places=2)
+        ),
+        quantity=added('quantity', 1, IntegerField()),
+        sales_count=added('sales_count', 2, IntegerField()),
+    )
+
+
+def _totals(apps, dimension, period):
+    """
+    Returns the sales of every key of ``dimension`` per ``period``, as
+    dicts of ``start``, ``key_id``, ``revenue``, ``units`` and ``count``.
+    """
+    Sale = apps.get_model('transactions', 'Sale')
+    SaleDetail = apps.get_model('transactions', 'SaleDetail')
+    if dimension == CUSTOMER:
+        units = (
+            SaleDetail.objects.filter(sale=OuterRef('pk'))
+            .values('sale').annotate(units=Sum('quantity')).values('units')
+        )
+        return Sale.objects.annotate(
+            sale_units=Coalesce(Subquery(units), 0)
+        ).values(
+            start=Trunc('date_added', period, output_field=DateField()),
+            key_id=F('customer'),
+        ).annotate(
+            revenue=Sum('grand_total'),
+            units=Sum('sale_units'),
+            count=Count('pk'),
+        ).order_by()
+
+    key = 'item' if dimension == ITEM else 'item__category'
+    return SaleDetail.objects.values(
+        start=Trunc('sale__date_added', period, output_field=DateField()),
+        key_id=F(key),
+    ).annotate(
+        revenue=Sum('total_detail'),
+        units=Sum('quantity'),
+        count=Count('sale', distinct=True),
+    ).order_by()
+
+
+def rebuild(apps=global_apps):
+    """
+    Recomputes every rollup from the sale lines.
+
+    ``apps`` lets data migrations pass their historical app registry.
+    """
+    for dimension in DIMENSIONS:
+        model = rollup_model(dimension, apps)
+        key = f'{dimension}_id'
+        model.objects.all().delete()
+        for period in PERIODS:
+            batch = []
+            rows = _totals(apps, dimension, period)
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(model(
+                    period=period,
+                    start=row['start'],
+                    revenue=row['revenue'],
+                    quantity=row['units'],
+                    sales_count=row['count'],
+                    **{key: row['key_id']},
+                ))
+                if len(batch) == BATCH_SIZE:
+                    model.objects.bulk_create(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
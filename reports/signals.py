@@ -0,0 +1,14 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from transactions.models import Sale
+from . import rollups
+
+
+@receiver(pre_delete, sender=Sale)
+def remove_sale_from_reports(sender, instance, **kwargs):
+    """
+    Signal to take a sale out of the report rollups before it and its
+    lines are deleted.
+    """
+    rollups.remove_sale(instance)
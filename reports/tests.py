@@ -0,0 +1,254 @@
+import io
+import json
+import unittest
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Customer
+from store import metrics
+from store.models import Category, Item
+from transactions.models import Sale
+from transactions.services import commit_sale
+from . import analytics, rollups
+from .models import CategorySales, CustomerSales, ItemSales
+
+
+def rollup_rows():
+    """
+    Returns every non-empty rollup row, comparable across rebuilds.
+    """
+    return {
+        dimension: sorted(
+            rollups.rollup_model(dimension).objects
+            .exclude(sales_count=0)
+            .values_list(
+                'period', 'start', f'{dimension}_id', 'revenue',
+                'quantity', 'sales_count',
+            )
+        )
+        for dimension in rollups.DIMENSIONS
+    }
+
+
+class SalesTestCase(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='Jane', last_name='Doe'
+        )
+        groceries = Category.objects.create(name='Groceries')
+        drinks = Category.objects.create(name='Drinks')
+        self.bread = Item.objects.create(
+            name='Bread', category=groceries, quantity=100, price=2
+        )
+        self.milk = Item.objects.create(
+            name='Milk', category=groceries, quantity=100, price=3
+        )
+        self.tea = Item.objects.create(
+            name='Tea', category=drinks, quantity=100, price=5
+        )
+
+    def sell(self, *lines):
+        cart = [
+            {'id': item.pk, 'price': float(item.price), 'quantity': quantity,
+             'total_item': float(item.price) * quantity}
+            for item, quantity in lines
+        ]
+        total = sum(line['total_item'] for line in cart)
+        return commit_sale({
+            'customer': self.customer, 'sub_total': total,
+            'grand_total': total, 'amount_paid': total, 'amount_change': 0,
+        }, cart)
+
+
+class RollupTests(SalesTestCase):
+
+    def test_sale_updates_rollups(self):
+        self.sell((self.bread, 2), (self.milk, 1))
+        self.sell((self.bread, 1), (self.tea, 2))
+        start = metrics.bucket_start(timezone.localdate(), metrics.MONTH)
+
+        bread = ItemSales.objects.get(
+            period=metrics.MONTH, start=start, item=self.bread
+        )
+        self.assertEqual(
+            (bread.revenue, bread.quantity, bread.sales_count), (6, 3, 2)
+        )
+        groceries = CategorySales.objects.get(
+            period=metrics.DAY, start=timezone.localdate(),
+            category=self.bread.category,
+        )
+        self.assertEqual(
+            (groceries.revenue, groceries.quantity, groceries.sales_count),
+            (9, 4, 2),
+        )
+        customer = CustomerSales.objects.get(
+            period=metrics.WEEK, customer=self.customer
+        )
+        self.assertEqual(
+            (customer.revenue, customer.quantity, customer.sales_count),
+            (19, 6, 2),
+        )
+
+        incremental = rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(rollup_rows(), incremental)
+
+    def test_deleted_sale_is_taken_out(self):
+        kept = self.sell((self.bread, 2))
+        removed = self.sell((self.bread, 1), (self.tea, 1))
+        Sale.objects.get(pk=removed.pk).delete()
+
+        rows = rollup_rows()
+        self.assertEqual(
+            [row[2:] for row in rows[rollups.ITEM]],
+            [(self.bread.pk, 4, 2, 1)] * 3,
+        )
+        self.assertEqual(
+            [row[3:] for row in rows[rollups.CUSTOMER]],
+            [(kept.grand_total, 2, 1)] * 3,
+        )
+        rollups.rebuild()
+        self.assertEqual(rollup_rows(), rows)
+
+    def test_rebuild_reports_command(self):
+        self.sell((self.milk, 1))
+        ItemSales.objects.all().delete()
+        call_command('rebuild_reports', stdout=io.StringIO())
+        self.assertEqual(
+            ItemSales.objects.filter(item=self.milk).count(),
+            len(rollups.PERIODS),
+        )
+
+    def test_migration_backfill_matches_rebuild(self):
+        self.sell((self.bread, 2), (self.tea, 1))
+        self.sell((self.milk, 1))
+        rows = rollup_rows()
+        for dimension in rollups.DIMENSIONS:
+            rollups.rollup_model(dimension).objects.all().delete()
+        migration = import_module('reports.migrations.0001_initial')
+        migration.populate_rollups(django_apps, None)
+        self.assertEqual(rollup_rows(), rows)
+
+
+class ReportViewTests(SalesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('jane'))
+
+    def test_top_sales_are_ordered_by_revenue(self):
+        self.sell((self.bread, 1), (self.tea, 3))
+        self.sell((self.milk, 2))
+        response = self.client.get(reverse('report-top-sales'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['label'] for row in response.context['rows']],
+            ['Tea', 'Milk', 'Bread'],
+        )
+
+        response = self.client.get(
+            reverse('report-top-sales'),
+            {'dimension': rollups.CATEGORY, 'limit': 1},
+        )
+        self.assertEqual(
+            [row['label'] for row in response.context['rows']], ['Drinks']
+        )
+
+    def test_sales_trend(self):
+        self.sell((self.bread, 1))
+        today = timezone.localdate()
+        response = self.client.get(reverse('report-sales-trend'), {
+            'dimension': rollups.CUSTOMER, 'period': metrics.DAY,
+            'start': (today - timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        [row] = response.context['rows']
+        self.assertEqual(row['label'], 'Jane Doe')
+        self.assertEqual(row['values'], [0, 0, 2])
+
+    def test_invalid_range_is_reported(self):
+        response = self.client.get(reverse('report-sales-trend'), {
+            'start': '2024-02-01', 'end': '2024-01-01',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'The start is after the end.')
+
+
+class AnalyticsTests(SalesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.sell((self.bread, 2), (self.milk, 1))
+        yesterday = self.sell((self.bread, 1))
+        Sale.objects.filter(pk=yesterday.pk).update(
+            date_added=timezone.now() - timedelta(days=1)
+        )
+        self.sell((self.tea, 4), (self.bread, 1))
+
+    def analyse(self, engine):
+        return analytics.analyse(
+            self.today - timedelta(days=2), self.today, window=2,
+            engine=engine,
+        )
+
+    def test_python_engine(self):
+        result = self.analyse('python')
+        self.assertEqual(result['daily']['sales'], [0, 1, 2])
+        self.assertEqual(result['daily']['units'], [0, 1, 8])
+        self.assertEqual(result['daily']['revenue'], [0, 2, 29])
+        self.assertEqual(result['daily']['revenue_average'], [0, 1, 15.5])
+        self.assertEqual(result['baskets']['distribution'], [
+            {'units': 1, 'sales': 1}, {'units': 3, 'sales': 1},
+            {'units': 5, 'sales': 1},
+        ])
+        self.assertEqual(result['baskets']['median'], 3)
+        # Ties are broken by id.
+        bread, tea, milk = result['items']
+        self.assertEqual((tea['name'], tea['units']), ('Tea', 4))
+        self.assertEqual((bread['units'], bread['revenue']), (4, 8))
+        self.assertEqual(bread['stock'], 96)
+        self.assertEqual(bread['velocity'], round(4 / 3, 3))
+        self.assertEqual(bread['sell_through'], 0.04)
+        self.assertEqual(milk['days_of_cover'], 297)
+
+    @unittest.skipIf(analytics.numpy is None, 'NumPy is not installed')
+    def test_numpy_engine_matches_python(self):
+        python = self.analyse('python')
+        result = self.analyse('numpy')
+        self.assertEqual(result.pop('engine'), 'numpy')
+        python.pop('engine')
+        self.assertEqual(result, python)
+
+    def test_api(self):
+        self.client.force_login(User.objects.create_user('jane'))
+        response = self.client.get(reverse('report-analytics'), {
+            'start': (self.today - timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['daily']['sales'], [0, 1, 2])
+
+        response = self.client.get(reverse('report-analytics'), {
+            'start': '2020-01-01',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command(
+            'analyse_sales', '--engine', 'python', '--limit', '1',
+            stdout=out,
+        )
+        result = json.loads(out.getvalue())
+        self.assertEqual(len(result['daily']['dates']), 90)
+        self.assertEqual(
+            [item['name'] for item in result['items']], ['Bread']
+        )
@@ -0,0 +1,12 @@
+# Django core imports
+from django.urls import path
+
+# Local app imports
+from .views import sales_analytics, sales_trend, top_sales
+
+# URL patterns
+urlpatterns = [
+    path('', top_sales, name='report-top-sales'),
+    path('trend/', sales_trend, name='report-sales-trend'),
+    path('analytics/', sales_analytics, name='report-analytics'),
+]
@@ -0,0 +1,152 @@
+# Standard library imports
+from datetime import timedelta
+
+# Django core imports
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+# Authentication and permissions
+from django.contrib.auth.decorators import login_required
+
+# Local app imports
+from store import metrics
+from . import analytics
+from .forms import (
+    DIMENSION_CHOICES, AnalyticsForm, SalesTrendForm, TopSalesForm,
+)
+from .models import PERIOD_CHOICES
+from .rollups import CUSTOMER, rollup_model
+
+
+def label(dimension, obj):
+    """
+    Returns the name shown for an item, category or customer.
+    """
+    if dimension == CUSTOMER:
+        return ' '.join(filter(None, [obj.first_name, obj.last_name]))
+    return obj.name
+
+
+def report_context(form, **context):
+    return {
+        'form': form,
+        'dimensions': DIMENSION_CHOICES,
+        'periods': PERIOD_CHOICES,
+        'data': form.cleaned_data if form.is_valid() else {},
+        **context,
+    }
+
+
+@login_required
+@require_GET
+def top_sales(request):
+    """
+    Render the best selling items or categories, or the best customers,
+    of a day, week or month.
+
+    The rows are read from the rollups in the order of their index, so the
+    page costs the same however many sales the period holds.
+    """
+    form = TopSalesForm(request.GET)
+    if not form.is_valid():
+        return render(request, 'reports/top_sales.html', report_context(form))
+
+    data = form.cleaned_data
+    dimension = data['dimension']
+    period = data['period']
+    start = data['start']
+    rollups = (
+        rollup_model(dimension).objects
+        .filter(period=period, start=start)
+        .select_related(dimension)
+        .order_by('-revenue', f'{dimension}_id')[:data['limit']]
+    )
+    rows = [
+        {
+            'label': label(dimension, getattr(rollup, dimension)),
+            'revenue': rollup.revenue,
+            'quantity': rollup.quantity,
+            'sales_count': rollup.sales_count,
+        }
+        for rollup in rollups
+    ]
+    return render(request, 'reports/top_sales.html', report_context(
+        form,
+        rows=rows,
+        start=start,
+        end=metrics.next_bucket_start(start, period) - timedelta(days=1),
+        previous=metrics.bucket_start(start - timedelta(days=1), period),
+        next=metrics.next_bucket_start(start, period),
+    ))
+
+
+@login_required
+@require_GET
+def sales_trend(request):
+    """
+    Render the revenue of the best selling items or categories, or of the
+    best customers, over a range of days, weeks or months, one column per
+    period.
+    """
+    form = SalesTrendForm(request.GET)
+    if not form.is_valid():
+        return render(
+            request, 'reports/sales_trend.html', report_context(form)
+        )
+
+    data = form.cleaned_data
+    dimension = data['dimension']
+    period = data['period']
+    model = rollup_model(dimension)
+    in_range = model.objects.filter(
+        period=period, start__gte=data['start'], start__lte=data['end']
+    )
+    best = list(
+        in_range.values_list(dimension)
+        .annotate(total=Sum('revenue'))
+        .order_by('-total', f'{dimension}_id')[:data['limit']]
+    )
+    keys = [key for key, _ in best]
+    revenue = {
+        (key, start): value
+        for key, start, value in in_range.filter(
+            **{f'{dimension}__in': keys}
+        ).values_list(dimension, 'start', 'revenue')
+    }
+    related_model = model._meta.get_field(dimension).related_model
+    labels = {
+        obj.pk: label(dimension, obj)
+        for obj in related_model.objects.filter(pk__in=keys)
+    }
+    columns = metrics.bucket_starts(data['start'], data['end'], period)
+    rows = [
+        {
+            'label': labels[key],
+            'total': total,
+            'values': [revenue.get((key, column), 0) for column in columns],
+        }
+        for key, total in best
+    ]
+    return render(request, 'reports/sales_trend.html', report_context(
+        form, rows=rows, columns=columns,
+    ))
+
+
+@login_required
+@require_GET
+def sales_analytics(request):
+    """
+    Serves the analysis of the sales between ``start`` and ``end`` (ISO
+    dates) as JSON: daily figures with their ``window`` day moving
+    averages, basket sizes and the velocity and sell-through of the
+    ``limit`` best selling items.
+    """
+    form = AnalyticsForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+    return JsonResponse(analytics.analyse(
+        data['start'], data['end'], data['window'], data['limit']
+    ))
@@ -32,6 +32,7 @@ class ItemAdmin(admin.ModelAdmin):
     search_fields = ('name', 'category__name', 'vendor__name')
     list_filter = ('category', 'vendor')
     ordering = ('name',)
+    list_select_related = ('category', 'vendor')
 
 
 class DeliveryAdmin(admin.ModelAdmin):
@@ -45,6 +46,7 @@ class DeliveryAdmin(admin.ModelAdmin):
     search_fields = ('item__name', 'customer_name')
     list_filter = ('is_delivered', 'date')
     ordering = ('-date',)
+    list_select_related = ('item__category',)
 
 
 admin.site.register(Category, CategoryAdmin)
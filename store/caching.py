@@ -0,0 +1,187 @@
+"""
+Module: caching.py
+
+Contains the cache layer in front of the sale screen's autocomplete
+endpoints (``get_items`` and ``get_customers``).
+
+Results are stored per namespace (``items``, ``customers``) under the
+normalised search prefix the cashier typed, in the cache named by the
+``AUTOCOMPLETE_CACHE_ALIAS`` setting (``autocomplete`` by default). Entries
+expire after the cache's ``TIMEOUT``; the local-memory backend evicts the
+least recently used entry once ``MAX_ENTRIES`` is reached, and Redis does
+the same with an ``allkeys-lru`` eviction policy.
+
+Each namespace carries a version number that is part of every key.
+``invalidate()`` bumps it, which orphans all of the namespace's entries at
+once; the orphans are then evicted or expire on their own. The ``Item``,
+``Category`` and ``Customer`` signal handlers call it on every save and
+delete.
+
+Hits and misses are counted per namespace in the same cache and reported
+by ``stats()`` and the ``autocomplete_cache_stats`` management command.
+
+``acached_results()`` is the version of ``cached_results()`` for async
+views, using the cache's async API.
+"""
+
+# Standard library imports
+import hashlib
+import time
+
+# Django core imports
+from django.conf import settings
+from django.core.cache import caches
+
+ITEMS = 'items'
+CUSTOMERS = 'customers'
+NAMESPACES = (ITEMS, CUSTOMERS)
+
+KEY_PREFIX = 'autocomplete'
+
+
+def get_cache():
+    """
+    Returns the cache holding autocomplete results.
+    """
+    alias = getattr(settings, 'AUTOCOMPLETE_CACHE_ALIAS', 'autocomplete')
+    return caches[alias]
+
+
+def normalize(term):
+    """
+    Returns ``term`` lowercased with its whitespace collapsed, so that
+    "Rice  " and "rice" share a cache entry.
+    """
+    return ' '.join(term.lower().split())
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:{namespace}:version'
+
+
+def _counter_key(namespace, counter):
+    return f'{KEY_PREFIX}:{namespace}:{counter}'
+
+
+def _version(cache, namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Versions start from the clock rather than 1, so that a version
+        # lost to eviction or a restart cannot bring back entries written
+        # under an earlier one.
+        cache.add(_version_key(namespace), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(namespace), 0)
+    return version
+
+
+async def _aversion(cache, namespace):
+    version = await cache.aget(_version_key(namespace))
+    if version is None:
+        await cache.aadd(
+            _version_key(namespace), time.time_ns(), timeout=None
+        )
+        version = await cache.aget(_version_key(namespace), 0)
+    return version
+
+
+def _incr(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The counter does not exist yet (or was evicted).
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _aincr(cache, key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def result_key(namespace, term, version):
+    """
+    Returns the cache key of the results for ``term``.
+
+    The normalised term is hashed so that keys stay short and free of
+    characters some cache backends reject.
+    """
+    digest = hashlib.md5(normalize(term).encode()).hexdigest()
+    return f'{KEY_PREFIX}:{namespace}:v{version}:{digest}'
+
+
+def cached_results(namespace, term, compute):
+    """
+    Returns the autocomplete results for ``term`` in ``namespace``,
+    calling ``compute(term)`` and caching what it returns on a miss.
+    """
+    cache = get_cache()
+    key = result_key(namespace, term, _version(cache, namespace))
+    results = cache.get(key)
+    if results is not None:
+        _incr(cache, _counter_key(namespace, 'hits'))
+        return results
+
+    _incr(cache, _counter_key(namespace, 'misses'))
+    results = compute(term)
+    cache.set(key, results)
+    return results
+
+
+async def acached_results(namespace, term, compute):
+    """
+    Returns the autocomplete results for ``term`` in ``namespace``,
+    awaiting ``compute(term)`` and caching what it returns on a miss.
+    """
+    cache = get_cache()
+    key = result_key(namespace, term, await _aversion(cache, namespace))
+    results = await cache.aget(key)
+    if results is not None:
+        await _aincr(cache, _counter_key(namespace, 'hits'))
+        return results
+
+    await _aincr(cache, _counter_key(namespace, 'misses'))
+    results = await compute(term)
+    await cache.aset(key, results)
+    return results
+
+
+def invalidate(namespace):
+    """
+    Drops every cached result of ``namespace``.
+    """
+    cache = get_cache()
+    _version(cache, namespace)
+    _incr(cache, _version_key(namespace))
+
+
+def stats(namespaces=NAMESPACES):
+    """
+    Returns the hit and miss counters of each namespace, keyed by
+    namespace, along with the hit ratio.
+    """
+    cache = get_cache()
+    report = {}
+    for namespace in namespaces:
+        hits = cache.get(_counter_key(namespace, 'hits'), 0)
+        misses = cache.get(_counter_key(namespace, 'misses'), 0)
+        lookups = hits + misses
+        report[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+        }
+    return report
+
+
+def reset_stats(namespaces=NAMESPACES):
+    """
+    Sets the hit and miss counters of each namespace back to zero.
+    """
+    get_cache().delete_many([
+        _counter_key(namespace, counter)
+        for namespace in namespaces
+        for counter in ('hits', 'misses')
+    ])
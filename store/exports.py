@@ -0,0 +1,300 @@
+"""
+Module: exports.py
+
+Contains the streaming export engine and the exports for store models.
+
+Exports iterate the database with ``QuerySet.iterator(chunk_size=...)`` and
+``select_related`` so memory use stays flat no matter how many rows are
+exported:
+
+- CSV is streamed to the client row by row through a
+  ``StreamingHttpResponse``.
+- XLSX is not streamed as it is generated, since ``openpyxl`` saves the
+  workbook's ZIP archive into a seekable file. The rows go through a
+  write-only workbook, which keeps them in temporary files rather than in
+  memory, and the whole workbook is saved to a ``TemporaryFile`` before
+  the response starts. The finished file is then sent in blocks through a
+  ``FileResponse``, so the client waits for the last row before the first
+  byte arrives.
+
+Each export is a ``StreamingExport`` subclass declaring its model, columns,
+the date field used by the ``start``/``end`` query parameters and the
+query parameters it accepts as filters. List views get the exports through
+``StreamingExportMixin``, which answers ``?_export=csv|xlsx`` requests.
+"""
+
+# Standard library imports
+import csv
+import datetime
+import tempfile
+from decimal import Decimal
+from operator import attrgetter
+
+# Django core imports
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.http import (
+    FileResponse, HttpResponseBadRequest, StreamingHttpResponse
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+# Third-party packages
+from openpyxl import Workbook
+
+# Local app imports
+from .models import Delivery, Item
+
+CSV = 'csv'
+XLSX = 'xlsx'
+FORMATS = (CSV, XLSX)
+
+BOOLEAN_VALUES = {
+    'true': True, '1': True, 'yes': True,
+    'false': False, '0': False, 'no': False,
+}
+
+# Values written to XLSX cells as-is; anything else is written as text.
+XLSX_TYPES = (
+    int, float, Decimal, str, datetime.date, datetime.time
+)
+
+XLSX_CONTENT_TYPE = (
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+)
+
+
+class Echo:
+    """
+    File-like object that hands written values straight back, so that
+    ``csv.writer`` can be used to produce streamed lines.
+    """
+
+    def write(self, value):
+        return value
+
+
+class StreamingExport:
+    """
+    Base class for streamed exports of a model.
+
+    Attributes:
+    - model: The model being exported.
+    - columns: ``(header, accessor)`` pairs; an accessor is a dotted
+      attribute path or a callable taking the object.
+    - filename: File name of the export, without extension.
+    - sheet_title: Title of the XLSX worksheet.
+    - select_related: Relations joined into the export query.
+    - date_field: Field filtered by the ``start``/``end`` parameters.
+    - filters: Mapping of accepted query parameters to model fields.
+    - ordering: Ordering of the exported rows.
+    - chunk_size: Rows fetched from the database per round trip.
+    """
+
+    model = None
+    columns = ()
+    filename = 'export'
+    sheet_title = 'Export'
+    select_related = ()
+    date_field = None
+    filters = {}
+    ordering = ('pk',)
+    chunk_size = 2000
+
+    def __init__(self, params=None):
+        self.params = params or {}
+        self.accessors = [
+            accessor if callable(accessor) else attrgetter(accessor)
+            for _, accessor in self.columns
+        ]
+
+    def get_queryset(self):
+        """
+        Returns the exported rows, filtered by the request parameters.
+
+        Raises ``ValidationError`` for malformed parameters.
+        """
+        queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+
+        if self.date_field:
+            start = self._parse_day('start')
+            end = self._parse_day('end')
+            if start:
+                queryset = queryset.filter(**{
+                    f'{self.date_field}__gte': self._day_start(start)
+                })
+            if end:
+                queryset = queryset.filter(**{
+                    f'{self.date_field}__lt': self._day_start(
+                        end + datetime.timedelta(days=1)
+                    )
+                })
+
+        for param, field_name in self.filters.items():
+            value = self.params.get(param)
+            if value not in (None, ''):
+                queryset = queryset.filter(
+                    **{field_name: self._clean(field_name, value)}
+                )
+
+        return queryset.order_by(*self.ordering)
+
+    def _clean(self, field_name, value):
+        field = self.model._meta.get_field(field_name)
+        if field.is_relation:
+            field = field.target_field
+        if isinstance(field, models.BooleanField):
+            try:
+                return BOOLEAN_VALUES[value.lower()]
+            except KeyError:
+                raise ValidationError(f'Invalid {field_name}: {value}')
+        return field.to_python(value)
+
+    def _parse_day(self, param):
+        value = self.params.get(param)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError(f'Invalid {param} date: {value}')
+        return day
+
+    @staticmethod
+    def _day_start(day):
+        return timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time.min)
+        )
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def rows(self, queryset):
+        """
+        Yields one list of cell values per exported object.
+        """
+        for obj in queryset.iterator(chunk_size=self.chunk_size):
+            yield [accessor(obj) for accessor in self.accessors]
+
+    def csv_response(self, queryset):
+        """
+        Returns the rows as CSV, written as the response is sent.
+        """
+        writer = csv.writer(Echo())
+
+        def lines():
+            yield writer.writerow(self.headers)
+            for row in self.rows(queryset):
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(lines(), content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename={self.filename}.csv'
+        )
+        return response
+
+    def xlsx_response(self, queryset):
+        """
+        Returns the rows as an XLSX file, built in full in a temporary file
+        before the response is returned.
+        """
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(title=self.sheet_title)
+        worksheet.append(self.headers)
+        for row in self.rows(queryset):
+            worksheet.append([self._xlsx_value(value) for value in row])
+
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'{self.filename}.xlsx',
+            content_type=XLSX_CONTENT_TYPE,
+        )
+
+    @staticmethod
+    def _xlsx_value(value):
+        if isinstance(value, datetime.datetime) and value.tzinfo:
+            # Excel cannot store timezone-aware datetimes.
+            return timezone.localtime(value).replace(tzinfo=None)
+        if value is None or isinstance(value, XLSX_TYPES):
+            return value
+        return str(value)
+
+    def response(self, export_format):
+        """
+        Returns the export in the requested format, or a 400 response
+        when the format or the parameters are invalid.
+        """
+        if export_format not in FORMATS:
+            return HttpResponseBadRequest(
+                f'Unsupported export format: {export_format}'
+            )
+        try:
+            queryset = self.get_queryset()
+        except ValidationError as e:
+            return HttpResponseBadRequest('; '.join(e.messages))
+        if export_format == CSV:
+            return self.csv_response(queryset)
+        return self.xlsx_response(queryset)
+
+
+class StreamingExportMixin:
+    """
+    Serves ``?_export=<format>`` requests of a list view from its
+    ``export_class`` before any of the page itself is built.
+    """
+
+    export_class = None
+    export_trigger_param = '_export'
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get(self.export_trigger_param)
+        if export_format:
+            return self.export_class(request.GET).response(export_format)
+        return super().get(request, *args, **kwargs)
+
+
+class ItemExport(StreamingExport):
+    model = Item
+    filename = 'items'
+    sheet_title = 'Items'
+    select_related = ('category', 'vendor')
+    date_field = 'expiring_date'
+    filters = {'category': 'category', 'vendor': 'vendor'}
+    ordering = ('name', 'pk')
+    columns = (
+        ('ID', 'id'),
+        ('Name', 'name'),
+        ('Category', 'category.name'),
+        ('Quantity', 'quantity'),
+        ('Price', 'price'),
+        ('Expiring Date', 'expiring_date'),
+        ('Vendor', lambda item: item.vendor.name if item.vendor else ''),
+    )
+
+
+class DeliveryExport(StreamingExport):
+    model = Delivery
+    filename = 'deliveries'
+    sheet_title = 'Deliveries'
+    select_related = ('item',)
+    date_field = 'date'
+    filters = {'item': 'item', 'is_delivered': 'is_delivered'}
+    ordering = ('date', 'pk')
+    columns = (
+        ('ID', 'id'),
+        ('Item', lambda d: d.item.name if d.item else ''),
+        ('Customer', 'customer_name'),
+        ('Phone Number', lambda d: str(d.phone_number or '')),
+        ('Location', 'location'),
+        ('Date', 'date'),
+        ('Is Delivered', 'is_delivered'),
+    )
@@ -1,4 +1,9 @@
+from datetime import timedelta
+
 from django import forms
+from django.utils import timezone
+
+from . import metrics
 from .models import Item, Category, Delivery
 
 
@@ -43,6 +48,30 @@ class ItemForm(forms.ModelForm):
         }
 
 
+class ItemUpdateForm(ItemForm):
+    """
+    A form for updating an Item, remembering the quantity it was shown
+    with so that a typed quantity is applied as the change from it.
+    """
+    shown_quantity = forms.IntegerField(
+        widget=forms.HiddenInput, required=False
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['shown_quantity'].initial = self.instance.quantity
+
+    def quantity_change(self):
+        """
+        Returns how far the typed quantity moves the stock from the
+        quantity the form was shown with.
+        """
+        shown = self.cleaned_data.get('shown_quantity')
+        if shown is None:
+            shown = self.initial['quantity']
+        return self.cleaned_data['quantity'] - shown
+
+
 class CategoryForm(forms.ModelForm):
     """
     A form for creating or updating category.
@@ -100,3 +129,58 @@ class DeliveryForm(forms.ModelForm):
                 'label': 'Mark as delivered',
             }),
         }
+
+
+class ItemImportForm(forms.Form):
+    """
+    A form for uploading a product catalogue to import.
+    """
+    file = forms.FileField(
+        label='CSV or Excel file',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx',
+        }),
+    )
+    dry_run = forms.BooleanField(
+        label='Preview the changes without saving them',
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+
+class SalesChartForm(forms.Form):
+    """
+    A form validating the window and bucket size requested from the sales
+    chart API. The window defaults to the last ``SALES_CHART_DAYS`` days
+    and its start is moved back to the start of its bucket.
+    """
+    bucket = forms.ChoiceField(
+        choices=[(bucket, bucket) for bucket in metrics.BUCKETS],
+        required=False,
+    )
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        bucket = cleaned_data.get('bucket') or metrics.DAY
+        end = cleaned_data.get('end') or timezone.localdate()
+        start = cleaned_data.get('start') or (
+            end - timedelta(days=metrics.SALES_CHART_DAYS - 1)
+        )
+        if start > end:
+            raise forms.ValidationError('The start is after the end.')
+        start = metrics.bucket_start(start, bucket)
+        if metrics.bucket_count(start, end, bucket) > (
+            metrics.MAX_CHART_BUCKETS
+        ):
+            raise forms.ValidationError(
+                f'The window holds more than {metrics.MAX_CHART_BUCKETS} '
+                f'{bucket}s; use a larger bucket.'
+            )
+        cleaned_data.update(bucket=bucket, start=start, end=end)
+        return cleaned_data
@@ -0,0 +1,97 @@
+"""
+Module: fragments.py
+
+Contains the versions the cached template fragments are keyed on.
+
+The sidebar and the dashboard widgets are wrapped in ``{% cache %}`` tags
+and stored in the ``template_fragments`` cache (which the tag uses when it
+is configured). Besides what a fragment varies on (the user, their role,
+the current page), its key holds the version of the data it shows:
+
+- ``PROFILES``: the sidebar's profile card (name, picture and role),
+  bumped when a user or profile is saved or deleted.
+- ``DASHBOARD``: the dashboard's counters, expiring stock and category
+  chart, bumped when the dashboard counters or the stock lots change.
+
+``invalidate()`` bumps a version once the current transaction commits,
+which orphans the fragments rendered from the old data; they are then
+evicted or expire on their own. Versions start from the clock, as in
+``store.caching``, so a version lost to eviction or a restart cannot bring
+back fragments written under an earlier one.
+
+The ``fragments`` context processor hands the versions and the timeout to
+every template; the versions are only read from the cache when a template
+asks for them.
+"""
+
+# Standard library imports
+import time
+
+# Django core imports
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+PROFILES = 'profiles'
+DASHBOARD = 'dashboard'
+NAMESPACES = (PROFILES, DASHBOARD)
+
+KEY_PREFIX = 'fragments'
+
+# The cache alias the ``{% cache %}`` tag stores fragments in.
+CACHE_ALIAS = 'template_fragments'
+
+
+def get_cache():
+    """
+    Returns the cache holding template fragments and their versions.
+    """
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:{namespace}:version'
+
+
+def versions():
+    """
+    Returns the current version of every namespace, keyed by namespace,
+    with a single cache lookup when they all exist.
+    """
+    cache = get_cache()
+    keys = {_version_key(namespace): namespace for namespace in NAMESPACES}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, time.time_ns(), timeout=None)
+        found[key] = cache.get(key, 0)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _bump(namespace):
+    cache = get_cache()
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The version does not exist yet (or was evicted).
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate(namespace):
+    """
+    Drops the cached fragments of ``namespace`` once the current
+    transaction (if any) commits.
+    """
+    transaction.on_commit(lambda: _bump(namespace))
+
+
+def fragments(request):
+    """
+    Context processor handing templates ``fragment_versions`` and
+    ``fragment_timeout`` for their ``{% cache %}`` tags.
+    """
+    return {
+        'fragment_versions': SimpleLazyObject(versions),
+        'fragment_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
+    }
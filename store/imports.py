@@ -0,0 +1,510 @@
+"""
+Module: imports.py
+
+Contains the bulk product import pipeline.
+
+``ItemImport`` loads a CSV or XLSX catalogue into ``Item`` in batches:
+
+- ``read_rows`` streams the file row by row (a ``csv`` reader or a
+  read-only ``openpyxl`` workbook), and rows are handled ``batch_size`` at
+  a time, so memory use does not grow with the file.
+- Categories and vendors are resolved by name from lookup tables loaded
+  once per import; unknown ones are created.
+- Rows are matched to existing items by ``ID``, or else by name. Each
+  batch runs one query for its matches, one ``bulk_create`` (with slugs
+  allocated up front by ``store.slugs.allocate_slugs``) and one
+  ``bulk_update``.
+- Quantities are recorded in the stock ledger as adjustments. Bulk writes
+  send no model signals, so the dashboard counters, the search index and
+  the autocomplete cache are updated here instead.
+
+The whole import runs in one transaction. Rows that fail validation are
+skipped and reported with their line number. With ``dry_run`` nothing is
+written and the report lists the changes the import would make.
+
+The columns are those of ``ItemExport`` plus an optional ``Description``,
+so an exported file can be edited and imported back. Headers are matched
+case-insensitively and columns other than ``Name`` and ``Category`` may
+be left out.
+"""
+
+# Standard library imports
+import csv
+import datetime
+import io
+import math
+import os
+from collections import Counter
+from itertools import islice
+
+# Django core imports
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# Third-party packages
+from openpyxl import load_workbook
+
+# Local app imports
+from accounts.models import Vendor
+from transactions import ledger, lots
+from transactions.models import StockLot, StockMovement
+from . import caching, metrics, search
+from .exports import CSV, XLSX
+from .models import Category, Item
+from .slugs import allocate_slugs
+
+FORMATS = (CSV, XLSX)
+
+COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'category': 'category',
+    'quantity': 'quantity',
+    'price': 'price',
+    'expiring date': 'expiring_date',
+    'vendor': 'vendor',
+}
+
+# Fields written by ``bulk_update``; quantities go through the ledger.
+UPDATE_FIELDS = (
+    'name', 'description', 'category', 'price', 'expiring_date', 'vendor'
+)
+
+IMPORT_NOTE = 'Import'
+
+
+def file_format(filename):
+    """
+    Returns the import format of ``filename`` from its extension.
+
+    Raises ``ValidationError`` for unsupported files.
+    """
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension not in FORMATS:
+        raise ValidationError(
+            f'Unsupported file type: {filename} (use .csv or .xlsx)'
+        )
+    return extension
+
+
+def read_rows(file, import_format):
+    """
+    Yields ``(line_number, row)`` for every data row of ``file``, a binary
+    file object, where ``row`` maps the known column fields to the raw
+    cell values.
+    """
+    if import_format == CSV:
+        reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig'))
+    else:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        reader = workbook.worksheets[0].iter_rows(values_only=True)
+
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [
+        COLUMNS.get(str(title or '').strip().lower()) for title in header
+    ]
+    if 'name' not in fields:
+        raise ValidationError('The file has no "Name" column.')
+
+    for line_number, values in enumerate(reader, start=2):
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield line_number, {
+            field: value
+            for field, value in zip(fields, values)
+            if field is not None
+        }
+
+
+def _describe(value):
+    # Categories and vendors are shown by name.
+    return getattr(value, 'name', value)
+
+
+class ImportReport:
+    """
+    The outcome of an import.
+
+    Attributes:
+    - created / updated / unchanged: Item counts.
+    - categories_created / vendors_created: Names of the created records.
+    - errors: ``(line_number, message)`` of every rejected row.
+    - changes: Lines describing the first ``max_changes`` changes.
+    - dry_run: Whether nothing was written.
+    """
+
+    def __init__(self, dry_run=False, max_changes=100):
+        self.dry_run = dry_run
+        self.max_changes = max_changes
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.categories_created = []
+        self.vendors_created = []
+        self.errors = []
+        self.changes = []
+
+    def add_change(self, line_number, description):
+        if len(self.changes) < self.max_changes:
+            self.changes.append(f'line {line_number}: {description}')
+
+    @property
+    def summary(self):
+        verb = 'Would create' if self.dry_run else 'Created'
+        return (
+            f'{verb} {self.created} items, '
+            f'{"would update" if self.dry_run else "updated"} '
+            f'{self.updated}, {self.unchanged} unchanged, '
+            f'{len(self.errors)} rows rejected.'
+        )
+
+
+class ItemImport:
+    """
+    Imports items from rows produced by ``read_rows``.
+
+    Attributes:
+    - batch_size: Rows handled, and written, per batch.
+    - dry_run: Report the changes without writing them.
+    """
+
+    def __init__(self, batch_size=1000, dry_run=False, max_changes=100):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.report = ImportReport(dry_run, max_changes)
+        self.categories = {}
+        self.vendors = {}
+        # Items created by this import, for rows matched by name in later
+        # batches of a dry run, where they are never saved.
+        self.created_by_name = {}
+        # Items created by this import and saved, which later rows update
+        # without counting them as updated.
+        self.created_ids = set()
+
+    def run(self, rows):
+        """
+        Imports ``rows`` and returns the ``ImportReport``.
+        """
+        self.categories = self._lookup_table(Category)
+        self.vendors = self._lookup_table(Vendor)
+        rows = iter(rows)
+        with transaction.atomic():
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch)
+            if not self.dry_run and (
+                self.report.created or self.report.updated
+            ):
+                transaction.on_commit(
+                    lambda: caching.invalidate(caching.ITEMS)
+                )
+        self.report.errors.sort()
+        return self.report
+
+    @staticmethod
+    def _lookup_table(model):
+        # The first record of each name (case-insensitively) wins.
+        table = {}
+        for record in model.objects.order_by('-pk').only('id', 'name'):
+            table[record.name.strip().lower()] = record
+        return table
+
+    def _import_batch(self, batch):
+        parsed = []
+        for line_number, row in batch:
+            try:
+                parsed.append((line_number, self._parse(row)))
+            except ValidationError as e:
+                self.report.errors.append(
+                    (line_number, '; '.join(e.messages))
+                )
+        self._create_related(parsed, 'category', Category, self.categories,
+                             self.report.categories_created)
+        self._create_related(parsed, 'vendor', Vendor, self.vendors,
+                             self.report.vendors_created)
+
+        ids = {values['id'] for _, values in parsed if values.get('id')}
+        names = {
+            values['name'] for _, values in parsed if not values.get('id')
+        }
+        by_id = {}
+        by_name = {}
+        if ids or names:
+            matches = Item.objects.select_related('category', 'vendor')
+            matches = matches.filter(Q(pk__in=ids) | Q(name__in=names))
+            for item in matches.order_by('pk'):
+                by_id[item.pk] = item
+                by_name.setdefault(item.name, item)
+        by_name.update(self.created_by_name)
+
+        created = []
+        updated = {}
+        # The quantity each existing item should end up with.
+        quantities = {}
+        for line_number, values in parsed:
+            if values.get('id'):
+                item = by_id.get(values['id'])
+                if item is None:
+                    self.report.errors.append(
+                        (line_number, f'No item with ID {values["id"]}.')
+                    )
+                    continue
+            else:
+                item = by_name.get(values['name'])
+
+            if item is None:
+                if 'category' not in values:
+                    self.report.errors.append(
+                        (line_number, 'New items need a category.')
+                    )
+                    continue
+                item = self._new_item(values)
+                created.append(item)
+                by_name[item.name] = item
+                self.report.created += 1
+                self.report.add_change(
+                    line_number,
+                    f'create {item.name!r} ({item.quantity} at {item.price})',
+                )
+                continue
+
+            changes = self._apply(item, values)
+            current = quantities.get(item.pk, item.quantity)
+            quantity = values.get('quantity', current)
+            if quantity != current:
+                changes.append(f'quantity {current} -> {quantity}')
+                if item.pk is None:
+                    # A new item named again further down the file.
+                    item.quantity = quantity
+                else:
+                    quantities[item.pk] = quantity
+            if not changes:
+                self.report.unchanged += 1
+                continue
+            if item.pk is not None:
+                if item.pk not in updated and (
+                    item.pk not in self.created_ids
+                ):
+                    self.report.updated += 1
+                updated[item.pk] = item
+            self.report.add_change(
+                line_number, f'update {item.name!r}: ' + ', '.join(changes)
+            )
+
+        if self.dry_run:
+            self.created_by_name.update(
+                (item.name, item) for item in created
+            )
+            return
+        self._write(created, list(updated.values()), quantities)
+
+    def _write(self, created, updated, quantities):
+        allocate_slugs(created)
+        Item.objects.bulk_create(created, batch_size=self.batch_size)
+        self.created_ids.update(item.pk for item in created)
+        if updated:
+            Item.objects.bulk_update(
+                updated, UPDATE_FIELDS, batch_size=self.batch_size
+            )
+
+        # New items are saved with their opening quantity, which is only
+        # logged and put in a lot; changes to existing items are applied
+        # by the ledger.
+        opening = [(item, item.quantity) for item in created if item.quantity]
+        if opening:
+            ledger.log_adjustments(opening, note=IMPORT_NOTE)
+            StockLot.objects.bulk_create(
+                [
+                    lots.lot_for(item, quantity, item.expiring_date)
+                    for item, quantity in opening
+                    if quantity > 0
+                ],
+                batch_size=self.batch_size,
+            )
+            metrics.bump(
+                metrics.ITEMS_QUANTITY,
+                sum(quantity for _, quantity in opening),
+            )
+        loaded = {item.pk: item.quantity for item in updated}
+        ledger.record_movements([
+            StockMovement(
+                item_id=pk, kind=ledger.ADJUSTMENT,
+                quantity=quantity - loaded[pk], note=IMPORT_NOTE,
+            )
+            for pk, quantity in quantities.items()
+        ])
+
+        if created:
+            metrics.bump(metrics.ITEMS, len(created))
+        category_counts = Counter(item.category_id for item in created)
+        for item in updated:
+            loaded_category_id = getattr(item, '_loaded_category_id', None)
+            if loaded_category_id not in (None, item.category_id):
+                category_counts[loaded_category_id] -= 1
+                category_counts[item.category_id] += 1
+        for category_id, delta in category_counts.items():
+            if delta:
+                metrics.bump(metrics.category_key(category_id), delta)
+
+        search.get_backend().index(created + updated)
+
+    def _new_item(self, values):
+        return Item(
+            name=values['name'],
+            description=values.get('description', ''),
+            category=values['category'],
+            quantity=values.get('quantity', 0),
+            price=values.get('price', 0),
+            expiring_date=values.get('expiring_date'),
+            vendor=values.get('vendor'),
+        )
+
+    @staticmethod
+    def _apply(item, values):
+        """
+        Sets the imported values on ``item`` and describes what changed,
+        leaving the quantity to the caller.
+        """
+        changes = []
+        for field in UPDATE_FIELDS:
+            if field not in values:
+                continue
+            old = getattr(item, field)
+            new = values[field]
+            if old != new:
+                changes.append(
+                    f'{field} {_describe(old)} -> {_describe(new)}'
+                )
+                setattr(item, field, new)
+        return changes
+
+    def _create_related(self, parsed, field, model, table, created_names):
+        """
+        Replaces the names in ``field`` with records from ``table``,
+        creating the missing ones in one ``bulk_create``.
+        """
+        missing = {}
+        for _, values in parsed:
+            name = values.get(field)
+            if name and name.lower() not in table:
+                missing.setdefault(name.lower(), model(name=name))
+        if missing:
+            records = list(missing.values())
+            created_names.extend(record.name for record in records)
+            if not self.dry_run:
+                allocate_slugs(records)
+                model.objects.bulk_create(records)
+                if model is Category:
+                    for record in records:
+                        metrics.bump(
+                            metrics.category_key(record.pk), 0,
+                            label=record.name,
+                        )
+            table.update(missing)
+        for _, values in parsed:
+            if field in values:
+                name = values[field]
+                values[field] = table[name.lower()] if name else None
+
+    def _parse(self, row):
+        """
+        Returns the cleaned values of ``row``, keyed by field name.
+
+        Raises ``ValidationError`` for invalid values.
+        """
+        values = {}
+        errors = []
+        text = {
+            field: str(value).strip() if value is not None else ''
+            for field, value in row.items()
+        }
+
+        if text.get('id'):
+            try:
+                values['id'] = int(self._parse_number(text['id']))
+                _, highest = connection.ops.integer_field_range(
+                    Item._meta.pk.get_internal_type()
+                )
+                if not 0 < values['id'] <= highest:
+                    raise ValueError
+            except (ValueError, OverflowError):
+                errors.append(f'Invalid ID: {text["id"]}')
+        values['name'] = text.get('name', '')
+        if not values['name']:
+            errors.append('Name is required.')
+        elif len(values['name']) > Item._meta.get_field('name').max_length:
+            errors.append(f'Name is too long: {values["name"]}')
+        if 'description' in text:
+            values['description'] = text['description']
+        if text.get('category'):
+            values['category'] = text['category']
+        if 'vendor' in text:
+            values['vendor'] = text['vendor']
+
+        if text.get('quantity'):
+            try:
+                quantity = self._parse_number(text['quantity'])
+                if quantity < 0 or quantity != int(quantity):
+                    raise ValueError
+                values['quantity'] = int(quantity)
+            except (ValueError, OverflowError):
+                errors.append(f'Invalid quantity: {text["quantity"]}')
+        if text.get('price'):
+            try:
+                values['price'] = self._parse_number(text['price'])
+                if values['price'] < 0:
+                    raise ValueError
+            except (ValueError, OverflowError):
+                errors.append(f'Invalid price: {text["price"]}')
+        if 'expiring_date' in row:
+            try:
+                values['expiring_date'] = self._parse_date(
+                    row['expiring_date']
+                )
+            except ValueError:
+                errors.append(
+                    f'Invalid expiring date: {text["expiring_date"]}'
+                )
+
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    @staticmethod
+    def _parse_number(text):
+        """
+        Returns ``text`` as a float, raising ``ValueError`` for anything
+        but a finite number ("inf", "nan", "1e400").
+        """
+        number = float(text)
+        if not math.isfinite(number):
+            raise ValueError(f'Not a finite number: {text}')
+        return number
+
+    @staticmethod
+    def _parse_date(value):
+        if value in (None, ''):
+            return None
+        if isinstance(value, datetime.datetime):
+            moment = value
+        elif isinstance(value, datetime.date):
+            moment = datetime.datetime.combine(value, datetime.time.min)
+        else:
+            value = str(value).strip()
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    raise ValueError(value)
+                moment = datetime.datetime.combine(day, datetime.time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from store import caching
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the hit and miss counters of the autocomplete cache. '
+        'The local-memory cache is private to each process, so counters '
+        'are only visible here with a shared (file or Redis) cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Set the counters back to zero after reporting them.',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Drop every cached autocomplete result.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"namespace":<12}{"hits":>10}{"misses":>10}{"hit ratio":>11}'
+        )
+        for namespace, counters in caching.stats().items():
+            self.stdout.write(
+                f'{namespace:<12}{counters["hits"]:>10}'
+                f'{counters["misses"]:>10}{counters["hit_ratio"]:>11.1%}'
+            )
+        if options['reset']:
+            caching.reset_stats()
+            self.stdout.write('Counters reset.')
+        if options['clear']:
+            for namespace in caching.NAMESPACES:
+                caching.invalidate(namespace)
+            self.stdout.write('Cached results dropped.')
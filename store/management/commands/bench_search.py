@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Category, Item
+from store.sample_data import WORDS, brand
+from store.search import ContainsSearchBackend, get_backend
+from store.slugs import allocate_slugs
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark product search latency against catalogue size. '
+        'Items are generated inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+            help='Catalogue sizes to benchmark.',
+        )
+        parser.add_argument(
+            '--queries', type=int, default=200,
+            help='Autocomplete queries timed per size and backend.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backends = [ContainsSearchBackend(), get_backend()]
+        if type(backends[1]) is ContainsSearchBackend:
+            backends.pop()
+
+        self.stdout.write(
+            f'{"items":>8}  {"backend":<24}{"p50 ms":>9}{"p95 ms":>9}'
+        )
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark')
+            created = 0
+            for size in sorted(options['sizes']):
+                items = [
+                    Item(
+                        name=' '.join(
+                            [brand(rng)]
+                            + rng.sample(WORDS, rng.randint(1, 2))
+                            + [str(n)]
+                        ),
+                        description=' '.join(rng.sample(WORDS, 6)),
+                        category=category,
+                    )
+                    for n in range(created, size)
+                ]
+                items = Item.objects.bulk_create(
+                    allocate_slugs(items), batch_size=500
+                )
+                backends[-1].index(items)
+                created = size
+
+                # Cashiers type the start of a brand, often followed by
+                # the start of a product word.
+                terms = [
+                    ' '.join(
+                        [brand(rng)[:rng.randint(3, 5)]]
+                        + [rng.choice(WORDS)[:3]] * rng.randint(0, 1)
+                    )
+                    for _ in range(options['queries'])
+                ]
+                for backend in backends:
+                    timings = []
+                    for term in terms:
+                        start = time.perf_counter()
+                        backend.ranked_ids(term, 10)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    p50 = statistics.median(timings)
+                    p95 = statistics.quantiles(timings, n=20)[-1]
+                    self.stdout.write(
+                        f'{size:>8}  {type(backend).__name__:<24}'
+                        f'{p50:>9.2f}{p95:>9.2f}'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,140 @@
+import statistics
+import time
+from copy import deepcopy
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from store import fragments
+from store.sample_data import SampleData, scaled_counts
+
+# Pages rendered: the dashboard widgets and the paginated tables, all
+# with the sidebar.
+PAGES = (
+    'dashboard', 'productslist', 'saleslist', 'purchaseslist',
+    'customer_list', 'invoicelist',
+)
+
+# Template setups compared: (name, cached loader, cached fragments).
+SETUPS = (
+    ('uncached', False, False),
+    ('cached-loader', True, False),
+    ('cached-fragments', True, True),
+)
+
+
+def template_settings(cached_loader):
+    """
+    Returns ``TEMPLATES`` with or without the cached template loader.
+    """
+    templates = deepcopy(settings.TEMPLATES)
+    loaders = list(settings.TEMPLATE_LOADERS)
+    if cached_loader:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    templates[0]['OPTIONS']['loaders'] = loaders
+    return templates
+
+
+def cache_settings(cached_fragments):
+    """
+    Returns ``CACHES`` with the fragment cache, or a dummy cache in its
+    place that never keeps a fragment.
+    """
+    caches = deepcopy(settings.CACHES)
+    if not cached_fragments:
+        caches[fragments.CACHE_ALIAS] = {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    return caches
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the time and queries it takes to render the dashboard and '
+        'the list pages with the templates read from disk on every '
+        'request, with the cached template loader, and with the cached '
+        'loader and cached fragments. The pages are rendered against a '
+        'generated data set of --sales sales, in a transaction that is '
+        'rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sales', type=int, default=10000,
+            help='Sales generated; the other tables are scaled with them.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Requests timed per page and setup.',
+        )
+        parser.add_argument(
+            '--pages', nargs='+', choices=PAGES,
+            help='Pages rendered, all by default.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        pages = options['pages'] or PAGES
+        self.stdout.write(
+            f'{"page":<16}{"setup":<20}{"p50 ms":>9}{"p95 ms":>9}'
+            f'{"queries":>9}{"speedup":>9}'
+        )
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            SampleData(seed=options['seed']).generate(
+                scaled_counts(options['sales'])
+            )
+            client = Client()
+            client.force_login(
+                User.objects.create_superuser('bench-templates')
+            )
+            for page in pages:
+                url = reverse(page)
+                uncached = None
+                for name, cached_loader, cached_fragments in SETUPS:
+                    with override_settings(
+                        TEMPLATES=template_settings(cached_loader),
+                        CACHES=cache_settings(cached_fragments),
+                    ):
+                        fragments.get_cache().clear()
+                        median, p95, queries = self.measure(
+                            client, url, options['requests']
+                        )
+                    uncached = uncached or median
+                    self.stdout.write(
+                        f'{page:<16}{name:<20}{median:>9.2f}{p95:>9.2f}'
+                        f'{queries:>9g}{uncached / median:>8.1f}x'
+                    )
+            transaction.set_rollback(True)
+
+    def measure(self, client, url, requests):
+        """
+        Returns the median and 95th percentile times, in milliseconds, and
+        the median number of queries of ``requests`` renders of ``url``.
+        """
+        # The first render compiles templates and fills the caches.
+        client.get(url)
+        timings = []
+        counts = []
+        for _ in range(requests):
+            queries = 0
+
+            def count(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            counts.append(queries)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, round(len(timings) * 0.95))]
+        return statistics.median(timings), p95, statistics.median(counts)
@@ -0,0 +1,124 @@
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models.signals import pre_save
+from django.core.management.base import BaseCommand
+
+from accounts.models import Vendor
+from store.models import Category, Item
+from store.signals import allocate_slug
+from store.slugs import allocate_slugs
+from transactions.models import Purchase
+
+
+@contextmanager
+def count_queries(counter):
+    def execute(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(execute):
+        yield
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the insert throughput of purchases from a single vendor, '
+        'whose slugs all derive from the vendor name: bulk inserts with '
+        'allocated slugs up to --purchases rows, then single saves with '
+        'the allocator and with AutoSlugField probing for a free slug. '
+        'Everything is rolled back unless --keep is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--purchases', type=int, default=100000,
+            help='Purchases bulk inserted for the vendor.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Purchases per bulk_create.',
+        )
+        parser.add_argument(
+            '--saves', type=int, default=200,
+            help='Purchases saved one at a time on top of the bulk inserts.',
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the purchases instead of rolling them back.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"insert":<34}{"rows":>8}{"rows/s":>10}{"queries/row":>13}'
+        )
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark')
+            self.item = Item.objects.create(
+                name='Benchmark item', category=category
+            )
+            vendor = Vendor.objects.create(name='Benchmark Vendor')
+            self.bulk_insert(vendor, options)
+            self.save_each('save(), allocator', vendor, options['saves'])
+
+            # A vendor of its own, as the field gives up after its
+            # 100th attempt.
+            vendor = Vendor.objects.create(name='Benchmark Vendor Probing')
+            pre_save.disconnect(allocate_slug)
+            try:
+                self.save_each(
+                    'save(), AutoSlugField probing', vendor, options['saves']
+                )
+            finally:
+                pre_save.connect(allocate_slug)
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def purchase(self, vendor):
+        return Purchase(
+            item=self.item, vendor=vendor, quantity=1, price=1,
+            total_value=1,
+        )
+
+    def bulk_insert(self, vendor, options):
+        queries = [0]
+        start = time.perf_counter()
+        with count_queries(queries):
+            remaining = options['purchases']
+            while remaining > 0:
+                batch = [
+                    self.purchase(vendor)
+                    for _ in range(min(remaining, options['batch_size']))
+                ]
+                Purchase.objects.bulk_create(allocate_slugs(batch))
+                remaining -= len(batch)
+        self.report(
+            'bulk_create + allocate_slugs', options['purchases'],
+            time.perf_counter() - start, queries[0],
+        )
+
+    def save_each(self, label, vendor, count):
+        queries = [0]
+        saved = 0
+        start = time.perf_counter()
+        with count_queries(queries):
+            for _ in range(count):
+                try:
+                    with transaction.atomic():
+                        self.purchase(vendor).save()
+                except RuntimeError as e:
+                    self.stderr.write(f'{label}: {e}')
+                    break
+                saved += 1
+        self.report(label, saved, time.perf_counter() - start, queries[0])
+
+    def report(self, label, rows, elapsed, queries):
+        if not rows:
+            self.stdout.write(f'{label:<34}{0:>8}{"-":>10}{"-":>13}')
+            return
+        self.stdout.write(
+            f'{label:<34}{rows:>8}{rows / elapsed:>10.0f}'
+            f'{queries / rows:>13.2f}'
+        )
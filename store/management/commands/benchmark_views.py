@@ -0,0 +1,358 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Customer
+from store import caching
+from store.models import Item
+from store.sample_data import (
+    FIRST_NAMES, MODELS, WORDS, SampleData, scaled_counts,
+)
+
+# Results file format, bumped when the meaning of a figure changes.
+FORMAT_VERSION = 1
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+# Requests made of the exports, which read a month of rows each.
+EXPORT_REQUESTS = 3
+
+# Latency changes smaller than this are noise, whatever the tolerance.
+NOISE_MS = 2.0
+
+Scenario = namedtuple(
+    'Scenario', ['name', 'method', 'url_name', 'data', 'requests']
+)
+
+
+def month(export_format):
+    def data(command):
+        end = timezone.localdate()
+        return {
+            'start': (end - timedelta(days=30)).isoformat(),
+            'end': end.isoformat(),
+            'format': export_format,
+        }
+    return data
+
+
+def search_term(command):
+    words = command.rng.sample(WORDS, command.rng.randint(1, 2))
+    return ' '.join(word[:command.rng.randint(3, 5)] for word in words)
+
+
+def sale(command):
+    rng = command.rng
+    lines = []
+    for item_id, price in rng.sample(command.stocked, rng.randint(1, 4)):
+        quantity = rng.randint(1, 3)
+        lines.append({
+            'id': item_id,
+            'price': price,
+            'quantity': quantity,
+            'total_item': price * quantity,
+        })
+    total = sum(line['total_item'] for line in lines)
+    return json.dumps({
+        'customer': rng.choice(command.customers),
+        'sub_total': total,
+        'grand_total': total,
+        'amount_paid': total,
+        'amount_change': 0,
+        'items': lines,
+    })
+
+
+SCENARIOS = (
+    Scenario('dashboard', 'get', 'dashboard', None, None),
+    Scenario('sales-chart', 'get', 'sales-chart',
+             lambda command: {'bucket': 'week'}, None),
+    Scenario('top-sales', 'get', 'report-top-sales', None, None),
+    Scenario('sales-trend', 'get', 'report-sales-trend',
+             lambda command: {'dimension': 'customer'}, None),
+    Scenario('product-list', 'get', 'productslist', None, None),
+    Scenario('sale-list', 'get', 'saleslist', None, None),
+    Scenario('purchase-list', 'get', 'purchaseslist', None, None),
+    Scenario('customer-list', 'get', 'customer_list', None, None),
+    Scenario('vendor-list', 'get', 'vendor-list', None, None),
+    Scenario('invoice-list', 'get', 'invoicelist', None, None),
+    Scenario('bill-list', 'get', 'bill_list', None, None),
+    Scenario('delivery-list', 'get', 'deliveries', None, None),
+    Scenario('search', 'get', 'item_search_list_view',
+             lambda command: {'q': search_term(command)}, None),
+    Scenario('item-autocomplete', 'ajax', 'get_items',
+             lambda command: {'term': search_term(command)}, None),
+    Scenario('customer-autocomplete', 'ajax', 'get_customers',
+             lambda command: {
+                 'term': command.rng.choice(FIRST_NAMES)[:3].lower()
+             }, None),
+    Scenario('sale-create', 'json', 'sale-create', sale, None),
+    Scenario('sales-export-csv', 'get', 'sales-export', month('csv'),
+             EXPORT_REQUESTS),
+    Scenario('sales-export-xlsx', 'get', 'sales-export', month('xlsx'),
+             EXPORT_REQUESTS),
+    Scenario('purchases-export-csv', 'get', 'purchases-export',
+             month('csv'), EXPORT_REQUESTS),
+    Scenario('products-export-csv', 'get', 'productslist',
+             lambda command: {'_export': 'csv'}, EXPORT_REQUESTS),
+)
+
+
+def revision():
+    """
+    Returns the commit the code was checked out at, if known.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, quantile):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[round(quantile * 100) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the latency, query count and response size of the '
+        'dashboard, sales reports, list pages, search, autocomplete, sale '
+        'creation and exports against generated data sets of each of --scales sales. '
+        'The data set is grown from one scale to the next in a transaction '
+        'that is rolled back. Results are written as JSON to --output and '
+        'compared with those of an earlier run given as --baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', nargs='+', type=int,
+            default=[1000, 100000, 1000000],
+            help='Numbers of sales benchmarked; the other tables are '
+                 'scaled with them.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Requests timed per scenario and scale.',
+        )
+        parser.add_argument(
+            '--scenarios', nargs='+',
+            choices=[scenario.name for scenario in SCENARIOS],
+            help='Scenarios run, all by default.',
+        )
+        parser.add_argument(
+            '--output', default='benchmark-results.json',
+            help='File the results are written to.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Results of an earlier run to compare with.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Median latency increase over the baseline reported as '
+                 'a regression, as a fraction.',
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Exit with an error when a regression is found.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    results = json.load(file)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(
+                    f'Could not read {options["baseline"]}: {e}'
+                )
+            baseline = {
+                (result['scale'], result['scenario']): result
+                for result in results
+            }
+
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options['scenarios']
+            or scenario.name in options['scenarios']
+        ]
+        report = {
+            'version': FORMAT_VERSION,
+            'created': timezone.now().isoformat(timespec='seconds'),
+            'revision': revision(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': options['seed'],
+            'requests': options['requests'],
+            'scales': {},
+            'results': [],
+        }
+        self.rng = random.Random(options['seed'])
+        regressions = 0
+
+        self.stdout.write(
+            f'{"sales":>9}  {"scenario":<24}{"p50 ms":>9}{"p95 ms":>9}'
+            f'{"queries":>9}{"KB":>9}{"errors":>8}{"vs base":>9}'
+        )
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            client = Client(raise_request_exception=False)
+            client.force_login(
+                User.objects.create_superuser('benchmark-views')
+            )
+            generator = SampleData(seed=options['seed'])
+            generated = dict.fromkeys(MODELS, 0)
+            for scale in sorted(set(options['scales'])):
+                wanted = scaled_counts(scale)
+                start = time.perf_counter()
+                generator.generate({
+                    name: wanted[name] - generated[name] for name in MODELS
+                })
+                generated = wanted
+                report['scales'][scale] = {
+                    'rows': wanted,
+                    'generate_seconds': round(
+                        time.perf_counter() - start, 2
+                    ),
+                }
+                self.load_choices()
+
+                for scenario in scenarios:
+                    result = self.measure(client, scale, scenario, options)
+                    report['results'].append(result)
+                    regressions += self.report(
+                        result, baseline.get((scale, scenario.name)),
+                        options['tolerance'],
+                    )
+            transaction.set_rollback(True)
+
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+        self.stdout.write(f'Results written to {options["output"]}.')
+        if regressions:
+            message = f'{regressions} regression(s) against the baseline.'
+            if options['fail']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+
+    def load_choices(self):
+        """
+        Loads the customers and the well stocked items the sales posted
+        by the ``sale-create`` scenario are made of.
+        """
+        caching.invalidate(caching.ITEMS)
+        caching.invalidate(caching.CUSTOMERS)
+        self.customers = list(
+            Customer.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.stocked = list(
+            Item.objects.filter(quantity__gte=100).order_by('pk')
+            .values_list('pk', 'price')[:500]
+        )
+
+    def request(self, client, scenario):
+        """
+        Makes one request of ``scenario`` and returns its time in
+        milliseconds, its number of queries, its size and its status.
+        """
+        url = reverse(scenario.url_name)
+        data = scenario.data(self) if scenario.data else None
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            if scenario.method == 'ajax':
+                response = client.post(url, data, **AJAX)
+            elif scenario.method == 'json':
+                response = client.post(
+                    url, data, content_type='application/json', **AJAX
+                )
+            else:
+                response = client.get(url, data)
+            if response.streaming:
+                size = sum(map(len, response.streaming_content))
+            else:
+                size = len(response.content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, queries, size, response.status_code
+
+    def measure(self, client, scale, scenario, options):
+        requests = options['requests']
+        if scenario.requests:
+            requests = min(requests, scenario.requests)
+        # The first request compiles templates and fills caches.
+        self.request(client, scenario)
+        samples = [
+            self.request(client, scenario) for _ in range(requests)
+        ]
+        timings = sorted(sample[0] for sample in samples)
+        queries = [sample[1] for sample in samples]
+        sizes = [sample[2] for sample in samples]
+        return {
+            'scale': scale,
+            'scenario': scenario.name,
+            'url': reverse(scenario.url_name),
+            'requests': requests,
+            'errors': sum(sample[3] >= 400 for sample in samples),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'max_ms': round(timings[-1], 3),
+            'queries': statistics.median(queries),
+            'max_queries': max(queries),
+            'bytes': round(statistics.median(sizes)),
+        }
+
+    def report(self, result, base, tolerance):
+        """
+        Writes ``result`` out and returns whether it regressed from the
+        baseline result ``base``.
+        """
+        change = ''
+        regressed = False
+        if base:
+            ratio = result['p50_ms'] / max(base['p50_ms'], 1e-3)
+            change = f'{ratio - 1:+.0%}'
+            regressed = (
+                ratio > 1 + tolerance
+                and result['p50_ms'] - base['p50_ms'] > NOISE_MS
+            ) or result['queries'] > base['queries']
+        line = (
+            f'{result["scale"]:>9}  {result["scenario"]:<24}'
+            f'{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+            f'{result["queries"]:>9g}{result["bytes"] / 1024:>9.1f}'
+            f'{result["errors"]:>8}{change:>9}'
+        )
+        if regressed:
+            line = self.style.ERROR(f'{line}  REGRESSION')
+        self.stdout.write(line)
+        return regressed
@@ -0,0 +1,158 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.urls.exceptions import NoReverseMatch
+
+# Views that change state even on GET.
+SKIPPED_URL_NAMES = {'logout', 'admin:logout'}
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(.*)$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def view_paths(patterns=None, namespace=None):
+    """
+    Yields the paths of the named URL patterns that take no arguments.
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            inner = namespace
+            if pattern.namespace:
+                inner = (
+                    f'{namespace}:{pattern.namespace}' if namespace
+                    else pattern.namespace
+                )
+            yield from view_paths(pattern.url_patterns, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            if name in SKIPPED_URL_NAMES:
+                continue
+            try:
+                yield reverse(name)
+            except NoReverseMatch:
+                continue
+
+
+def full_scans(sql, params):
+    """
+    Returns the tables ``sql`` reads in full to filter or sort them,
+    according to the query planner.
+
+    A query without ``WHERE`` that is returned in table order (a form's
+    choices, an admin list ordered by ID) has nothing to gain from an
+    index and is not reported.
+    """
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Small tables are scanned whatever the indexes; ruling out
+            # sequential scans leaves only the ones with no usable index.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'{prefix} {sql}', params)
+        plan = [row[-1] if connection.vendor == 'sqlite' else row[0]
+                for row in cursor.fetchall()]
+    if connection.vendor == 'sqlite':
+        scans = [
+            match.group(1) for match in map(SQLITE_SCAN.match, plan)
+            # An index walked in order, a virtual table (full-text search)
+            # or a constant row is not a table scan.
+            if match and not match.group(2).strip()
+        ]
+        sorts = any('USE TEMP B-TREE' in line for line in plan)
+    else:
+        scans = [
+            table for line in plan for table in POSTGRES_SCAN.findall(line)
+        ]
+        sorts = any(line.lstrip(' ->').startswith('Sort') for line in plan)
+    if ' WHERE ' not in sql and not sorts:
+        return []
+    # Subqueries and other derived tables are named by aliases.
+    tables = set(connection.introspection.table_names())
+    return [table for table in scans if table in tables]
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every view that takes no URL arguments (and --paths), run '
+        'EXPLAIN on the queries each one makes and flag full table scans. '
+        'Requests are made as a temporary superuser unless --username is '
+        'given, in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paths', nargs='+', default=[],
+            help='Extra paths to request, e.g. with query parameters.',
+        )
+        parser.add_argument(
+            '--username',
+            help='Existing user the views are requested as.',
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Exit with an error when a full scan is found.',
+        )
+
+    def handle(self, *args, **options):
+        paths = list(dict.fromkeys([*view_paths(), *options['paths']]))
+        scanned = 0
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            client = Client(raise_request_exception=False)
+            client.force_login(self.get_user(options['username']))
+            for path in paths:
+                scanned += self.explain(client, path)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'{len(paths)} views explained, {scanned} full scans.'
+        )
+        if scanned and options['fail']:
+            raise CommandError(f'{scanned} queries scan a whole table.')
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {username}.')
+        return User.objects.create_superuser('explain-queries')
+
+    def explain(self, client, path):
+        """
+        Requests ``path`` and reports the full scans of its queries.
+        Returns the number of queries scanning a table.
+        """
+        queries = {}
+
+        def record(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith('SELECT'):
+                queries.setdefault(sql, params)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        flagged = []
+        for sql, params in queries.items():
+            tables = full_scans(sql, params)
+            if tables:
+                flagged.append((', '.join(tables), sql))
+        self.stdout.write(
+            f'{response.status_code} {path} '
+            f'({len(queries)} queries, {len(flagged)} full scans)'
+        )
+        for tables, sql in flagged:
+            self.stdout.write(f'    SCAN {tables}: {sql[:160]}')
+        return len(flagged)
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.sample_data import BATCH_SIZE, MODELS, SampleData, scaled_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Add a synthetic data set to the database: categories, vendors, '
+        'items, customers, purchases, sales with their details, deliveries, '
+        'invoices and bills, in proportion to --sales unless counts are '
+        'given per model. The same --seed gives the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sales', type=int, default=10000,
+            help='Sales generated; the other counts are derived from it.',
+        )
+        for name in MODELS:
+            if name != 'sales':
+                parser.add_argument(
+                    f'--{name}', type=int,
+                    help=f'Number of {name}, instead of the derived one.',
+                )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Days, up to today, the generated dates are spread over.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Rows per bulk insert.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        counts = scaled_counts(options['sales'])
+        for name in MODELS:
+            if options.get(name) is not None:
+                counts[name] = options[name]
+
+        self.stdout.write(f'{"":<14}{"rows":>10}{"seconds":>10}{"rows/s":>10}')
+        start = time.perf_counter()
+        SampleData(
+            seed=options['seed'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            progress=self.progress,
+        ).generate(counts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(counts.values())} rows in '
+            f'{time.perf_counter() - start:.1f}s.'
+        ))
+
+    def progress(self, name, count, seconds):
+        if count is None:
+            self.stdout.write(f'{name:<14}{"":>10}{seconds:>10.2f}')
+            return
+        self.stdout.write(
+            f'{name:<14}{count:>10}{seconds:>10.2f}'
+            f'{count / max(seconds, 1e-6):>10.0f}'
+        )
@@ -0,0 +1,65 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from store.imports import FORMATS, ItemImport, file_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Import products from a CSV or XLSX file with the columns of the '
+        'product export (ID, Name, Description, Category, Quantity, Price, '
+        'Expiring Date, Vendor). Rows are matched to items by ID, or else '
+        'by name.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The CSV or XLSX file.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='File format, when the extension does not tell.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows read and written per batch.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report the changes without writing anything.',
+        )
+        parser.add_argument(
+            '--show', type=int, default=20,
+            help='Changes listed in the report.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            import_format = options['format'] or file_format(options['path'])
+            with open(options['path'], 'rb') as file:
+                report = ItemImport(
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    max_changes=options['show'],
+                ).run(read_rows(file, import_format))
+        except (OSError, ValidationError) as e:
+            raise CommandError(
+                '; '.join(getattr(e, 'messages', [str(e)]))
+            )
+
+        for change in report.changes:
+            self.stdout.write(change)
+        for line_number, message in report.errors:
+            self.stderr.write(f'line {line_number}: {message}')
+        if report.categories_created:
+            self.stdout.write(
+                'New categories: ' + ', '.join(report.categories_created)
+            )
+        if report.vendors_created:
+            self.stdout.write(
+                'New vendors: ' + ', '.join(report.vendors_created)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.summary} ({time.perf_counter() - start:.1f}s)'
+        ))
@@ -0,0 +1,210 @@
+import http.cookiejar
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# The login page renders a template without touching the database, and the
+# stylesheet is a static file, so neither needs a migrated database.
+DEFAULT_PATHS = ['/accounts/login/', '/static/css/style.css']
+
+SERVERS = {
+    'runserver': [sys.executable, 'manage.py', 'runserver', '{address}'],
+    'gunicorn': [
+        sys.executable, '-m', 'gunicorn', '--bind', '{address}',
+        'InventoryMS.wsgi:application',
+    ],
+    'uvicorn': [
+        sys.executable, '-m', 'gunicorn', '--bind', '{address}',
+        '--worker-class', 'uvicorn_worker.UvicornWorker',
+        'InventoryMS.asgi:application',
+    ],
+}
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def login(base_url, username, password):
+    """
+    Logs in through the login form and returns the ``Cookie`` header of
+    the session.
+    """
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(jar), NoRedirect
+    )
+    login_url = base_url + '/accounts/login/'
+    opener.open(login_url).read()
+    cookies = {cookie.name: cookie.value for cookie in jar}
+    data = urllib.parse.urlencode({
+        'username': username,
+        'password': password,
+        'csrfmiddlewaretoken': cookies.get('csrftoken', ''),
+    }).encode()
+    try:
+        opener.open(login_url, data).read()
+    except urllib.error.HTTPError as e:
+        # A successful login redirects; the redirect is not followed.
+        if e.code != 302:
+            raise CommandError(f'Could not log in as {username}: {e}')
+    cookies = {cookie.name: cookie.value for cookie in jar}
+    if 'sessionid' not in cookies:
+        raise CommandError(f'Could not log in as {username}.')
+    return '; '.join(f'{name}={value}' for name, value in cookies.items())
+
+
+def fetch(url, headers=None, data=None):
+    """
+    Returns the time taken to fetch ``url`` in milliseconds, or ``None``
+    if the request failed. ``data`` is sent as an AJAX form POST.
+    """
+    # Ask for compressed responses, as browsers do.
+    headers = {'Accept-Encoding': 'br, gzip', **(headers or {})}
+    if data is not None:
+        headers['X-Requested-With'] = 'XMLHttpRequest'
+    request = urllib.request.Request(url, data, headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+    except (urllib.error.URLError, OSError):
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+def wait_for(address, timeout=30):
+    host, port = address.rsplit(':', 1)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, int(port)), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the throughput and latency of a running server, or with '
+        '--compare, of the development server, Gunicorn and Gunicorn with '
+        'Uvicorn workers (ASGI) in turn.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Base URL of the server under test.',
+        )
+        parser.add_argument(
+            '--paths', nargs='+', default=DEFAULT_PATHS,
+            help='Paths requested, in turn, from the server.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests sent per path.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Requests kept in flight at once.',
+        )
+        parser.add_argument(
+            '--login', metavar='USERNAME:PASSWORD',
+            help='Log in first and send every request in that session.',
+        )
+        parser.add_argument(
+            '--data', nargs='+', metavar='FIELD=VALUE',
+            help='Send AJAX POST requests with these form fields.',
+        )
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Start each of --servers on --address and load them in '
+                 'turn.',
+        )
+        parser.add_argument(
+            '--servers', nargs='+', choices=list(SERVERS),
+            default=['runserver', 'gunicorn'],
+            help='Servers started by --compare.',
+        )
+        parser.add_argument(
+            '--address', default='127.0.0.1:8765',
+            help='Address the servers started by --compare listen on.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"server":<12}{"path":<28}{"req/s":>9}{"p50 ms":>9}'
+            f'{"p95 ms":>9}{"errors":>8}'
+        )
+        if not options['compare']:
+            self.load('server', options['url'], options)
+            return
+
+        address = options['address']
+        for name in options['servers']:
+            command = SERVERS[name]
+            server = subprocess.Popen(
+                [part.format(address=address) for part in command],
+                cwd=settings.BASE_DIR, env=os.environ.copy(),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                if not wait_for(address):
+                    raise CommandError(f'{name} did not start on {address}.')
+                self.load(name, f'http://{address}', options)
+            finally:
+                server.terminate()
+                server.wait()
+
+    def load(self, label, base_url, options):
+        base_url = base_url.rstrip('/')
+        headers = {}
+        if options['login']:
+            username, _, password = options['login'].partition(':')
+            headers['Cookie'] = login(base_url, username, password)
+        data = None
+        if options['data']:
+            data = urllib.parse.urlencode(
+                [tuple(field.split('=', 1)) for field in options['data']]
+            ).encode()
+
+        def request(url):
+            return fetch(url, headers, data)
+
+        for path in options['paths']:
+            url = base_url + path
+            request(url)  # Warm up.
+            start = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                results = list(
+                    pool.map(request, [url] * options['requests'])
+                )
+            elapsed = time.perf_counter() - start
+
+            timings = [result for result in results if result is not None]
+            errors = len(results) - len(timings)
+            if len(timings) < 2:
+                self.stdout.write(
+                    f'{label:<12}{path:<28}{"-":>9}{"-":>9}{"-":>9}'
+                    f'{errors:>8}'
+                )
+                continue
+            p50 = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            self.stdout.write(
+                f'{label:<12}{path:<28}{len(timings) / elapsed:>9.1f}'
+                f'{p50:>9.2f}{p95:>9.2f}{errors:>8}'
+            )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.metrics import rebuild_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters and daily sales totals.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_metrics()
+        self.stdout.write(self.style.SUCCESS('Dashboard metrics rebuilt.'))
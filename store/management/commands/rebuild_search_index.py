@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the item table.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index rebuilt ({type(backend).__name__}).'
+        ))
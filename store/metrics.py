@@ -0,0 +1,254 @@
+"""
+Module: metrics.py
+
+Maintains the materialized counters behind the dashboard.
+
+The dashboard reads ``DashboardMetric`` and ``DailySales`` rows instead of
+aggregating the item, profile, delivery and sale tables on every request.
+Signal handlers in ``store.signals`` keep the rows in step with writes, and
+``rebuild_metrics`` recomputes everything from scratch (used by the
+``rebuild_metrics`` management command; the migration adding the tables
+runs a frozen copy of it).
+
+Every change to the counters drops the cached dashboard widgets (see
+``store.fragments``) once it is committed.
+
+Every sale adds to the same two rows, the ``sales`` counter and the total
+of the day. Updated inside the sale's transaction, they would stay locked
+until it commits and make concurrent sales wait on each other (on
+PostgreSQL; SQLite serializes writers anyway). The sale handlers therefore
+call ``record_sale`` once the sale is committed, in a transaction of its
+own that only holds the locks for its two updates. The sale is committed
+by then, so a failing update (a lock timeout, say) is logged rather than
+raised to the code that made the sale. Such a failure, or a process dying
+in between, leaves the sale uncounted until ``rebuild_metrics`` is run.
+
+``sales_series`` sums the daily totals into the day, week or month buckets
+of the dashboard's sales chart, and ``sales_version`` tells whether the
+totals of a window changed since the chart last fetched them.
+"""
+
+from datetime import timedelta
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import fragments
+from .models import DailySales, DashboardMetric
+
+ITEMS = 'items'
+ITEMS_QUANTITY = 'items_quantity'
+PROFILES = 'profiles'
+DELIVERIES = 'deliveries'
+SALES = 'sales'
+CATEGORY_PREFIX = 'category:'
+
+# Number of days of sales shown on the dashboard chart.
+SALES_CHART_DAYS = 90
+
+# Sales chart bucket sizes, and the most buckets returned at once.
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+BUCKETS = (DAY, WEEK, MONTH)
+MAX_CHART_BUCKETS = 400
+
+
+def category_key(category_id):
+    """
+    Returns the metric key holding the item count of a category.
+    """
+    return f"{CATEGORY_PREFIX}{category_id}"
+
+
+def bump(key, delta, label=None):
+    """
+    Atomically adds ``delta`` to the counter ``key``.
+
+    The counter is created on first use. When ``label`` is given it
+    replaces the stored label as part of the same update.
+    """
+    fragments.invalidate(fragments.DASHBOARD)
+    updates = {'value': F('value') + delta}
+    if label is not None:
+        updates['label'] = label
+    if DashboardMetric.objects.filter(key=key).update(**updates):
+        return
+    _, created = DashboardMetric.objects.get_or_create(
+        key=key, defaults={'value': delta, 'label': label or ''}
+    )
+    if not created:
+        DashboardMetric.objects.filter(key=key).update(**updates)
+
+
+def reset(key, value):
+    """
+    Overwrites the counter ``key`` with a freshly computed ``value``.
+    """
+    fragments.invalidate(fragments.DASHBOARD)
+    DashboardMetric.objects.update_or_create(
+        key=key, defaults={'value': value}
+    )
+
+
+def record_sale(date_added, grand_total, count=1):
+    """
+    Adds a sale (or, with a negative ``count``, removes one) from the
+    sales counter and the running total of its day.
+    """
+    day = timezone.localdate(date_added)
+    updates = {
+        'total': F('total') + grand_total,
+        'sales_count': F('sales_count') + count,
+        'updated_at': timezone.now(),
+    }
+    with transaction.atomic():
+        bump(SALES, count)
+        if DailySales.objects.filter(date=day).update(**updates):
+            return
+        _, created = DailySales.objects.get_or_create(
+            date=day, defaults={'total': grand_total, 'sales_count': count}
+        )
+        if not created:
+            DailySales.objects.filter(date=day).update(**updates)
+
+
+def rebuild_metrics(apps=global_apps):
+    """
+    Recomputes every dashboard counter and daily sales total.
+
+    ``apps`` lets data migrations pass their historical app registry.
+    """
+    metric_model = apps.get_model('store', 'DashboardMetric')
+    daily_model = apps.get_model('store', 'DailySales')
+    Category = apps.get_model('store', 'Category')
+    Item = apps.get_model('store', 'Item')
+    Delivery = apps.get_model('store', 'Delivery')
+    Profile = apps.get_model('accounts', 'Profile')
+    Sale = apps.get_model('transactions', 'Sale')
+
+    items = Item.objects.aggregate(
+        count=Count('id'), quantity=Sum('quantity')
+    )
+    metrics = [
+        metric_model(key=ITEMS, value=items['count']),
+        metric_model(key=ITEMS_QUANTITY, value=items['quantity'] or 0),
+        metric_model(key=PROFILES, value=Profile.objects.count()),
+        metric_model(key=DELIVERIES, value=Delivery.objects.count()),
+        metric_model(key=SALES, value=Sale.objects.count()),
+    ]
+    categories = Category.objects.annotate(item_count=Count('item'))
+    for category in categories.values('id', 'name', 'item_count'):
+        metrics.append(metric_model(
+            key=category_key(category['id']),
+            label=category['name'],
+            value=category['item_count'],
+        ))
+
+    daily_sales = (
+        Sale.objects.values('date_added__date')
+        .annotate(total=Sum('grand_total'), sales_count=Count('id'))
+        .order_by('date_added__date')
+    )
+
+    metric_model.objects.all().delete()
+    metric_model.objects.bulk_create(metrics)
+    fragments.invalidate(fragments.DASHBOARD)
+    daily_model.objects.all().delete()
+    daily_model.objects.bulk_create(
+        daily_model(
+            date=day['date_added__date'],
+            total=day['total'],
+            sales_count=day['sales_count'],
+        )
+        for day in daily_sales
+    )
+
+
+def bucket_start(day, bucket):
+    """
+    Returns the first day of the ``bucket`` (``day``, ``week`` starting
+    on Monday, or ``month``) containing ``day``.
+    """
+    if bucket == WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket_start(start, bucket):
+    """
+    Returns the first day of the ``bucket`` after the one starting on
+    ``start``.
+    """
+    if bucket == WEEK:
+        return start + timedelta(weeks=1)
+    if bucket == MONTH:
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(start, end, bucket):
+    """
+    Returns the first days of the buckets between ``start`` and ``end``.
+    """
+    day = bucket_start(start, bucket)
+    starts = []
+    while day <= end:
+        starts.append(day)
+        day = next_bucket_start(day, bucket)
+    return starts
+
+
+def bucket_count(start, end, bucket):
+    """
+    Returns the number of buckets between ``start`` and ``end``.
+    """
+    start = bucket_start(start, bucket)
+    if bucket == WEEK:
+        return (end - start).days // 7 + 1
+    if bucket == MONTH:
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days + 1
+
+
+def sales_series(start, end, bucket=DAY):
+    """
+    Returns the sales between ``start`` and ``end`` (both included) as
+    ``(bucket start, total, sales count)`` tuples, one per ``bucket``,
+    including the buckets without sales.
+
+    The sums are computed by the database over the daily totals, so the
+    cost depends on the number of days, not of sales.
+    """
+    days = DailySales.objects.filter(date__range=(start, end))
+    if bucket == DAY:
+        rows = days.values_list('date', 'total', 'sales_count')
+    else:
+        trunc = TruncWeek if bucket == WEEK else TruncMonth
+        rows = (
+            days.annotate(bucket=trunc('date'))
+            .values('bucket')
+            .annotate(total=Sum('total'), sales_count=Sum('sales_count'))
+            .values_list('bucket', 'total', 'sales_count')
+        )
+    sums = {day: (total, count) for day, total, count in rows.order_by()}
+    return [
+        (day, *sums.get(day, (0, 0)))
+        for day in bucket_starts(start, end, bucket)
+    ]
+
+
+def sales_version(start, end):
+    """
+    Returns when the daily totals between ``start`` and ``end`` last
+    changed (``None`` when there are none) and how many days have one.
+    """
+    version = DailySales.objects.filter(date__range=(start, end)).aggregate(
+        modified=Max('updated_at'), days=Count('id')
+    )
+    return version['modified'], version['days']
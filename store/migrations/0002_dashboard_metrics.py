@@ -0,0 +1,86 @@
+# Generated by Django 5.1 on 2026-10-18 12:16
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_metrics(apps, schema_editor):
+    """
+    Computes the dashboard counters and daily sales totals of the
+    existing rows. A frozen copy of ``store.metrics.rebuild_metrics``.
+    """
+    DashboardMetric = apps.get_model('store', 'DashboardMetric')
+    DailySales = apps.get_model('store', 'DailySales')
+    Category = apps.get_model('store', 'Category')
+    Item = apps.get_model('store', 'Item')
+    Delivery = apps.get_model('store', 'Delivery')
+    Profile = apps.get_model('accounts', 'Profile')
+    Sale = apps.get_model('transactions', 'Sale')
+
+    items = Item.objects.aggregate(
+        count=Count('id'), quantity=Sum('quantity')
+    )
+    metrics = [
+        DashboardMetric(key='items', value=items['count']),
+        DashboardMetric(key='items_quantity', value=items['quantity'] or 0),
+        DashboardMetric(key='profiles', value=Profile.objects.count()),
+        DashboardMetric(key='deliveries', value=Delivery.objects.count()),
+        DashboardMetric(key='sales', value=Sale.objects.count()),
+    ]
+    categories = Category.objects.annotate(item_count=Count('item'))
+    for category in categories.values('id', 'name', 'item_count'):
+        metrics.append(DashboardMetric(
+            key=f"category:{category['id']}",
+            label=category['name'],
+            value=category['item_count'],
+        ))
+    DashboardMetric.objects.bulk_create(metrics)
+
+    daily_sales = (
+        Sale.objects.values('date_added__date')
+        .annotate(total=Sum('grand_total'), sales_count=Count('id'))
+        .order_by('date_added__date')
+    )
+    DailySales.objects.bulk_create(
+        DailySales(
+            date=day['date_added__date'],
+            total=day['total'],
+            sales_count=day['sales_count'],
+        )
+        for day in daily_sales
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+        ('accounts', '0001_initial'),
+        ('transactions', '0003_alter_purchase_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily sales',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DashboardMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('label', models.CharField(blank=True, max_length=50)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_metrics, migrations.RunPython.noop),
+    ]
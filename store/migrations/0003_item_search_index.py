@@ -0,0 +1,68 @@
+from django.db import migrations
+
+FTS_TABLE = 'store_item_fts'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Item = apps.get_model('store', 'Item')
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            if ('ENABLE_FTS5',) not in cursor.fetchall():
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"name, description, "
+            f"tokenize = 'unicode61 remove_diacritics 2', "
+            f"prefix = '2 3')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            f'SELECT id, name, description FROM {Item._meta.db_table}'
+        )
+
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex, OpClass
+        from django.contrib.postgres.search import SearchVector
+        from django.db.models.functions import Upper
+
+        schema_editor.add_index(Item, GinIndex(
+            SearchVector('name', 'description', config='simple'),
+            name='store_item_search_idx',
+        ))
+        # The trigram index only speeds up icontains lookups, so it is
+        # skipped on servers built without the pg_trgm extension.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_available_extensions "
+                "WHERE name = 'pg_trgm'"
+            )
+            has_trgm = cursor.fetchone() is not None
+        if has_trgm:
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.add_index(Item, GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='store_item_name_trgm_idx',
+            ))
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS store_item_search_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS store_item_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_dashboard_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
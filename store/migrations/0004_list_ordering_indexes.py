@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_list_ordering_indexes'),
+        ('store', '0003_item_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['name', 'id'], name='category_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['date', 'id'], name='delivery_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=150)),
+                ('base', models.CharField(max_length=255)),
+                ('last', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'base'), name='slug_sequence_field_base')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+def create_customer_name_index(apps, schema_editor):
+    # The delivery search matches words anywhere in the customer name
+    # (icontains), which only a trigram index can serve.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    from django.db.models.functions import Upper
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    Delivery = apps.get_model('store', 'Delivery')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(Delivery, GinIndex(
+        OpClass(Upper('customer_name'), name='gin_trgm_ops'),
+        name='delivery_customer_trgm_idx',
+    ))
+
+
+def drop_customer_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS delivery_customer_trgm_idx'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_slug_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('is_delivered', False)), fields=['date', 'id'], name='delivery_pending_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dashboardmetric',
+            index=models.Index(fields=['label', 'key'], name='dashboard_metric_label_idx'),
+        ),
+        migrations.RunPython(
+            create_customer_name_index, drop_customer_name_index
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysales',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
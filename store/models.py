@@ -7,6 +7,8 @@ This module defines the following classes:
 - Category: Represents a category for items.
 - Item: Represents an item in the inventory.
 - Delivery: Represents a delivery of an item to a customer.
+- DashboardMetric: Represents a running counter shown on the dashboard.
+- DailySales: Represents the running sales total for a single day.
 
 Each class provides specific fields and methods for handling related data.
 """
@@ -24,7 +26,10 @@ class Category(models.Model):
     Represents a category for items.
     """
     name = models.CharField(max_length=50)
-    slug = AutoSlugField(unique=True, populate_from='name')
+    # Keeps slugs set beforehand, as by store.slugs.allocate_slugs.
+    slug = AutoSlugField(
+        unique=True, populate_from='name', overwrite_on_add=False
+    )
 
     def __str__(self):
         """
@@ -34,13 +39,18 @@ class Category(models.Model):
 
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='category_name_id_idx'),
+        ]
 
 
 class Item(models.Model):
     """
     Represents an item in the inventory.
     """
-    slug = AutoSlugField(unique=True, populate_from='name')
+    slug = AutoSlugField(
+        unique=True, populate_from='name', overwrite_on_add=False
+    )
     name = models.CharField(max_length=50)
     description = models.TextField(max_length=256)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
@@ -58,6 +68,17 @@ class Item(models.Model):
             f"Quantity: {self.quantity}"
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded quantity and category so that signal
+        handlers can work out what a later save changed.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_quantity = instance.__dict__.get('quantity')
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
     def get_absolute_url(self):
         """
         Returns the absolute URL for an item detail view.
@@ -76,6 +97,9 @@ class Item(models.Model):
     class Meta:
         ordering = ['name']
         verbose_name_plural = 'Items'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+        ]
 
 
 class Delivery(models.Model):
@@ -101,3 +125,86 @@ class Delivery(models.Model):
             f"Delivery of {self.item} to {self.customer_name} "
             f"at {self.location} on {self.date}"
         )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='delivery_date_id_idx'),
+            # Deliveries still to be made, the ones staff work through.
+            models.Index(
+                fields=['date', 'id'], condition=models.Q(is_delivered=False),
+                name='delivery_pending_date_idx',
+            ),
+        ]
+
+
+class DashboardMetric(models.Model):
+    """
+    Represents a running counter displayed on the dashboard.
+
+    Counters are keyed by name (e.g. ``sales``) or, for the category
+    distribution chart, by ``category:<pk>`` with the category name
+    kept in ``label``.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    label = models.CharField(max_length=50, blank=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        """
+        String representation of the metric.
+        """
+        return f"{self.key}: {self.value}"
+
+    class Meta:
+        # The order the dashboard lists the counters in.
+        indexes = [
+            models.Index(
+                fields=['label', 'key'], name='dashboard_metric_label_idx'
+            ),
+        ]
+
+
+class DailySales(models.Model):
+    """
+    Represents the running sales total for a single day.
+    """
+    date = models.DateField(unique=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+    # When the total last changed, for conditional chart API requests.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """
+        String representation of the daily sales total.
+        """
+        return f"Sales on {self.date}: {self.total}"
+
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'Daily sales'
+
+
+class SlugSequence(models.Model):
+    """
+    Represents the last ``-N`` suffix handed out for a base slug, so that
+    the next one is reserved without probing the slugged table.
+
+    ``field`` names the slug field as ``<app>.<model>.<field>``.
+    """
+    field = models.CharField(max_length=150)
+    base = models.CharField(max_length=255)
+    last = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        """
+        String representation of the sequence.
+        """
+        return f"{self.field}: {self.base}-{self.last}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['field', 'base'], name='slug_sequence_field_base'
+            ),
+        ]
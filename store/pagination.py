@@ -0,0 +1,370 @@
+"""
+Module: pagination.py
+
+Contains keyset ("cursor") pagination helpers.
+
+Instead of ``OFFSET``, which makes the database walk past every skipped row,
+a keyset page starts right after the last row of the previous page: the
+ordering values of that row are packed into an opaque cursor token and the
+next page is fetched with a ``WHERE (a, b) > (x, y)`` style filter that an
+index on the ordering columns can serve directly. Page ``n`` therefore
+costs the same as page 1.
+
+Tokens come from the query string, so the values decoded from them are
+converted by their ordering fields (``to_python``) before they reach a
+query; a token that does not hold valid values is rejected like any other
+malformed token.
+
+The ordering fields must be non-null and end with a unique field
+(normally ``pk``/``id``) so that every row has a distinct position, and
+should be backed by an index on the same columns.
+
+``CursorPaginationMixin`` brings this to the list views: it replaces the
+``?page=N`` paginator with ``?after=``/``?before=`` cursor tokens, and can
+show an approximate row count instead of running a full ``COUNT(*)``.
+"""
+
+# Standard library imports
+import base64
+import binascii
+import datetime
+import json
+import operator
+from decimal import Decimal
+from functools import reduce
+
+# Django core imports
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+
+
+def _json_default(value):
+    # Unlike DjangoJSONEncoder, keep microseconds: a truncated datetime
+    # would not compare equal to the row it was taken from.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def encode_cursor(values):
+    """
+    Packs the ordering values of a row into a URL-safe cursor token.
+    """
+    payload = json.dumps(list(values), default=_json_default)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _ordering_field(model, field):
+    name = field.lstrip('-')
+    if name == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def decode_cursor(token, ordering, model):
+    """
+    Unpacks a cursor token made by ``encode_cursor`` for ``ordering`` on
+    ``model``, converting every value with its field's ``to_python``.
+
+    Raises ``ValueError`` for tokens that were not made for ``ordering``
+    or hold values its fields reject.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError(f'Invalid cursor: {token}')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError(f'Invalid cursor: {token}')
+    try:
+        values = [
+            _ordering_field(model, field).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValidationError, TypeError):
+        raise ValueError(f'Invalid cursor: {token}')
+    if None in values:
+        # The ordering fields are non-null.
+        raise ValueError(f'Invalid cursor: {token}')
+    return values
+
+
+def after(ordering, values):
+    """
+    Returns a filter matching the rows that come after ``values`` in
+    ``ordering`` (a list of field names, ``-`` prefixed for descending).
+    """
+    conditions = []
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {
+            previous.lstrip('-'): value
+            for previous, value in zip(ordering[:position], values)
+        }
+        conditions.append(
+            Q(**equal, **{f'{name}__{lookup}': values[position]})
+        )
+    # The redundant bound on the leading field lets the database seek
+    # straight to the cursor in the index instead of scanning up to it.
+    leading = ordering[0]
+    bound = 'lte' if leading.startswith('-') else 'gte'
+    return Q(**{f'{leading.lstrip("-")}__{bound}': values[0]}) & reduce(
+        operator.or_, conditions
+    )
+
+
+def row_values(row, ordering):
+    """
+    Returns the ordering values of ``row``, a model instance or a dict
+    from ``QuerySet.values()``.
+    """
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(row, dict):
+        return [row[name] for name in names]
+    return [getattr(row, name) for name in names]
+
+
+def reverse_ordering(ordering):
+    """
+    Returns ``ordering`` with the direction of every field flipped.
+    """
+    return [
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    ]
+
+
+def _slice_queryset(queryset, ordering, values, size, backwards):
+    ordering = list(ordering)
+    if backwards:
+        ordering = reverse_ordering(ordering)
+    if values is not None:
+        queryset = queryset.filter(after(ordering, values))
+    return queryset.order_by(*ordering)[:size + 1]
+
+
+def _trim_slice(rows, size, backwards):
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+    return rows, more
+
+
+def keyset_slice(queryset, ordering, values=None, size=20, backwards=False):
+    """
+    Returns ``(rows, more)``: the ``size`` rows of ``queryset`` following
+    ``values`` in ``ordering`` (or preceding them, with ``backwards``),
+    always in ``ordering``, and whether further rows lie beyond them.
+
+    A single query of ``size + 1`` rows is run, the extra row only telling
+    whether there is more.
+    """
+    rows = list(
+        _slice_queryset(queryset, ordering, values, size, backwards)
+    )
+    return _trim_slice(rows, size, backwards)
+
+
+async def akeyset_slice(queryset, ordering, values=None, size=20,
+                        backwards=False):
+    """
+    Async version of ``keyset_slice``.
+    """
+    rows = [
+        row async for row in
+        _slice_queryset(queryset, ordering, values, size, backwards)
+    ]
+    return _trim_slice(rows, size, backwards)
+
+
+def keyset_page(queryset, ordering, cursor=None, size=20):
+    """
+    Returns one page of ``queryset`` in ``ordering`` as ``(rows,
+    next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+
+    ``cursor`` is the ``next_cursor`` of the previous page; a malformed
+    one raises ``ValueError``.
+    """
+    values = (
+        decode_cursor(cursor, ordering, queryset.model) if cursor else None
+    )
+    rows, more = keyset_slice(queryset, ordering, values, size)
+    if not more:
+        return rows, None
+    return rows, encode_cursor(row_values(rows[-1], ordering))
+
+
+async def akeyset_page(queryset, ordering, cursor=None, size=20):
+    """
+    Async version of ``keyset_page``.
+    """
+    values = (
+        decode_cursor(cursor, ordering, queryset.model) if cursor else None
+    )
+    rows, more = await akeyset_slice(queryset, ordering, values, size)
+    if not more:
+        return rows, None
+    return rows, encode_cursor(row_values(rows[-1], ordering))
+
+
+def approximate_count(queryset, cap=1000):
+    """
+    Returns ``(count, exact)`` for ``queryset`` without counting past
+    ``cap`` rows.
+
+    An unfiltered PostgreSQL table is estimated from the planner
+    statistics; anything else is counted exactly up to ``cap`` and
+    reported as inexact beyond it.
+    """
+    connection = connections[queryset.db]
+    filtered = queryset.query.has_filters()
+    if connection.vendor == 'postgresql' and not filtered:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 for tables that were never analysed.
+        if row and row[0] > cap:
+            return row[0], False
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count <= cap
+
+
+class CursorPage:
+    """
+    A page of a cursor-paginated list, used as ``page_obj`` in templates.
+
+    Attributes:
+    - object_list: The rows of the page.
+    - has_next / has_previous: Whether there are rows after/before it.
+    - at_start: Whether this is the first page, reached without a cursor.
+    - next_querystring / previous_querystring / first_querystring: Query
+      strings (without ``?``) of the neighbouring and first pages.
+    - count: Approximate number of rows in the list, or ``None``.
+    - count_is_exact: Whether ``count`` is exact.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_querystring = ''
+        self.previous_querystring = ''
+        self.first_querystring = ''
+        self.at_start = True
+        self.count = None
+        self.count_is_exact = False
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def count_label(self):
+        """
+        Returns ``count`` for display, e.g. "57", "1,000+" or "~12,400".
+        """
+        if self.count is None:
+            return ''
+        if self.count_is_exact:
+            return f'{self.count:,}'
+        if self.count > 1000:
+            estimate = int(round(self.count, -len(str(self.count)) + 3))
+            return f'~{estimate:,}'
+        return f'{self.count:,}+'
+
+
+class CursorPaginationMixin:
+    """
+    Keyset pagination for ``ListView`` subclasses.
+
+    Replaces ``MultipleObjectMixin.paginate_queryset`` so that pages are
+    addressed by ``?after=<token>`` and ``?before=<token>`` instead of a
+    page number. ``page_obj`` is a ``CursorPage`` and ``paginator`` is
+    ``None``; templates render the controls with
+    ``{% include "store/pagination.html" %}``.
+
+    Attributes:
+    - cursor_ordering: Non-null fields ending with a unique one, ideally
+      matching an index.
+    - paginate_by: Rows per page.
+    - paginate_count: Whether to show an approximate row count.
+    - count_cap: Rows counted at most when estimating the count.
+    """
+
+    cursor_ordering = ('id',)
+    paginate_count = False
+    count_cap = 1000
+    after_param = 'after'
+    before_param = 'before'
+
+    def get_cursor_ordering(self):
+        return list(self.cursor_ordering)
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_cursor_ordering()
+        after_token = self.request.GET.get(self.after_param)
+        before_token = self.request.GET.get(self.before_param)
+        try:
+            if before_token:
+                values = decode_cursor(
+                    before_token, ordering, queryset.model
+                )
+                rows, has_previous = keyset_slice(
+                    queryset, ordering, values, page_size, backwards=True
+                )
+                has_next = True
+            else:
+                values = (
+                    decode_cursor(after_token, ordering, queryset.model)
+                    if after_token else None
+                )
+                rows, has_next = keyset_slice(
+                    queryset, ordering, values, page_size
+                )
+                has_previous = values is not None
+        except (ValueError, ValidationError, TypeError) as e:
+            raise Http404(str(e))
+
+        # A stale cursor can land on an empty page, which has no rows to
+        # take neighbouring cursors from; only "first" is offered then.
+        page = CursorPage(rows, has_next and bool(rows),
+                          has_previous and bool(rows))
+        page.at_start = not has_previous and bool(
+            rows or not (after_token or before_token)
+        )
+        if rows:
+            page.next_querystring = self._page_querystring(
+                self.after_param, row_values(rows[-1], ordering)
+            )
+            page.previous_querystring = self._page_querystring(
+                self.before_param, row_values(rows[0], ordering)
+            )
+        page.first_querystring = self._page_querystring(None, None)
+        if self.paginate_count:
+            page.count, page.count_is_exact = approximate_count(
+                queryset, self.count_cap
+            )
+        is_paginated = (
+            page.has_next or page.has_previous or not page.at_start
+        )
+        return None, page, rows, is_paginated
+
+    def _page_querystring(self, param, values):
+        query = self.request.GET.copy()
+        for name in ('page', self.after_param, self.before_param):
+            query.pop(name, None)
+        if param:
+            query[param] = encode_cursor(values)
+        return query.urlencode()
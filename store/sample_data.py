@@ -0,0 +1,606 @@
+"""
+Module: sample_data.py
+
+Contains the synthetic data generator behind the ``generate_data`` and
+``benchmark_views`` management commands.
+
+``SampleData.generate`` adds categories, vendors, items, customers,
+purchases, sales with their details, deliveries, invoices and bills to the
+database, in the proportions of ``scaled_counts`` or in counts of the
+caller's choosing. Rows are written with ``bulk_create`` in batches, with
+slugs from ``allocate_slugs`` and dates spread over the last ``days`` days
+(sales during opening hours, in date order). The same seed on the same
+database gives the same data.
+
+Signal handlers do not run for bulk inserts, so the generator keeps the
+derived state in step itself:
+
+- Every purchase and sale appends its movements to the stock ledger, and
+  items get an opening balance large enough for what was sold from them.
+  ``Item.quantity`` is then set from the ledger, so ``reconcile_stock``
+  finds nothing to correct.
+- Purchases and opening balances get stock lots (expiring for items with
+  an expiring date), which are then trimmed to the items' stock
+  first-expired-first-out, as sales would have taken them.
+- The dashboard counters, daily sales totals, sales report rollups and
+  product search index are rebuilt, and the autocomplete caches are
+  invalidated.
+"""
+
+# Standard library imports
+import itertools
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as day_time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+# Django core imports
+from django.db import transaction
+from django.utils import timezone
+
+# Local app imports
+from accounts.models import Customer, Vendor
+from bills.models import Bill
+from invoice.models import Invoice
+from reports import rollups
+from transactions import ledger, lots
+from transactions.models import (
+    Purchase, Sale, SaleDetail, StockLot, StockMovement,
+)
+from . import caching, metrics, search
+from .models import Category, Delivery, Item
+from .slugs import allocate_slugs
+
+# Rows per bulk_create.
+BATCH_SIZE = 2000
+
+# Models in the order they are generated; later ones refer to earlier ones.
+MODELS = (
+    'categories', 'vendors', 'items', 'customers', 'purchases', 'sales',
+    'deliveries', 'invoices', 'bills',
+)
+
+# Sales are made between these hours.
+OPENING_HOUR = 8
+CLOSING_HOUR = 20
+
+CENT = Decimal('0.01')
+
+WORDS = (
+    'basmati', 'rice', 'brown', 'sugar', 'white', 'bread', 'whole', 'wheat',
+    'flour', 'maize', 'meal', 'cooking', 'oil', 'sunflower', 'olive',
+    'salt', 'table', 'milk', 'fresh', 'long', 'life', 'yoghurt', 'plain',
+    'strawberry', 'butter', 'salted', 'cheese', 'cheddar', 'eggs', 'tray',
+    'tea', 'leaves', 'coffee', 'instant', 'ground', 'beans', 'kidney',
+    'green', 'peas', 'lentils', 'red', 'spaghetti', 'macaroni', 'tomato',
+    'paste', 'sauce', 'chilli', 'soap', 'bar', 'laundry', 'detergent',
+    'powder', 'tissue', 'toilet', 'paper', 'juice', 'orange', 'mango',
+    'apple', 'biscuits', 'cream', 'chocolate', 'water', 'bottled',
+)
+
+SYLLABLES = (
+    'ka', 'ri', 'mo', 'ta', 'ne', 'su', 'lo', 'bi', 'za', 'ku', 'pe', 'do',
+    'ma', 'ni', 'vo', 'ge', 'ra', 'shi', 'tu', 'ba', 'le', 'wa', 'fi', 'yo',
+)
+
+CATEGORIES = (
+    'Grains', 'Baking', 'Dairy', 'Beverages', 'Snacks', 'Cleaning',
+    'Toiletries', 'Canned Food', 'Spices', 'Fresh Produce', 'Frozen Food',
+    'Household', 'Stationery', 'Baby Care', 'Pet Supplies',
+)
+
+FIRST_NAMES = (
+    'Amina', 'Brian', 'Cynthia', 'David', 'Esther', 'Faith', 'George',
+    'Hellen', 'Ian', 'Joyce', 'Kevin', 'Lucy', 'Moses', 'Naomi', 'Otieno',
+    'Peter', 'Rose', 'Samuel', 'Teresa', 'Wanjiru', 'Yusuf', 'Zawadi',
+)
+
+LAST_NAMES = (
+    'Achieng', 'Barasa', 'Chebet', 'Kamau', 'Kariuki', 'Kiprono', 'Mutua',
+    'Njoroge', 'Odhiambo', 'Omondi', 'Otieno', 'Wafula', 'Wambui', 'Wekesa',
+)
+
+TOWNS = (
+    'Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Nyeri',
+    'Machakos', 'Meru', 'Kitale', 'Malindi', 'Naivasha',
+)
+
+VENDOR_SUFFIXES = ('Distributors', 'Wholesalers', 'Traders', 'Supplies')
+
+INSTITUTIONS = (
+    'Kenya Power', 'Nairobi Water', 'Safaricom', 'County Rates',
+    'Waste Collection', 'Security Services', 'Landlord', 'Insurance',
+)
+
+
+def brand(rng):
+    """
+    Returns a made-up brand name.
+    """
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def scaled_counts(sales):
+    """
+    Returns the number of rows of each model (see ``MODELS``) in a data
+    set with ``sales`` sales.
+    """
+    items = max(sales // 10, 20)
+    return {
+        'categories': min(max(items // 100, 5), 200),
+        'vendors': max(items // 40, 5),
+        'items': items,
+        'customers': max(sales // 20, 10),
+        'purchases': max(sales // 10, 10),
+        'sales': sales,
+        'deliveries': sales // 20,
+        'invoices': sales // 20,
+        'bills': sales // 100,
+    }
+
+
+def money(value):
+    """
+    Returns ``value`` as a ``Decimal`` rounded to the cent.
+    """
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def batches(iterable, size):
+    """
+    Yields lists of ``size`` items of ``iterable``, the last one shorter.
+    """
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def explicit_dates(*models):
+    """
+    Lets ``bulk_create`` save the dates given to the ``auto_now`` and
+    ``auto_now_add`` fields of ``models`` instead of the current time.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class SampleData:
+    """
+    Generates a reproducible data set from ``seed``.
+
+    Attributes:
+    - days: Number of days, up to now, the generated dates span.
+    - batch_size: Rows per ``bulk_create``.
+    - progress: Callable receiving the name of each model generated, the
+      number of rows and the seconds it took.
+    """
+
+    def __init__(self, seed=None, days=365, batch_size=BATCH_SIZE,
+                 progress=None):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.batch_size = batch_size
+        self.progress = progress or (lambda name, count, seconds: None)
+        self.end = timezone.now().replace(microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        # Net stock change per item of the movements written so far.
+        self.stock = {}
+
+    def generate(self, counts):
+        """
+        Adds ``counts[name]`` rows of each model named in ``MODELS`` (see
+        ``scaled_counts``) to the ones already in the database.
+        """
+        self.stock = {}
+        with transaction.atomic(), explicit_dates(
+            Sale, Purchase, StockMovement, StockLot, Invoice, Bill
+        ):
+            for name in MODELS:
+                if not counts.get(name):
+                    continue
+                start = time.perf_counter()
+                getattr(self, f'create_{name}')(counts[name])
+                self.progress(
+                    name, counts[name], time.perf_counter() - start
+                )
+
+            start = time.perf_counter()
+            self.balance_stock()
+            lots.reconcile()
+            metrics.rebuild_metrics()
+            rollups.rebuild()
+            search.get_backend().rebuild()
+            self.progress('derived data', None, time.perf_counter() - start)
+        caching.invalidate(caching.ITEMS)
+        caching.invalidate(caching.CUSTOMERS)
+
+    def bulk_create(self, model, objects):
+        """
+        Saves ``objects`` (an iterable of unsaved ``model`` instances) in
+        batches with their slugs allocated. Returns them with their
+        primary keys set.
+        """
+        created = []
+        for batch in batches(objects, self.batch_size):
+            created.extend(model.objects.bulk_create(allocate_slugs(batch)))
+        return created
+
+    def moment(self, start=None, end=None):
+        """
+        Returns a random moment between ``start`` and ``end`` (the
+        generated period by default).
+        """
+        start = start or self.start
+        end = end or self.end
+        seconds = (end - start).total_seconds()
+        return start + timedelta(seconds=int(self.rng.random() * seconds))
+
+    def pks(self, model):
+        return list(
+            model.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def phone(self):
+        return f'+2547{self.rng.randrange(10 ** 8):08d}'
+
+    def create_categories(self, count):
+        names = (
+            name if number == 0 else f'{name} {number + 1}'
+            for number in itertools.count()
+            for name in CATEGORIES
+        )
+        self.bulk_create(
+            Category,
+            (Category(name=name) for name in itertools.islice(names, count)),
+        )
+
+    def create_vendors(self, count):
+        self.bulk_create(Vendor, (
+            Vendor(
+                name=(
+                    f'{brand(self.rng).title()} '
+                    f'{self.rng.choice(VENDOR_SUFFIXES)}'
+                ),
+                phone_number=2547 * 10 ** 8 + self.rng.randrange(10 ** 8),
+                address=self.rng.choice(TOWNS),
+            )
+            for _ in range(count)
+        ))
+
+    def create_items(self, count):
+        categories = self.pks(Category)
+        vendors = self.pks(Vendor)
+        self.bulk_create(
+            Item, (self.item(categories, vendors) for _ in range(count))
+        )
+
+    def item(self, categories, vendors):
+        rng = self.rng
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        expiring_date = None
+        if rng.random() < 0.4:
+            expiring_date = self.end + timedelta(days=rng.randint(7, 720))
+        return Item(
+            name=' '.join([brand(rng), *words]).capitalize()[:50],
+            description=' '.join(rng.sample(WORDS, 8)),
+            category_id=rng.choice(categories),
+            # Prices from 20 to 5000 shillings, most of them low.
+            price=round(math.exp(rng.uniform(math.log(20), math.log(5000)))),
+            expiring_date=expiring_date,
+            vendor_id=rng.choice(vendors),
+        )
+
+    def create_customers(self, count):
+        def customer():
+            first_name, last_name = self.person()
+            return Customer(
+                first_name=first_name,
+                last_name=last_name,
+                address=self.rng.choice(TOWNS),
+                email=(
+                    f'{first_name}.{last_name}{self.rng.randrange(10000)}'
+                    '@example.com'
+                ).lower(),
+                phone=self.phone(),
+                loyalty_points=self.rng.randrange(500),
+            )
+
+        self.bulk_create(Customer, (customer() for _ in range(count)))
+
+    def popular_items(self):
+        """
+        Returns the ``(pk, price)`` of every item and the cumulative
+        weights of a long-tailed popularity: a few items sell far more
+        than the rest.
+        """
+        items = list(
+            Item.objects.order_by('pk').values_list('pk', 'price')
+        )
+        weights = [1 / (rank + 1) for rank in range(len(items))]
+        self.rng.shuffle(weights)
+        return items, list(itertools.accumulate(weights))
+
+    def move_stock(self, movements):
+        """
+        Saves ``movements`` and adds them to the net stock changes.
+        """
+        for movement in movements:
+            self.stock[movement.item_id] = (
+                self.stock.get(movement.item_id, 0) + movement.quantity
+            )
+        StockMovement.objects.bulk_create(movements)
+
+    def create_purchases(self, count):
+        items = {}
+        perishable = set()
+        for pk, vendor_id, expiring_date in Item.objects.order_by(
+            'pk'
+        ).values_list('pk', 'vendor_id', 'expiring_date'):
+            items[pk] = vendor_id
+            if expiring_date:
+                perishable.add(pk)
+        item_ids = list(items)
+        vendors = self.pks(Vendor)
+        recent = self.end - timedelta(days=7)
+
+        def purchase():
+            item_id = self.rng.choice(item_ids)
+            order_date = self.moment()
+            quantity = self.rng.randint(10, 200)
+            price = money(self.rng.randint(10, 4000))
+            delivered = order_date < recent or self.rng.random() < 0.3
+            expiring_date = (
+                order_date + timedelta(days=self.rng.randint(30, 540))
+                if item_id in perishable else None
+            )
+            return Purchase(
+                item_id=item_id,
+                vendor_id=items[item_id] or self.rng.choice(vendors),
+                description='',
+                order_date=order_date,
+                delivery_date=(
+                    order_date + timedelta(days=self.rng.randint(1, 7))
+                    if delivered else None
+                ),
+                quantity=quantity,
+                expiring_date=expiring_date,
+                delivery_status='S' if delivered else 'P',
+                price=price,
+                total_value=price * quantity,
+            )
+
+        for batch in batches(
+            (purchase() for _ in range(count)), self.batch_size
+        ):
+            purchases = Purchase.objects.bulk_create(allocate_slugs(batch))
+            self.move_stock([
+                StockMovement(
+                    item_id=purchase.item_id,
+                    kind=ledger.PURCHASE,
+                    quantity=purchase.quantity,
+                    purchase=purchase,
+                    created_at=purchase.order_date,
+                )
+                for purchase in purchases
+            ])
+            batch_lots = []
+            for purchase in purchases:
+                lot = lots.lot_for(
+                    purchase.item_id, purchase.quantity,
+                    purchase.expiring_date, purchase,
+                )
+                lot.created_at = purchase.order_date
+                batch_lots.append(lot)
+            StockLot.objects.bulk_create(batch_lots)
+
+    def sale_dates(self, count):
+        """
+        Yields ``count`` sale dates in order, during opening hours.
+        """
+        days = (self.end - self.start).days or 1
+        per_batch = max(1, math.ceil(days * self.batch_size / count))
+        start = timezone.localdate(self.start)
+        opening = (CLOSING_HOUR - OPENING_HOUR) * 3600
+        remaining = count
+        # Each batch of sales covers its own stretch of days.
+        for first_day in range(0, days, per_batch):
+            batch_days = min(per_batch, days - first_day)
+            size = min(remaining, math.ceil(count * batch_days / days))
+            moments = sorted(
+                self.rng.randrange(batch_days * opening) for _ in range(size)
+            )
+            for moment in moments:
+                day = start + timedelta(days=first_day + moment // opening)
+                yield timezone.make_aware(
+                    datetime.combine(day, day_time(OPENING_HOUR))
+                ) + timedelta(seconds=moment % opening)
+            remaining -= size
+
+    def create_sales(self, count):
+        items, weights = self.popular_items()
+        customers = self.pks(Customer)
+        for dates in batches(self.sale_dates(count), self.batch_size):
+            sales = []
+            lines = []
+            for date_added in dates:
+                sale, sale_lines = self.sale(
+                    date_added, customers, items, weights
+                )
+                sales.append(sale)
+                lines.append(sale_lines)
+            sales = Sale.objects.bulk_create(sales)
+
+            details = []
+            movements = []
+            for sale, sale_lines in zip(sales, lines):
+                for item_id, price, quantity in sale_lines:
+                    details.append(SaleDetail(
+                        sale=sale,
+                        item_id=item_id,
+                        price=price,
+                        quantity=quantity,
+                        total_detail=price * quantity,
+                    ))
+                    movements.append(StockMovement(
+                        item_id=item_id,
+                        kind=ledger.SALE,
+                        quantity=-quantity,
+                        sale=sale,
+                        created_at=sale.date_added,
+                    ))
+            SaleDetail.objects.bulk_create(details)
+            self.move_stock(movements)
+
+    def sale(self, date_added, customers, items, weights):
+        """
+        Returns an unsaved sale and its ``(item_id, price, quantity)``
+        lines.
+        """
+        rng = self.rng
+        picked = rng.choices(items, cum_weights=weights, k=rng.randint(1, 5))
+        lines = {}
+        for item_id, price in picked:
+            quantity = rng.choice((1, 1, 1, 2, 2, 3, 5))
+            if item_id in lines:
+                quantity += lines[item_id][2]
+            lines[item_id] = (item_id, money(price), quantity)
+        lines = list(lines.values())
+
+        sub_total = sum(price * quantity for _, price, quantity in lines)
+        tax_percentage = rng.choice((0, 0, 16))
+        tax_amount = money(sub_total * tax_percentage / 100)
+        grand_total = sub_total + tax_amount
+        # Paid in notes of 50 shillings or more.
+        amount_paid = Decimal(math.ceil(grand_total / 50) * 50)
+        sale = Sale(
+            date_added=date_added,
+            customer_id=rng.choice(customers),
+            sub_total=sub_total,
+            grand_total=grand_total,
+            tax_amount=tax_amount,
+            tax_percentage=tax_percentage,
+            amount_paid=amount_paid,
+            amount_change=amount_paid - grand_total,
+        )
+        return sale, lines
+
+    def create_deliveries(self, count):
+        item_ids = self.pks(Item)
+        recent = self.end - timedelta(days=3)
+
+        def delivery():
+            date = self.moment()
+            return Delivery(
+                item_id=self.rng.choice(item_ids),
+                customer_name=' '.join(self.person()),
+                phone_number=self.phone(),
+                location=self.rng.choice(TOWNS),
+                date=date,
+                is_delivered=date < recent,
+            )
+
+        self.bulk_create(Delivery, (delivery() for _ in range(count)))
+
+    def create_invoices(self, count):
+        items = list(
+            Item.objects.order_by('pk').values_list('pk', 'price')
+        )
+
+        def invoice():
+            item_id, price = self.rng.choice(items)
+            quantity = self.rng.randint(1, 50)
+            shipping = self.rng.choice((0, 200, 500))
+            total = round(quantity * price, 2)
+            return Invoice(
+                date=self.moment(),
+                customer_name=' '.join(self.person()),
+                contact_number=self.phone(),
+                item_id=item_id,
+                price_per_item=price,
+                quantity=quantity,
+                shipping=shipping,
+                total=total,
+                grand_total=round(total + shipping, 2),
+            )
+
+        self.bulk_create(Invoice, (invoice() for _ in range(count)))
+
+    def create_bills(self, count):
+        paid_before = self.end - timedelta(days=30)
+
+        def bill():
+            date = self.moment()
+            institution_name = self.rng.choice(INSTITUTIONS)
+            return Bill(
+                date=date,
+                institution_name=institution_name,
+                phone_number=700000000 + self.rng.randrange(10 ** 8),
+                email=(
+                    institution_name.lower().replace(' ', '') + '@example.com'
+                ),
+                address=self.rng.choice(TOWNS),
+                description=f'{institution_name} for {date:%B %Y}',
+                payment_details=self.rng.choice(
+                    ('M-Pesa paybill', 'Bank transfer', 'Cash', 'Cheque')
+                ),
+                amount=self.rng.randint(10, 500) * 100,
+                status=date < paid_before or self.rng.random() < 0.5,
+            )
+
+        self.bulk_create(Bill, (bill() for _ in range(count)))
+
+    def balance_stock(self):
+        """
+        Gives the items stocked or sold an opening balance covering what
+        went out, and sets their cached balances from the ledger.
+        """
+        if not self.stock:
+            return
+        openings = []
+        opening_lots = []
+        updated = []
+        items = Item.objects.filter(pk__in=self.stock).only(
+            'id', 'quantity', 'expiring_date'
+        )
+        for item in items.iterator(chunk_size=self.batch_size):
+            balance = item.quantity + self.stock[item.pk]
+            if balance < 0 or not item.quantity:
+                opening = max(-balance, 0) + self.rng.randint(0, 100)
+                openings.append(StockMovement(
+                    item_id=item.pk,
+                    kind=ledger.ADJUSTMENT,
+                    quantity=opening,
+                    note='Opening balance',
+                    created_at=self.start,
+                ))
+                if opening:
+                    lot = lots.lot_for(item, opening, item.expiring_date)
+                    lot.created_at = self.start
+                    opening_lots.append(lot)
+                balance += opening
+            item.quantity = balance
+            updated.append(item)
+        for batch in batches(openings, self.batch_size):
+            StockMovement.objects.bulk_create(batch)
+        StockLot.objects.bulk_create(opening_lots, batch_size=self.batch_size)
+        Item.objects.bulk_update(
+            updated, ['quantity'], batch_size=self.batch_size
+        )
@@ -0,0 +1,290 @@
+"""
+Module: search.py
+
+Contains the product search backends used by the item search page and the
+sale screen's item autocomplete.
+
+Backends:
+- SQLiteFTSBackend: FTS5 full-text index in the ``store_item_fts`` virtual
+  table, kept in sync by the ``Item`` signal handlers in ``store.signals``.
+- PostgresSearchBackend: ``tsvector`` prefix matching backed by a GIN
+  expression index, plus a trigram index serving ``icontains`` lookups.
+- ContainsSearchBackend: plain ``icontains`` filtering, used when neither
+  of the above is available.
+
+Every backend matches each search token as a word prefix ("ric bas" finds
+"Basmati Rice"; the fallback also matches inside words) in the name or the
+description, and ranks name matches above description matches.
+
+``get_backend()`` picks the backend for the default database, or the one
+named by the ``STORE_SEARCH_BACKEND`` setting (a dotted class path).
+"""
+
+# Standard library imports
+import operator
+from functools import lru_cache, reduce
+
+# Django core imports
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Q, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# Local app imports
+from .models import Item
+
+FTS_TABLE = 'store_item_fts'
+
+
+def tokenize(term):
+    """
+    Splits a search term into lowercase tokens.
+    """
+    return [token for token in term.lower().split() if token]
+
+
+def order_by_ids(queryset, ids):
+    """
+    Returns ``queryset`` restricted to ``ids`` and ordered like them.
+    """
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *(When(pk=pk, then=position) for position, pk in enumerate(ids))
+    ))
+
+
+class ContainsSearchBackend:
+    """
+    Search backend using ``icontains`` on the item name and description.
+
+    Needs no index but scans the whole item table on every search. Items
+    are ranked by how many tokens their name contains.
+    """
+
+    def filter(self, queryset, term):
+        """
+        Returns ``queryset`` restricted to the items matching ``term``.
+        """
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset
+        return queryset.filter(reduce(operator.and_, (
+            Q(name__icontains=t) | Q(description__icontains=t)
+            for t in tokens
+        )))
+
+    def ranked_ids(self, term, limit):
+        """
+        Returns the ids of the best ``limit`` items matching ``term``.
+        """
+        queryset = self.filter(Item.objects.all(), term)
+        tokens = tokenize(term)
+        if tokens:
+            queryset = queryset.annotate(name_matches=reduce(operator.add, (
+                Case(When(name__icontains=t, then=1), default=0)
+                for t in tokens
+            ))).order_by('-name_matches', 'name')
+        return list(queryset.values_list('pk', flat=True)[:limit])
+
+    def index(self, items):
+        """
+        Adds or refreshes ``items`` in the search index.
+        """
+
+    def remove(self, pks):
+        """
+        Removes the items with primary keys ``pks`` from the index.
+        """
+
+    def rebuild(self):
+        """
+        Rebuilds the whole search index from the item table.
+        """
+
+
+class SQLiteFTSBackend(ContainsSearchBackend):
+    """
+    Search backend using an SQLite FTS5 virtual table.
+
+    The table is created by the ``0003_item_search_index`` migration and
+    keyed by item primary key (the FTS ``rowid``).
+    """
+
+    # bm25() column weights: name, description.
+    weights = (10.0, 1.0)
+
+    @staticmethod
+    def match_expression(term):
+        """
+        Builds an FTS5 query matching every token as a prefix.
+        """
+        return ' '.join(
+            '"{}"*'.format(token.replace('"', '""'))
+            for token in tokenize(term)
+        )
+
+    def filter(self, queryset, term):
+        expression = self.match_expression(term)
+        if not expression:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [expression],
+        ))
+
+    def ranked_ids(self, term, limit):
+        expression = self.match_expression(term)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s',
+                [expression, *self.weights, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index(self, items):
+        rows = [(item.pk, item.name, item.description) for item in items]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+                f'VALUES (%s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, pks):
+        if not pks:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in pks],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+                f'SELECT id, name, description FROM {Item._meta.db_table}'
+            )
+
+
+class PostgresSearchBackend(ContainsSearchBackend):
+    """
+    Search backend using PostgreSQL full-text search.
+
+    The ``0003_item_search_index`` migration adds a GIN index on the same
+    ``SearchVector`` used here, so PostgreSQL keeps it up to date itself.
+    """
+
+    config = 'simple'
+
+    def vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        return SearchVector('name', 'description', config=self.config)
+
+    def query(self, term):
+        from django.contrib.postgres.search import SearchQuery
+
+        tokens = [
+            ''.join(c for c in token if c.isalnum())
+            for token in tokenize(term)
+        ]
+        tokens = [token for token in tokens if token]
+        if not tokens:
+            return None
+        return SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens),
+            config=self.config,
+            search_type='raw',
+        )
+
+    def filter(self, queryset, term):
+        query = self.query(term)
+        if query is None:
+            return queryset
+        return queryset.annotate(search=self.vector()).filter(search=query)
+
+    def ranked_ids(self, term, limit):
+        from django.contrib.postgres.search import SearchRank, SearchVector
+
+        query = self.query(term)
+        if query is None:
+            return []
+        weighted = (
+            SearchVector('name', weight='A', config=self.config)
+            + SearchVector('description', weight='B', config=self.config)
+        )
+        queryset = (
+            self.filter(Item.objects.all(), term)
+            .annotate(rank=SearchRank(weighted, query))
+            .order_by('-rank', 'name')
+        )
+        return list(queryset.values_list('pk', flat=True)[:limit])
+
+
+def sqlite_has_fts5():
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """
+    Returns the search backend for the default database.
+    """
+    path = getattr(settings, 'STORE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite' and sqlite_has_fts5():
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return ContainsSearchBackend()
+
+
+def search_items(queryset, term):
+    """
+    Restricts an ``Item`` queryset to the items matching ``term``.
+    """
+    return get_backend().filter(queryset, term)
+
+
+def autocomplete_items(term, limit=10):
+    """
+    Returns the best ``limit`` items for ``term``, best match first.
+    """
+    ids = get_backend().ranked_ids(term, limit)
+    return list(order_by_ids(Item.objects.select_related('category'), ids))
+
+
+def _ranked_ids(term, limit):
+    return get_backend().ranked_ids(term, limit)
+
+
+async def aautocomplete_items(term, limit=10):
+    """
+    Async version of ``autocomplete_items``.
+
+    The backends rank with raw SQL, which has no async API, so only
+    fetching the ranked items goes through the async ORM.
+    """
+    ids = await sync_to_async(_ranked_ids)(term, limit)
+    return [
+        item async for item in
+        order_by_ids(Item.objects.select_related('category'), ids)
+    ]
@@ -0,0 +1,186 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from transactions import ledger, lots
+from transactions.models import Sale
+from . import caching, fragments, metrics, search, slugs
+from .models import Category, DashboardMetric, Delivery, Item
+
+
+@receiver(pre_save)
+def allocate_slug(sender, instance, raw=False, **kwargs):
+    """
+    Signal to allocate the slug of new instances of every model with an
+    ``AutoSlugField``, instead of letting the field probe for a free one.
+    """
+    if not raw and instance._state.adding and slugs.slug_fields(sender):
+        slugs.allocate_slugs([instance])
+
+
+@receiver(post_save, sender=Item)
+def track_item_saved(sender, instance, created, raw=False,
+                     update_fields=None, **kwargs):
+    """
+    Signal to keep the item counters in step when an item is saved, to
+    log quantities typed in directly as stock adjustments, and to put the
+    opening balance of a new item in a stock lot.
+
+    Saves restricted by ``update_fields`` only track the fields they wrote.
+    """
+    if raw:
+        return
+    saved = update_fields or ('quantity', 'category')
+    if created:
+        metrics.bump(metrics.ITEMS, 1)
+        metrics.bump(metrics.ITEMS_QUANTITY, instance.quantity)
+        metrics.bump(metrics.category_key(instance.category_id), 1)
+        if instance.quantity:
+            ledger.log_adjustment(
+                instance, instance.quantity, note='Opening balance'
+            )
+        if instance.quantity > 0:
+            lots.lot_for(
+                instance, instance.quantity, instance.expiring_date
+            ).save()
+    else:
+        loaded_quantity = getattr(instance, '_loaded_quantity', None)
+        if 'quantity' in saved and loaded_quantity is not None:
+            delta = instance.quantity - loaded_quantity
+            if delta:
+                metrics.bump(metrics.ITEMS_QUANTITY, delta)
+                ledger.log_adjustment(instance, delta)
+        loaded_category_id = getattr(instance, '_loaded_category_id', None)
+        if 'category' in saved and loaded_category_id not in (
+            None, instance.category_id
+        ):
+            metrics.bump(metrics.category_key(loaded_category_id), -1)
+            metrics.bump(metrics.category_key(instance.category_id), 1)
+    if 'quantity' in saved:
+        instance._loaded_quantity = instance.quantity
+    if 'category' in saved:
+        instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Item)
+def track_item_deleted(sender, instance, **kwargs):
+    """
+    Signal to keep the item counters in step when an item is deleted.
+    """
+    metrics.bump(metrics.ITEMS, -1)
+    metrics.bump(metrics.ITEMS_QUANTITY, -instance.quantity)
+    metrics.bump(metrics.category_key(instance.category_id), -1)
+
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, raw=False, **kwargs):
+    """
+    Signal to keep the product search index in step with item saves.
+    """
+    if not raw:
+        search.get_backend().index([instance])
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item(sender, instance, **kwargs):
+    """
+    Signal to drop deleted items from the product search index.
+    """
+    search.get_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_item_choices(sender, **kwargs):
+    """
+    Signal to drop the cached item autocomplete results and dashboard
+    widgets once a change to an item or a category (whose name they
+    include) is committed.
+    """
+    transaction.on_commit(lambda: caching.invalidate(caching.ITEMS))
+    fragments.invalidate(fragments.DASHBOARD)
+
+
+@receiver(post_save, sender=Category)
+def track_category_saved(sender, instance, raw=False, **kwargs):
+    """
+    Signal to create or relabel the item count of a category.
+    """
+    if not raw:
+        metrics.bump(
+            metrics.category_key(instance.pk), 0, label=instance.name
+        )
+
+
+@receiver(post_delete, sender=Category)
+def track_category_deleted(sender, instance, **kwargs):
+    """
+    Signal to drop the item count of a deleted category.
+    """
+    DashboardMetric.objects.filter(
+        key=metrics.category_key(instance.pk)
+    ).delete()
+
+
+@receiver(post_save, sender=Profile)
+def track_profile_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Signal to count new profiles.
+    """
+    if created and not raw:
+        metrics.bump(metrics.PROFILES, 1)
+
+
+@receiver(post_delete, sender=Profile)
+def track_profile_deleted(sender, instance, **kwargs):
+    """
+    Signal to uncount deleted profiles.
+    """
+    metrics.bump(metrics.PROFILES, -1)
+
+
+@receiver(post_save, sender=Delivery)
+def track_delivery_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Signal to count new deliveries.
+    """
+    if created and not raw:
+        metrics.bump(metrics.DELIVERIES, 1)
+
+
+@receiver(post_delete, sender=Delivery)
+def track_delivery_deleted(sender, instance, **kwargs):
+    """
+    Signal to uncount deleted deliveries.
+    """
+    metrics.bump(metrics.DELIVERIES, -1)
+
+
+@receiver(post_save, sender=Sale)
+def track_sale_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Signal to add a new sale to the counters and its day's total once it
+    is committed.
+    """
+    if created and not raw:
+        date_added, grand_total = instance.date_added, instance.grand_total
+        transaction.on_commit(
+            lambda: metrics.record_sale(date_added, grand_total),
+            robust=True,
+        )
+
+
+@receiver(post_delete, sender=Sale)
+def track_sale_deleted(sender, instance, **kwargs):
+    """
+    Signal to remove a deleted sale from the counters and its day's total
+    once the deletion is committed.
+    """
+    date_added, grand_total = instance.date_added, instance.grand_total
+    transaction.on_commit(
+        lambda: metrics.record_sale(date_added, -grand_total, count=-1),
+        robust=True,
+    )
@@ -0,0 +1,253 @@
+"""
+Module: slugs.py
+
+Contains slug allocation for models using ``AutoSlugField``.
+
+On save, ``AutoSlugField`` probes the table once per candidate (``acme``,
+``acme-2``, ``acme-3``...) until it finds a free slug, and gives up after
+100 attempts: a vendor's 100th purchase, or the 100th invoice (slugged from
+a date that is only set after the slug), cannot be saved. It also cannot
+see the other rows of a ``bulk_create`` batch, so same-named rows in a
+batch collide.
+
+``allocate_slugs`` fills in the slugs of a whole batch up front instead:
+
+- One ``IN`` query finds which of the wanted slugs are taken.
+- Names that need a ``-N`` suffix (taken, or repeated within the batch)
+  reserve their suffixes from a ``SlugSequence`` counter in one update, so
+  the cost does not grow with the number of rows sharing the name. The
+  counter is seeded from the existing slugs the first time a name needs a
+  suffix.
+- One more ``IN`` query checks that the reserved slugs are free, since
+  slugs saved without the allocator may have taken some.
+
+The slugify rules and suffixes are those of the field; a name that
+slugifies to nothing falls back to the model name. The fields are declared
+with ``overwrite_on_add=False`` so that allocated slugs are saved as they
+are. ``store.signals.allocate_slug`` allocates the slug of every new
+instance on save; code using ``bulk_create`` calls ``allocate_slugs``.
+"""
+
+# Standard library imports
+import functools
+from collections import Counter, defaultdict
+
+# Django core imports
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, transaction
+from django.db.models import F, Q, prefetch_related_objects
+from django.db.models.constants import LOOKUP_SEP
+
+# Third-party packages
+from django_extensions.db.fields import AutoSlugField
+
+# Local app imports
+from .models import SlugSequence
+
+# Slugs checked per ``IN`` query.
+IN_BATCH_SIZE = 900
+
+# Room kept for a ``-N`` suffix when truncating a base slug to look up
+# the slugs derived from it.
+SUFFIX_ROOM = 8
+
+
+@functools.cache
+def slug_fields(model):
+    """
+    Returns the ``AutoSlugField`` fields of ``model``.
+    """
+    return tuple(
+        field for field in model._meta.concrete_fields
+        if isinstance(field, AutoSlugField)
+    )
+
+
+def base_slug(field, instance):
+    """
+    Returns the slug ``field`` (an ``AutoSlugField``) derives from
+    ``instance`` before making it unique.
+    """
+    populate_from = field._populate_from
+    if not isinstance(populate_from, (list, tuple)):
+        populate_from = (populate_from,)
+    slugify_function = getattr(
+        instance, 'slugify_function', field.slugify_function
+    )
+    slug = field.separator.join(
+        field.slugify_func(
+            field.get_slug_fields(instance, lookup_value), slugify_function
+        ) or ''
+        for lookup_value in populate_from
+    )
+    if field.max_length:
+        slug = slug[:field.max_length]
+    return field._slug_strip(slug) or instance._meta.model_name
+
+
+def _with_suffix(field, base, number):
+    end = f'{field.separator}{number}'
+    if field.max_length and len(base) + len(end) > field.max_length:
+        base = field._slug_strip(base[:field.max_length - len(end)])
+    return f'{base}{end}'
+
+
+def _prefetch_sources(instances, field):
+    # Slugs populated from a relation (a purchase's vendor) would otherwise
+    # load the related record once per instance.
+    populate_from = field._populate_from
+    if not isinstance(populate_from, (list, tuple)):
+        populate_from = (populate_from,)
+    for lookup_value in populate_from:
+        if callable(lookup_value):
+            continue
+        path = []
+        model = field.model
+        for name in lookup_value.split(LOOKUP_SEP):
+            try:
+                related = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                break
+            if not (related.many_to_one or related.one_to_one):
+                break
+            path.append(name)
+            model = related.related_model
+        if path:
+            prefetch_related_objects(instances, LOOKUP_SEP.join(path))
+
+
+def _prefix_filter(name, prefix):
+    if connection.vendor == 'sqlite':
+        # SQLite's LIKE is case-insensitive and cannot use the slug's
+        # index; a range over the (binary collated) index can.
+        return Q(**{
+            f'{name}__gte': prefix,
+            f'{name}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1),
+        })
+    # PostgreSQL indexes unique slugs with pattern ops for LIKE.
+    return Q(**{f'{name}__startswith': prefix})
+
+
+def _clash_filter(field, base):
+    name = field.attname
+    limit = field.max_length - SUFFIX_ROOM if field.max_length else None
+    if limit is not None and len(base) > limit:
+        # Suffixed variants of a long slug are truncated to make room for
+        # the suffix, so only a shorter prefix is shared by all of them.
+        return _prefix_filter(name, base[:limit])
+    return Q(**{name: base}) | _prefix_filter(
+        name, f'{base}{field.separator}'
+    )
+
+
+def _taken(queryset, field, slugs):
+    """
+    Returns those of ``slugs`` already saved in ``queryset``.
+    """
+    slugs = sorted(slugs)
+    taken = set()
+    for start in range(0, len(slugs), IN_BATCH_SIZE):
+        taken.update(queryset.filter(**{
+            f'{field.attname}__in': slugs[start:start + IN_BATCH_SIZE]
+        }).values_list(field.attname, flat=True))
+    return taken
+
+
+def _highest_suffix(queryset, field, base):
+    # Non-numeric tails ("acme-corp") are skipped and unrelated numbers
+    # ("acme-corp-3") only make the counter start higher than needed.
+    highest = 1
+    derived = queryset.filter(_clash_filter(field, base))
+    for slug in derived.values_list(field.attname, flat=True).iterator():
+        tail = slug.rpartition(field.separator)[2]
+        if slug != base and tail.isdigit():
+            highest = max(highest, int(tail))
+    return highest
+
+
+def _reserve(queryset, field, base, count):
+    """
+    Returns ``count`` suffix numbers for ``base`` that no earlier
+    reservation handed out.
+    """
+    key = f'{field.model._meta.label_lower}.{field.name}'
+    sequence = SlugSequence.objects.filter(field=key, base=base)
+    # The update locks the counter until the surrounding transaction ends,
+    # so that the read below sees no other reservation.
+    with transaction.atomic(savepoint=False):
+        if not sequence.update(last=F('last') + count):
+            highest = _highest_suffix(queryset, field, base)
+            _, created = SlugSequence.objects.get_or_create(
+                field=key, base=base, defaults={'last': highest + count}
+            )
+            if created:
+                return range(highest + 1, highest + count + 1)
+            sequence.update(last=F('last') + count)
+        last = sequence.values_list('last', flat=True).get()
+    return range(last - count + 1, last + 1)
+
+
+def allocate_slugs(instances):
+    """
+    Sets a unique slug in every empty ``AutoSlugField`` of ``instances``
+    (unsaved instances of one model). Returns ``instances``.
+    """
+    if not instances:
+        return instances
+    for field in slug_fields(type(instances[0])):
+        _allocate(instances, field)
+    return instances
+
+
+def _allocate(instances, field):
+    pending = [
+        instance for instance in instances
+        if not getattr(instance, field.attname)
+    ]
+    if not pending:
+        return
+    _prefetch_sources(pending, field)
+    bases = [base_slug(field, instance) for instance in pending]
+    queryset = field.model._default_manager.order_by()
+
+    # A free base slug is used as it is by its first instance; the others
+    # take suffixed slugs.
+    counts = Counter(bases)
+    taken = _taken(queryset, field, counts)
+    needed = {
+        base: count - (base not in taken)
+        for base, count in counts.items()
+        if count > 1 or base in taken
+    }
+
+    # Suffixed slugs must not take the plain slug of another instance
+    # ("Rice" twice and "Rice 2" once) nor a slug saved meanwhile.
+    claimed = set(counts)
+    suffixed = defaultdict(list)
+    while needed:
+        candidates = {}
+        for base, count in needed.items():
+            for number in _reserve(queryset, field, base, count):
+                slug = _with_suffix(field, base, number)
+                if slug not in claimed:
+                    candidates[slug] = base
+        clashes = _taken(queryset, field, candidates)
+        needed = Counter()
+        for slug, base in candidates.items():
+            if slug in clashes:
+                continue
+            claimed.add(slug)
+            suffixed[base].append(slug)
+        for base, count in counts.items():
+            missing = count - (base not in taken) - len(suffixed[base])
+            if missing > 0:
+                needed[base] = missing
+
+    suffixed = {base: iter(slugs) for base, slugs in suffixed.items()}
+    for instance, base in zip(pending, bases):
+        if base in taken:
+            slug = next(suffixed[base])
+        else:
+            slug = base
+            taken.add(base)
+        setattr(instance, field.attname, slug)
@@ -0,0 +1,70 @@
+"""
+Module: testing.py
+
+Contains test helpers shared by the apps' test suites.
+
+``QueryBudgetMixin`` guards views against N+1 queries: it renders a view,
+adds more rows, renders it again and fails unless both renders ran the
+same number of queries, within an optional fixed budget. A view that
+fetches a relation per row runs more queries the more rows it renders and
+fails the check, listing the queries that were repeated. Cached template
+fragments are dropped before each render, so that every render pays for
+all of its queries.
+"""
+
+# Standard library imports
+from collections import Counter
+
+# Django core imports
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Local app imports
+from . import fragments
+
+
+class QueryBudgetMixin:
+    """
+    ``TestCase`` mixin asserting that views run a fixed number of queries.
+    """
+
+    query_budget_sizes = (1, 10)
+
+    def assertQueryBudget(self, url, add_rows, budget=None, sizes=None):
+        """
+        Asserts that rendering ``url`` runs the same number of queries
+        (and at most ``budget``) whether it shows few or many rows.
+
+        ``add_rows(count)`` must create ``count`` more rows shown by the
+        view. The view is rendered once the total created reaches each
+        of ``sizes``.
+        """
+        sizes = sizes or self.query_budget_sizes
+        created = 0
+        counts = []
+        renders = []
+        for size in sizes:
+            add_rows(size - created)
+            created = size
+            fragments.get_cache().clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(
+                response.status_code, 200,
+                f'{url} answered {response.status_code}',
+            )
+            counts.append(len(queries))
+            renders.append([query['sql'] for query in queries])
+
+        if len(set(counts)) > 1:
+            repeated = Counter(renders[-1]) - Counter(renders[0])
+            self.fail(
+                f'{url} ran {counts} queries for {list(sizes)} rows; '
+                f'repeated per row:\n' + '\n'.join(repeated)
+            )
+        if budget is not None:
+            self.assertLessEqual(
+                counts[-1], budget,
+                f'{url} ran {counts[-1]} queries, over its budget of '
+                f'{budget}:\n' + '\n'.join(renders[-1]),
+            )
@@ -1,3 +1,1152 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from openpyxl import load_workbook
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import (
+    LiveServerTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from django.utils import timezone
+
+from accounts.models import Customer, Vendor
+from bills.models import Bill
+from invoice.models import Invoice
+from transactions.ledger import drifted_items
+from transactions.models import Purchase, Sale, SaleDetail
+from transactions.services import InsufficientStock, commit_sale
+from . import caching, fragments, metrics
+from .exports import DeliveryExport, ItemExport
+from .imports import ItemImport, read_rows
+from .models import (
+    Category, DailySales, DashboardMetric, Delivery, Item, SlugSequence,
+)
+from .pagination import encode_cursor
+from .sample_data import SampleData, scaled_counts
+from .search import (
+    FTS_TABLE, ContainsSearchBackend, PostgresSearchBackend,
+    SQLiteFTSBackend, autocomplete_items, get_backend, search_items,
+    sqlite_has_fts5,
+)
+from .slugs import allocate_slugs
+from .testing import QueryBudgetMixin
+
+AJAX = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+class AutocompleteCacheTests(TestCase):
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.user = User.objects.create_user("cashier", password="secret")
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Groceries")
+        self.item = Item.objects.create(
+            name="Basmati Rice", description="Long grain",
+            category=self.category, quantity=5, price=10,
+        )
+
+    def search(self, url_name, term):
+        return self.client.post(reverse(url_name), {"term": term}, **AJAX)
+
+    def test_repeated_prefix_is_served_from_cache(self):
+        first = self.search("get_items", "bas")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.search("get_items", " BAS ")
+        self.assertFalse(
+            [q for q in queries if Item._meta.db_table in q["sql"]]
+        )
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first.json()[0]["text"], "Basmati Rice")
+        self.assertEqual(
+            caching.stats()[caching.ITEMS],
+            {"hits": 1, "misses": 1, "hit_ratio": 0.5},
+        )
+
+    def test_item_and_category_changes_invalidate(self):
+        self.search("get_items", "bas")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Cereals"
+            self.category.save()
+        self.assertEqual(
+            self.search("get_items", "bas").json()[0]["category"],
+            "Cereals",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertEqual(self.search("get_items", "bas").json(), [])
+        self.assertEqual(caching.stats()[caching.ITEMS]["hits"], 0)
+
+    async def test_served_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        for _ in range(2):
+            response = await self.async_client.post(
+                reverse("get_items"), {"term": "bas"},
+                headers={"X-Requested-With": "XMLHttpRequest"},
+            )
+            self.assertEqual(response.json()[0]["text"], "Basmati Rice")
+        self.assertEqual(
+            (await sync_to_async(caching.stats)())[caching.ITEMS]["hits"], 1
+        )
+
+    def test_customer_changes_invalidate(self):
+        self.assertEqual(
+            self.search("get_customers", "jan").json()["results"], []
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            customer = Customer.objects.create(
+                first_name="Jane", last_name="Doe"
+            )
+        self.assertEqual(
+            self.search("get_customers", "jan").json()["results"],
+            [{"id": customer.pk, "text": "Jane Doe"}],
+        )
+
+
+class TemplateFragmentTests(TestCase):
+
+    def setUp(self):
+        fragments.get_cache().clear()
+        self.user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(self.user)
+
+    def test_dashboard_is_cached_until_its_data_changes(self):
+        self.client.get(reverse("dashboard"))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("dashboard"))
+        tables = ("store_dashboardmetric", "stock_lots", "accounts_profile")
+        self.assertFalse([
+            query["sql"] for query in queries
+            if any(table in query["sql"] for table in tables)
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(
+                name="Basmati Rice", description="Long grain",
+                category=Category.objects.create(name="Groceries"),
+                quantity=7, price=10,
+            )
+        self.assertContains(
+            self.client.get(reverse("dashboard")),
+            '<span class="h3 font-bold mb-0">7</span>',
+        )
+
+    def test_sidebar_follows_profile_and_role(self):
+        self.assertNotContains(
+            self.client.get(reverse("dashboard")), "Executive"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.role = "EX"
+            self.user.profile.save()
+        response = self.client.get(reverse("dashboard"))
+        self.assertContains(response, "Executive")
+        self.assertNotContains(response, reverse("monitoring-stats"))
+
+        self.client.force_login(User.objects.create_superuser("admin"))
+        self.assertContains(
+            self.client.get(reverse("dashboard")),
+            reverse("monitoring-stats"),
+        )
+
+
+class CursorPaginationTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        category = Category.objects.create(name="Groceries")
+        # Duplicate names make the id tie-breaker matter.
+        for n in range(25):
+            Item.objects.create(
+                name=f"Item {n // 2:02}", description="Test item",
+                category=category,
+            )
+        self.expected = list(
+            Item.objects.order_by("name", "id").values_list("pk", flat=True)
+        )
+
+    def page(self, querystring=""):
+        response = self.client.get(f"{reverse('productslist')}?"
+                                   f"{querystring}")
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def test_walks_forwards_and_back(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(pages[-1].next_querystring))
+        self.assertEqual(
+            [item.pk for page in pages for item in page], self.expected
+        )
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertTrue(pages[0].at_start)
+        self.assertEqual(pages[0].count_label, "25")
+
+        back = self.page(pages[-1].previous_querystring)
+        self.assertEqual(
+            [item.pk for item in back], self.expected[10:20]
+        )
+        back = self.page(back.previous_querystring)
+        self.assertTrue(back.at_start)
+        self.assertFalse(back.has_previous)
+
+    def test_rejects_bad_cursor(self):
+        response = self.client.get(reverse("productslist"), {"after": "x"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejects_cursor_with_bad_values(self):
+        # Well-formed tokens whose values the ordering fields reject.
+        cases = [
+            (name, values)
+            for name in ("saleslist", "deliveries", "purchaseslist",
+                         "invoicelist", "bill_list")
+            for values in (["garbage", 1], ["2024-01-01", "x"],
+                           [{"a": 1}, 1], [None, 1])
+        ] + [("productslist", ["Item 01", "x"])]
+        for name, values in cases:
+            with self.subTest(name, values=values):
+                for param in ("after", "before"):
+                    response = self.client.get(
+                        reverse(name), {param: encode_cursor(values)}
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+    def test_list_views_render(self):
+        for name in ("productslist", "deliveries", "category-list",
+                     "vendor-list", "saleslist", "purchaseslist",
+                     "invoicelist", "bill_list"):
+            with self.subTest(name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+
+class StoreQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        self.serial = 0
+
+    def add_items(self, count):
+        # A category and vendor per item, so that any per-row relation
+        # lookup shows up as an extra query.
+        for _ in range(count):
+            self.serial += 1
+            Item.objects.create(
+                name=f"Item {self.serial}", description="Test item",
+                category=Category.objects.create(name=f"C{self.serial}"),
+                vendor=Vendor.objects.create(name=f"V{self.serial}"),
+            )
+
+    def add_deliveries(self, count):
+        self.add_items(count)
+        Delivery.objects.bulk_create([
+            Delivery(item=item, customer_name="Jane", date=timezone.now())
+            for item in Item.objects.filter(delivery__isnull=True)
+        ])
+
+    def test_product_list(self):
+        self.assertQueryBudget(reverse("productslist"), self.add_items, 6)
+
+    def test_product_search(self):
+        self.assertQueryBudget(
+            reverse("item_search_list_view") + "?q=item", self.add_items, 6
+        )
+
+    def test_delivery_list(self):
+        self.assertQueryBudget(
+            reverse("deliveries"), self.add_deliveries, 6
+        )
+
+    def test_category_list(self):
+        self.assertQueryBudget(
+            reverse("category-list"), self.add_items, 5
+        )
+
+
+class SearchItemsMixin:
+    """
+    Items to search for. ``get_backend()`` caches its choice, so the cache
+    is cleared before and after each test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        category = Category.objects.create(name="Groceries")
+        self.basmati, self.cakes, self.sugar = [
+            Item.objects.create(
+                name=name, description=description, category=category,
+            )
+            for name, description in [
+                ("Basmati Rice", "Long grain"),
+                ("Rice Cakes", "Puffed"),
+                ("Brown Sugar", "Sweetens rice pudding"),
+            ]
+        ]
+
+    def names(self, backend, term):
+        queryset = backend.filter(Item.objects.all(), term)
+        return set(queryset.values_list("name", flat=True))
+
+
+class SearchBackendTests(SearchItemsMixin, TestCase):
+
+    def test_contains_backend_matches_every_token(self):
+        backend = ContainsSearchBackend()
+        self.assertEqual(self.names(backend, "ric bas"), {"Basmati Rice"})
+        self.assertEqual(len(self.names(backend, "RICE")), 3)
+        self.assertEqual(self.names(backend, "rice pud"), {"Brown Sugar"})
+        self.assertEqual(len(self.names(backend, "  ")), 3)
+        self.assertEqual(backend.ranked_ids("sugar", 10), [self.sugar.pk])
+        self.assertEqual(
+            backend.ranked_ids("rice", 10),
+            [self.basmati.pk, self.cakes.pk, self.sugar.pk],
+        )
+
+    def test_setting_picks_the_backend(self):
+        with override_settings(
+            STORE_SEARCH_BACKEND="store.search.ContainsSearchBackend"
+        ):
+            get_backend.cache_clear()
+            self.assertIsInstance(get_backend(), ContainsSearchBackend)
+            self.assertNotIsInstance(get_backend(), SQLiteFTSBackend)
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite fallback")
+    def test_falls_back_without_fts5(self):
+        with mock.patch("store.search.sqlite_has_fts5", return_value=False):
+            get_backend.cache_clear()
+            backend = get_backend()
+            self.assertIs(type(backend), ContainsSearchBackend)
+            self.assertEqual(
+                list(search_items(Item.objects.all(), "ric bas")),
+                [self.basmati],
+            )
+            self.assertEqual(autocomplete_items("sug"), [self.sugar])
+
+
+class SQLiteFTSBackendTests(SearchItemsMixin, TestCase):
+
+    def setUp(self):
+        if connection.vendor != "sqlite" or not sqlite_has_fts5():
+            self.skipTest("Needs SQLite with FTS5")
+        super().setUp()
+        self.backend = get_backend()
+
+    def indexed_rowids(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {FTS_TABLE}")
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_is_picked_for_sqlite(self):
+        self.assertIs(type(self.backend), SQLiteFTSBackend)
+
+    def test_matches_word_prefixes(self):
+        self.assertEqual(
+            self.names(self.backend, "ric bas"), {"Basmati Rice"}
+        )
+        # Descriptions match too, but only from the start of a word.
+        self.assertEqual(
+            self.names(self.backend, "RIC"),
+            {"Basmati Rice", "Rice Cakes", "Brown Sugar"},
+        )
+        self.assertEqual(self.names(self.backend, "asmati"), set())
+        self.assertEqual(self.names(self.backend, 'ri"ce'), set())
+        self.assertEqual(len(self.names(self.backend, "  ")), 3)
+        self.assertEqual(self.backend.ranked_ids("  ", 10), [])
+
+    def test_ranks_name_matches_first(self):
+        ids = self.backend.ranked_ids("rice", 10)
+        self.assertEqual(set(ids[:2]), {self.basmati.pk, self.cakes.pk})
+        self.assertEqual(ids[2:], [self.sugar.pk])
+        self.assertEqual(len(self.backend.ranked_ids("rice", 1)), 1)
+        self.assertEqual(autocomplete_items("sweet"), [self.sugar])
+
+    def test_index_follows_item_saves_and_deletes(self):
+        self.basmati.name = "Jasmine Rice"
+        self.basmati.save()
+        self.assertEqual(self.backend.ranked_ids("bas", 10), [])
+        self.assertEqual(
+            self.backend.ranked_ids("jas", 10), [self.basmati.pk]
+        )
+        pk = self.basmati.pk
+        self.basmati.delete()
+        self.assertEqual(self.backend.ranked_ids("jas", 10), [])
+        self.assertEqual(
+            self.indexed_rowids(),
+            set(Item.objects.values_list("pk", flat=True)),
+        )
+        self.assertNotIn(pk, self.indexed_rowids())
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        self.assertEqual(self.backend.ranked_ids("rice", 10), [])
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("SQLiteFTSBackend", out.getvalue())
+        self.assertEqual(len(self.backend.ranked_ids("rice", 10)), 3)
+        self.assertEqual(
+            self.indexed_rowids(),
+            set(Item.objects.values_list("pk", flat=True)),
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+class PostgresSearchBackendTests(SearchItemsMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.backend = get_backend()
+
+    def test_is_picked_for_postgresql(self):
+        self.assertIs(type(self.backend), PostgresSearchBackend)
+
+    def test_matches_word_prefixes(self):
+        self.assertEqual(
+            self.names(self.backend, "ric bas"), {"Basmati Rice"}
+        )
+        self.assertEqual(
+            self.names(self.backend, "RIC"),
+            {"Basmati Rice", "Rice Cakes", "Brown Sugar"},
+        )
+        self.assertEqual(self.names(self.backend, "asmati"), set())
+        # Query syntax in the term is dropped rather than parsed.
+        self.assertEqual(
+            self.names(self.backend, "ric & !bas"), {"Basmati Rice"}
+        )
+        self.assertEqual(self.backend.ranked_ids("&", 10), [])
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(
+            self.backend.ranked_ids("rice", 10),
+            [self.basmati.pk, self.cakes.pk, self.sugar.pk],
+        )
+
+    def test_index_follows_item_saves_and_deletes(self):
+        self.basmati.name = "Jasmine Rice"
+        self.basmati.save()
+        self.assertEqual(
+            self.backend.ranked_ids("jas", 10), [self.basmati.pk]
+        )
+        self.basmati.delete()
+        self.assertEqual(self.backend.ranked_ids("jas", 10), [])
+
+
+class StreamingExportTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        self.groceries = Category.objects.create(name="Groceries")
+        self.drinks = Category.objects.create(name="Drinks")
+        vendor = Vendor.objects.create(name="Acme")
+        self.rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+            quantity=5, price=12.5, vendor=vendor,
+            expiring_date=timezone.make_aware(datetime(2024, 1, 2, 23, 30)),
+        )
+        self.juice = Item.objects.create(
+            name="Juice", description="Test item", category=self.drinks,
+            quantity=3, price=2,
+            expiring_date=timezone.make_aware(datetime(2024, 1, 3, 8)),
+        )
+        self.salt = Item.objects.create(
+            name="Salt", description="Test item", category=self.groceries,
+        )
+        Delivery.objects.create(
+            item=self.rice, customer_name="Jane", location="Nairobi",
+            date=timezone.make_aware(datetime(2024, 1, 2)),
+        )
+        Delivery.objects.create(
+            item=self.juice, customer_name="John", is_delivered=True,
+            date=timezone.make_aware(datetime(2024, 1, 5)),
+        )
+
+    def export(self, name, querystring):
+        return self.client.get(f"{reverse(name)}?{querystring}")
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        body = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(body)))
+
+    def read_xlsx(self, response):
+        body = b"".join(response.streaming_content)
+        worksheet = load_workbook(io.BytesIO(body), read_only=True).active
+        return worksheet.title, [
+            list(row) for row in worksheet.iter_rows(values_only=True)
+        ]
+
+    def test_csv_has_header_and_rows(self):
+        response = self.export("productslist", "_export=csv")
+        self.assertIn("filename=items.csv", response["Content-Disposition"])
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], ItemExport().headers)
+        self.assertEqual(rows[1], [
+            str(self.juice.pk), "Juice", "Drinks", "3", "2.0",
+            "2024-01-03 08:00:00+00:00", "",
+        ])
+        self.assertEqual(
+            [row[1] for row in rows[1:]], ["Juice", "Rice", "Salt"]
+        )
+        self.assertEqual(rows[2][6], "Acme")
+
+    def test_xlsx_has_header_and_rows(self):
+        response = self.export("deliveries", "_export=xlsx")
+        self.assertIn(
+            "filename=\"deliveries.xlsx\"", response["Content-Disposition"]
+        )
+        title, rows = self.read_xlsx(response)
+        self.assertEqual(title, "Deliveries")
+        self.assertEqual(rows[0], DeliveryExport().headers)
+        self.assertEqual(rows[1][1:], [
+            "Rice", "Jane", None, "Nairobi", datetime(2024, 1, 2), False,
+        ])
+        self.assertEqual([row[1] for row in rows[1:]], ["Rice", "Juice"])
+
+    def test_filters_and_dates(self):
+        def names(params):
+            rows = self.read_csv(self.export("productslist", params))
+            return [row[1] for row in rows[1:]]
+
+        self.assertEqual(
+            names(f"_export=csv&category={self.groceries.pk}"),
+            ["Rice", "Salt"],
+        )
+        # Both ends are whole days, the end one included.
+        self.assertEqual(
+            names("_export=csv&start=2024-01-02&end=2024-01-02"), ["Rice"]
+        )
+        self.assertEqual(
+            names("_export=csv&start=2024-01-03"), ["Juice"]
+        )
+        self.assertEqual(
+            names("_export=csv&start=&end=&category="),
+            ["Juice", "Rice", "Salt"],
+        )
+        rows = self.read_csv(self.export(
+            "deliveries", "_export=csv&is_delivered=yes"
+        ))
+        self.assertEqual([row[1] for row in rows[1:]], ["Juice"])
+
+    def test_rejects_bad_parameters(self):
+        for name, querystring in [
+            ("productslist", "_export=pdf"),
+            ("productslist", "_export=csv&start=yesterday"),
+            ("productslist", "_export=csv&end=2024-02-30"),
+            ("productslist", "_export=xlsx&category=groceries"),
+            ("deliveries", "_export=csv&is_delivered=maybe"),
+        ]:
+            with self.subTest(name=name, querystring=querystring):
+                response = self.export(name, querystring)
+                self.assertEqual(response.status_code, 400)
+
+    def test_list_is_rendered_without_export_parameter(self):
+        for querystring in ("", "_export="):
+            with self.subTest(querystring=querystring):
+                response = self.export("productslist", querystring)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.streaming)
+                self.assertTemplateUsed(
+                    response, "store/productslist.html"
+                )
+
+
+class ItemImportTests(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Groceries")
+        self.item = Item.objects.create(
+            name="Basmati Rice", description="Long grain",
+            category=self.category, quantity=5, price=10,
+        )
+
+    def run_import(self, text, **kwargs):
+        rows = read_rows(io.BytesIO(text.encode()), "csv")
+        with self.captureOnCommitCallbacks(execute=True):
+            return ItemImport(batch_size=2, **kwargs).run(rows)
+
+    def test_creates_and_updates(self):
+        report = self.run_import(
+            "ID,Name,Category,Quantity,Price,Vendor\n"
+            f"{self.item.pk},Basmati Rice,Cereals,8,12,\n"
+            ",Salt,Groceries,3,1,Acme\n"
+            ",Salt,Groceries,4,1,Acme\n"
+            ",Salt,groceries,,1,acme\n"
+            ",Pepper,,2,1,\n"
+            "x,Sugar,Groceries,-1,1,\n"
+        )
+        self.assertEqual(
+            (report.created, report.updated, report.unchanged),
+            (1, 1, 1),
+        )
+        self.assertEqual([line for line, _ in report.errors], [6, 7])
+        self.assertEqual(report.categories_created, ["Cereals"])
+        self.assertEqual(report.vendors_created, ["Acme"])
+
+        self.item.refresh_from_db()
+        self.assertEqual(
+            (self.item.category.name, self.item.quantity, self.item.price),
+            ("Cereals", 8, 12),
+        )
+        salt = Item.objects.get(name="Salt")
+        self.assertEqual((salt.quantity, salt.vendor.name), (4, "Acme"))
+        self.assertFalse(drifted_items().exists())
+
+    def test_rejects_numbers_that_are_not_finite(self):
+        report = self.run_import(
+            "ID,Name,Category,Quantity,Price\n"
+            ",Salt,Groceries,inf,1\n"
+            ",Salt,Groceries,1e400,1\n"
+            "1e400,Salt,Groceries,1,1\n"
+            "1e300,Salt,Groceries,1,1\n"
+            "-inf,Salt,Groceries,1,1\n"
+            ",Salt,Groceries,1,nan\n"
+            ",Salt,Groceries,1,inf\n"
+        )
+        self.assertEqual(
+            [line for line, _ in report.errors], [2, 3, 4, 5, 6, 7, 8]
+        )
+        self.assertEqual(report.created, 0)
+        self.assertFalse(Item.objects.filter(name="Salt").exists())
+
+    def test_duplicate_names_get_unique_slugs(self):
+        self.run_import(
+            "Name,Category\nBasmati Rice,Groceries\n"
+            "Basmati-Rice 2,Groceries\n"
+        )
+        self.run_import("Name,Category\nBasmati Rice 2,Groceries\n")
+        self.assertEqual(
+            sorted(Item.objects.values_list("slug", flat=True)),
+            ["basmati-rice", "basmati-rice-2", "basmati-rice-2-2"],
+        )
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(
+            "Name,Category,Quantity\nBasmati Rice,Groceries,9\n"
+            "Salt,Spices,1\nSalt,Spices,2\n",
+            dry_run=True,
+        )
+        self.assertEqual((report.created, report.updated), (1, 1))
+        self.assertIn("quantity 1 -> 2", report.changes[-1])
+        self.assertEqual(Item.objects.count(), 1)
+        self.assertEqual(Category.objects.count(), 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 5)
+
+    def test_upload_view(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        response = self.client.post(reverse("product-import"), {
+            "file": SimpleUploadedFile(
+                "items.csv", b"Name,Category\nSalt,Groceries\n"
+            ),
+        })
+        self.assertContains(response, "Created 1 items")
+        response = self.client.post(reverse("product-import"), {
+            "file": SimpleUploadedFile("items.txt", b"Name\n"),
+        })
+        self.assertContains(response, "Unsupported file type")
+
+
+class SlugAllocationTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name="Groceries")
+        self.item = Item.objects.create(name="Rice", category=category)
+        self.vendor = Vendor.objects.create(name="Acme")
+
+    def purchases(self, count, **kwargs):
+        return [
+            Purchase(
+                item=self.item, vendor_id=self.vendor.pk, quantity=1,
+                price=1, total_value=1, **kwargs
+            )
+            for _ in range(count)
+        ]
+
+    def test_bulk_and_single_saves_share_the_sequence(self):
+        first = allocate_slugs(self.purchases(100))
+        Purchase.objects.bulk_create(first)
+        # Once the sequence exists, a batch takes the same queries however
+        # many slugs it needs.
+        with self.assertNumQueries(5):
+            second = allocate_slugs(self.purchases(50))
+        Purchase.objects.bulk_create(second)
+        # More than the 100 attempts AutoSlugField makes on its own.
+        purchase = Purchase.objects.create(
+            item=self.item, vendor=self.vendor, quantity=1, price=1
+        )
+        self.assertEqual(first[0].slug, "acme")
+        self.assertEqual(second[-1].slug, "acme-150")
+        self.assertEqual(purchase.slug, "acme-151")
+
+    def test_continues_from_existing_slugs(self):
+        Purchase.objects.bulk_create(
+            self.purchases(1, slug="acme")
+            + self.purchases(1, slug="acme-40")
+            + self.purchases(1, slug="acme-41")
+        )
+        SlugSequence.objects.create(
+            field="transactions.purchase.slug", base="acme", last=40
+        )
+        self.assertEqual(
+            [purchase.slug for purchase in allocate_slugs(
+                self.purchases(2)
+            )],
+            ["acme-42", "acme-43"],
+        )
+
+    def test_unpopulated_slugs_use_the_model_name(self):
+        for _ in range(2):
+            Bill.objects.create(
+                institution_name="Power", payment_details="Cash", amount=1
+            )
+            Invoice.objects.create(
+                customer_name="Jane", contact_number="1", item=self.item,
+                price_per_item=1, shipping=0,
+            )
+        self.assertEqual(
+            sorted(Bill.objects.values_list("slug", flat=True)),
+            ["bill", "bill-2"],
+        )
+        self.assertEqual(
+            sorted(Invoice.objects.values_list("slug", flat=True)),
+            ["invoice", "invoice-2"],
+        )
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command(
+            "benchmark_slugs", "--purchases", "120", "--batch-size", "50",
+            "--saves", "2", stdout=out,
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+        self.assertFalse(Purchase.objects.exists())
+
+
+class IndexTests(TestCase):
+
+    def test_views_make_no_full_scans(self):
+        out = io.StringIO()
+        call_command("explain_queries", "--fail", stdout=out)
+        self.assertIn(" 0 full scans.", out.getvalue())
+
+    def test_reports_full_scans(self):
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command(
+                "explain_queries", "--fail",
+                "--paths", "/admin/store/delivery/?q=jane", stdout=out,
+            )
+        self.assertIn("SCAN store_delivery", out.getvalue())
+
+    @skipUnless(connection.vendor == "sqlite", "Plans differ by database")
+    def test_pending_deliveries_use_partial_index(self):
+        plan = (
+            Delivery.objects.filter(is_delivered=False)
+            .order_by("date", "pk").explain()
+        )
+        self.assertIn("delivery_pending_date_idx", plan)
+
+
+class DashboardMetricTests(TestCase):
+
+    def setUp(self):
+        self.groceries = Category.objects.create(name="Groceries")
+        self.drinks = Category.objects.create(name="Drinks")
+        self.customer = Customer.objects.create(first_name="Jane")
+
+    def counters(self):
+        return {
+            "metrics": dict(DashboardMetric.objects.values_list(
+                "key", "value"
+            )),
+            "labels": dict(DashboardMetric.objects.values_list(
+                "key", "label"
+            ).filter(key__startswith=metrics.CATEGORY_PREFIX)),
+            "days": set(DailySales.objects.values_list(
+                "date", "total", "sales_count"
+            )),
+        }
+
+    def assertMatchesRebuild(self):
+        live = self.counters()
+        metrics.rebuild_metrics()
+        self.assertEqual(live, self.counters())
+
+    def value(self, key):
+        return DashboardMetric.objects.get(key=key).value
+
+    def test_items_are_counted(self):
+        rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+            quantity=5,
+        )
+        Item.objects.create(
+            name="Juice", description="Test item", category=self.drinks,
+            quantity=2,
+        )
+        self.assertEqual(self.value(metrics.ITEMS), 2)
+        self.assertEqual(self.value(metrics.ITEMS_QUANTITY), 7)
+        rice.quantity = 8
+        rice.category = self.drinks
+        rice.save()
+        self.assertEqual(self.value(metrics.ITEMS_QUANTITY), 10)
+        self.assertEqual(
+            self.value(metrics.category_key(self.drinks.pk)), 2
+        )
+        self.assertEqual(
+            self.value(metrics.category_key(self.groceries.pk)), 0
+        )
+        self.assertMatchesRebuild()
+
+        rice.delete()
+        self.assertEqual(self.value(metrics.ITEMS), 1)
+        self.assertEqual(self.value(metrics.ITEMS_QUANTITY), 2)
+        self.assertMatchesRebuild()
+
+    def test_purchases_are_counted(self):
+        rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+        )
+        vendor = Vendor.objects.create(name="Acme")
+        purchase = Purchase.objects.create(
+            item=rice, vendor=vendor, quantity=4, price=2
+        )
+        self.assertEqual(self.value(metrics.ITEMS_QUANTITY), 4)
+        self.assertMatchesRebuild()
+        purchase.delete()
+        self.assertMatchesRebuild()
+
+    def sell(self, item, quantity, total):
+        line = {
+            "id": item.pk, "price": total / quantity, "quantity": quantity,
+            "total_item": total,
+        }
+        return commit_sale({
+            "customer": self.customer, "sub_total": total,
+            "grand_total": total, "amount_paid": total, "amount_change": 0,
+        }, [line])
+
+    def test_sales_are_counted_once_committed(self):
+        rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+            quantity=10,
+        )
+        before = self.counters()
+        with self.captureOnCommitCallbacks() as callbacks:
+            sale = self.sell(rice, 4, 40)
+        # The sale's transaction leaves the sales counters alone.
+        self.assertEqual(self.value(metrics.SALES), 0)
+        self.assertEqual(self.counters()["days"], before["days"])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.value(metrics.SALES), 1)
+        self.assertEqual(self.value(metrics.ITEMS_QUANTITY), 6)
+        self.assertEqual(
+            self.counters()["days"],
+            {(timezone.localdate(sale.date_added), Decimal(40), 1)},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sell(rice, 1, 2.5)
+        self.assertEqual(self.value(metrics.SALES), 2)
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.delete()
+        self.assertEqual(self.value(metrics.SALES), 1)
+        self.assertEqual(DailySales.objects.get().total, Decimal("2.5"))
+        self.assertMatchesRebuild()
+
+    def test_failing_counter_update_does_not_fail_the_sale(self):
+        rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+            quantity=1,
+        )
+        with mock.patch.object(
+            metrics, "record_sale", side_effect=OperationalError("locked")
+        ), self.assertLogs("django.test", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                sale = self.sell(rice, 1, 10)
+        self.assertTrue(Sale.objects.filter(pk=sale.pk).exists())
+        self.assertEqual(self.value(metrics.SALES), 0)
+        metrics.rebuild_metrics()
+        self.assertEqual(self.value(metrics.SALES), 1)
+
+    def test_rolled_back_sales_are_not_counted(self):
+        rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+            quantity=1,
+        )
+        before = self.counters()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(InsufficientStock):
+                self.sell(rice, 2, 20)
+        self.assertEqual(self.counters(), before)
+
+    def test_migration_backfill_matches_rebuild(self):
+        rice = Item.objects.create(
+            name="Rice", description="Test item", category=self.groceries,
+            quantity=10,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sell(rice, 4, 40)
+        migration = import_module("store.migrations.0002_dashboard_metrics")
+        DashboardMetric.objects.all().delete()
+        DailySales.objects.all().delete()
+        migration.populate_metrics(django_apps, None)
+        self.assertMatchesRebuild()
+
+
+class SalesChartTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("manager", password="secret")
+        self.client.force_login(user)
+        for day, total in (("2026-09-28", 5), ("2026-10-01", 10),
+                           ("2026-10-01", 2.5), ("2026-10-06", 4)):
+            self.sell(day, total)
+
+    def sell(self, day, total):
+        metrics.record_sale(
+            timezone.make_aware(datetime.fromisoformat(f"{day} 12:00")),
+            Decimal(total),
+        )
+
+    def chart(self, **params):
+        return self.client.get(reverse("sales-chart"), params)
+
+    def test_sums_by_bucket_including_empty_ones(self):
+        window = {"start": "2026-09-28", "end": "2026-10-08"}
+        days = self.chart(bucket="day", **window).json()
+        self.assertEqual(len(days["labels"]), 11)
+        self.assertEqual(days["totals"][:5], [5, 0, 0, 12.5, 0])
+        self.assertEqual(days["counts"][3], 2)
+
+        weeks = self.chart(bucket="week", **window).json()
+        self.assertEqual(weeks["labels"], ["2026-09-28", "2026-10-05"])
+        self.assertEqual(weeks["totals"], [17.5, 4])
+
+        months = self.chart(bucket="month", **window).json()
+        self.assertEqual(months["start"], "2026-09-01")
+        self.assertEqual(months["labels"], ["2026-09-01", "2026-10-01"])
+        self.assertEqual(months["totals"], [5, 16.5])
+        self.assertEqual(months["counts"], [1, 3])
+
+    def test_unchanged_window_is_not_modified(self):
+        window = {"bucket": "week", "start": "2026-09-28",
+                  "end": "2026-10-08"}
+        response = self.chart(**window)
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+        response = self.client.get(
+            reverse("sales-chart"), window, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Sales outside the window leave it alone, others do not.
+        self.sell("2026-11-02", 1)
+        response = self.client.get(
+            reverse("sales-chart"), window, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.sell("2026-10-07", 1)
+        response = self.client.get(
+            reverse("sales-chart"), window, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["totals"], [17.5, 5])
+
+    def test_defaults_to_recent_days(self):
+        chart = self.chart().json()
+        self.assertEqual(chart["bucket"], "day")
+        self.assertEqual(len(chart["labels"]), metrics.SALES_CHART_DAYS)
+        self.assertEqual(chart["end"], timezone.localdate().isoformat())
+
+    def test_rejects_bad_windows(self):
+        for params in ({"bucket": "year"}, {"start": "yesterday"},
+                       {"start": "2026-10-02", "end": "2026-10-01"},
+                       {"start": "2000-01-01", "end": "2026-01-01"}):
+            self.assertEqual(self.chart(**params).status_code, 400)
+        chart = self.chart(
+            bucket="month", start="2000-01-01", end="2026-01-01"
+        ).json()
+        self.assertEqual(len(chart["labels"]), 313)
+
+    def test_bucket_starts(self):
+        self.assertEqual(
+            metrics.bucket_starts(
+                date(2026, 1, 31), date(2026, 3, 1), metrics.MONTH
+            ),
+            [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)],
+        )
+        self.assertEqual(metrics.bucket_count(
+            date(2026, 1, 31), date(2026, 3, 1), metrics.MONTH
+        ), 3)
+
+
+class SampleDataTests(TestCase):
+
+    def test_generated_data_is_consistent(self):
+        counts = scaled_counts(300)
+        SampleData(seed=1, batch_size=100).generate(counts)
+        self.assertEqual(Sale.objects.count(), 300)
+        self.assertEqual(Item.objects.count(), counts["items"])
+        self.assertEqual(Bill.objects.count(), counts["bills"])
+        self.assertFalse(drifted_items().exists())
+        self.assertFalse(Item.objects.filter(quantity__lt=0).exists())
+
+        sale = Sale.objects.first()
+        lines = sale.saledetail_set.aggregate(total=Sum("total_detail"))
+        self.assertEqual(lines["total"], sale.sub_total)
+        self.assertEqual(sale.sub_total + sale.tax_amount, sale.grand_total)
+        self.assertEqual(
+            DailySales.objects.aggregate(total=Sum("total"))["total"],
+            Sale.objects.aggregate(total=Sum("grand_total"))["total"],
+        )
+        self.assertEqual(
+            metrics.DashboardMetric.objects.get(key=metrics.SALES).value, 300
+        )
+        item = Item.objects.first()
+        self.assertIn(item, autocomplete_items(item.name))
+
+    def test_generate_data_command(self):
+        out = io.StringIO()
+        call_command(
+            "generate_data", "--sales", "40", "--items", "5", "--bills", "0",
+            "--seed", "3", stdout=out,
+        )
+        self.assertEqual(Item.objects.count(), 5)
+        sold = SaleDetail.objects.values("item").distinct()
+        self.assertEqual(sold.count(), 5)
+        self.assertIn("Generated", out.getvalue())
+
+
+class BenchmarkViewsTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, "results.json")
+
+    def benchmark(self, *args):
+        out = io.StringIO()
+        call_command(
+            "benchmark_views", "--scales", "100", "--requests", "2",
+            "--output", self.output, *args, stdout=out,
+        )
+        with open(self.output) as file:
+            return json.load(file), out.getvalue()
+
+    def test_writes_results_and_rolls_back(self):
+        report, _ = self.benchmark()
+        self.assertEqual(
+            len(report["results"]),
+            len(set(result["scenario"] for result in report["results"])),
+        )
+        for result in report["results"]:
+            self.assertEqual(result["errors"], 0, result["scenario"])
+            self.assertGreater(result["queries"], 0, result["scenario"])
+        self.assertEqual(report["scales"]["100"]["rows"]["sales"], 100)
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_compares_with_a_baseline(self):
+        report, _ = self.benchmark("--scenarios", "dashboard", "sale-list")
+        report["results"][0]["queries"] = 1
+        with open(self.output, "w") as file:
+            json.dump(report, file)
+        baseline = self.output + ".baseline"
+        os.rename(self.output, baseline)
+        with self.assertRaisesMessage(CommandError, "1 regression(s)"):
+            self.benchmark("--baseline", baseline, "--fail")
+        _, out = self.benchmark("--baseline", baseline)
+        dashboard, sale_list = out.splitlines()[1:3]
+        self.assertTrue(dashboard.endswith("REGRESSION"))
+        self.assertNotIn("REGRESSION", sale_list)
+
+
+class BenchTemplatesTests(TestCase):
+
+    def test_compares_setups_and_rolls_back(self):
+        out = io.StringIO()
+        call_command(
+            "bench_templates", "--sales", "100", "--requests", "2",
+            "--pages", "dashboard", stdout=out,
+        )
+        rows = [line.split() for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual(
+            [row[1] for row in rows],
+            ["uncached", "cached-loader", "cached-fragments"],
+        )
+        # The cached dashboard widgets run none of their queries.
+        self.assertLess(float(rows[2][4]), float(rows[1][4]))
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+class MigrationTests(TransactionTestCase):
+    """
+    Runs against whichever database DATABASE_ENGINE selects; CI runs the
+    suite on both SQLite and PostgreSQL.
+    """
+
+    apps = ("bills", "invoice", "transactions", "store", "accounts")
+
+    def migrate(self, *args):
+        call_command("migrate", *args, verbosity=0, stdout=io.StringIO())
+
+    def test_models_match_migrations(self):
+        out = io.StringIO()
+        try:
+            call_command(
+                "makemigrations", "--check", "--dry-run", stdout=out
+            )
+        except SystemExit:
+            self.fail(f"Models have changes without migrations:\n"
+                      f"{out.getvalue()}")
+
+    def test_migrations_reverse_and_reapply(self):
+        for app in self.apps:
+            self.migrate(app, "zero")
+        self.assertNotIn(
+            Item._meta.db_table, connection.introspection.table_names()
+        )
+        self.migrate()
+        self.assertIn(
+            Item._meta.db_table, connection.introspection.table_names()
+        )
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+
+    def test_reports_each_path(self):
+        out = io.StringIO()
+        call_command(
+            "loadtest", "--url", self.live_server_url,
+            "--paths", "/accounts/login/", "/missing/",
+            "--requests", "6", "--concurrency", "2", stdout=out,
+        )
+        login, missing = out.getvalue().splitlines()[1:]
+        self.assertTrue(login.startswith("server      /accounts/login/"))
+        self.assertTrue(login.endswith(" 0"))
+        self.assertTrue(missing.endswith(" 6"))
@@ -1,7 +1,5 @@
 # Django core imports
 from django.urls import path
-from django.conf import settings
-from django.conf.urls.static import static
 
 # Local app imports
 from . import views
@@ -9,6 +7,7 @@ from .views import (
     ProductListView,
     ProductDetailView,
     ProductCreateView,
+    ProductImportView,
     ProductUpdateView,
     ProductDeleteView,
     ItemSearchListView,
@@ -29,6 +28,11 @@ from .views import (
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path(
+        'dashboard/sales-chart/',
+        views.sales_chart,
+        name='sales-chart'
+    ),
 
     # Product URLs
     path(
@@ -36,6 +40,11 @@ urlpatterns = [
         ProductListView.as_view(),
         name='productslist'
     ),
+    path(
+        'products/import/',
+        ProductImportView.as_view(),
+        name='product-import'
+    ),
     path(
         'product/<slug:slug>/',
         ProductDetailView.as_view(),
@@ -125,10 +134,3 @@ urlpatterns = [
         name='category-delete'
     ),
 ]
-
-# Static media files configuration for development
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
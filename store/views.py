@@ -15,12 +15,17 @@ import operator
 from functools import reduce
 
 # Django core imports
-from django.shortcuts import render
+from django.core.exceptions import ValidationError
+from django.shortcuts import redirect, render
 from django.urls import reverse, reverse_lazy
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q, Count, Sum
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 
 # Authentication and permissions
 from django.contrib.auth.decorators import login_required
@@ -30,85 +35,172 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import (
     DetailView, CreateView, UpdateView, DeleteView, ListView
 )
-from django.views.generic.edit import FormMixin
+from django.views.generic.edit import FormMixin, FormView
 
 # Third-party packages
 from django_tables2 import SingleTableView
 import django_tables2 as tables
-from django_tables2.export.views import ExportMixin
 
 # Local app imports
-from accounts.models import Profile, Vendor
-from transactions.models import Sale
-from .models import Category, Item, Delivery
-from .forms import ItemForm, CategoryForm, DeliveryForm
+from transactions import ledger, lots
+from . import caching, metrics
+from .exports import StreamingExportMixin, ItemExport, DeliveryExport
+from .imports import ItemImport, file_format, read_rows
+from .pagination import CursorPaginationMixin
+from .models import Category, Item, Delivery, DashboardMetric
+from .search import aautocomplete_items, search_items
+from .forms import (
+    ItemForm, ItemUpdateForm, CategoryForm, DeliveryForm, ItemImportForm,
+    SalesChartForm
+)
 from .tables import ItemTable
 
+# Days ahead the dashboard looks for expiring stock, and the lots it lists.
+EXPIRY_DAYS = 30
+EXPIRING_LOTS = 5
 
-@login_required
-def dashboard(request):
-    profiles = Profile.objects.all()
-    Category.objects.annotate(nitem=Count("item"))
-    items = Item.objects.all()
-    total_items = (
-        Item.objects.all()
-        .aggregate(Sum("quantity"))
-        .get("quantity__sum", 0.00)
-    )
-    items_count = items.count()
-    profiles_count = profiles.count()
-
-    # Prepare data for charts
-    category_counts = Category.objects.annotate(
-        item_count=Count("item")
-    ).values("name", "item_count")
-    categories = [cat["name"] for cat in category_counts]
-    category_counts = [cat["item_count"] for cat in category_counts]
-
-    sale_dates = (
-        Sale.objects.values("date_added__date")
-        .annotate(total_sales=Sum("grand_total"))
-        .order_by("date_added__date")
-    )
-    sale_dates_labels = [
-        date["date_added__date"].strftime("%Y-%m-%d") for date in sale_dates
-    ]
-    sale_dates_values = [float(date["total_sales"]) for date in sale_dates]
 
-    context = {
-        "items": items,
-        "profiles": profiles,
-        "profiles_count": profiles_count,
-        "items_count": items_count,
-        "total_items": total_items,
-        "vendors": Vendor.objects.all(),
-        "delivery": Delivery.objects.all(),
-        "sales": Sale.objects.all(),
+def dashboard_widgets():
+    """
+    Returns the data of the dashboard's counters, expiring stock and
+    category chart.
+    """
+    counters = {}
+    categories = []
+    category_counts = []
+    for metric in DashboardMetric.objects.order_by("label", "key"):
+        if metric.key.startswith(metrics.CATEGORY_PREFIX):
+            categories.append(metric.label)
+            category_counts.append(metric.value)
+        else:
+            counters[metric.key] = metric.value
+
+    # Both read the lots in stock from the partial index on their expiry.
+    expiring = lots.expiring(EXPIRY_DAYS)
+    expiring_totals = expiring.aggregate(
+        count=Count("id"), units=Sum("remaining")
+    )
+    return {
+        "profiles_count": counters.get(metrics.PROFILES, 0),
+        "items_count": counters.get(metrics.ITEMS, 0),
+        "total_items": counters.get(metrics.ITEMS_QUANTITY, 0),
+        "deliveries_count": counters.get(metrics.DELIVERIES, 0),
+        "sales_count": counters.get(metrics.SALES, 0),
         "categories": categories,
         "category_counts": category_counts,
-        "sale_dates_labels": sale_dates_labels,
-        "sale_dates_values": sale_dates_values,
+        "expiring_lots": list(
+            expiring.select_related("item")[:EXPIRING_LOTS]
+        ),
+        "expiring_count": expiring_totals["count"],
+        "expiring_units": expiring_totals["units"] or 0,
+    }
+
+
+@login_required
+def dashboard(request):
+    """
+    Render the dashboard. Its widgets are cached as a template fragment
+    (see ``store.fragments``), so their queries only run when the
+    fragment is missing or the data behind it changed.
+    """
+    context = {
+        "widgets": SimpleLazyObject(dashboard_widgets),
+        "chart_buckets": metrics.BUCKETS,
+        "expiry_days": EXPIRY_DAYS,
+        "today": timezone.localdate(),
     }
     return render(request, "store/dashboard.html", context)
 
 
-class ProductListView(LoginRequiredMixin, ExportMixin, tables.SingleTableView):
+def _sales_chart_version(request):
+    # Shared by the ETag and Last-Modified checks and the view itself.
+    if not hasattr(request, "_sales_chart"):
+        form = SalesChartForm(request.GET)
+        version = None
+        if form.is_valid():
+            version = metrics.sales_version(
+                form.cleaned_data["start"], form.cleaned_data["end"]
+            )
+        request._sales_chart = (form, version)
+    return request._sales_chart
+
+
+def _sales_chart_etag(request):
+    form, version = _sales_chart_version(request)
+    if version is None:
+        return None
+    modified, days = version
+    data = form.cleaned_data
+    stamp = modified.timestamp() if modified else 0
+    return f"{data['bucket']}:{data['start']}:{data['end']}:{days}:{stamp}"
+
+
+def _sales_chart_last_modified(request):
+    _, version = _sales_chart_version(request)
+    return version[0] if version else None
+
+
+@login_required
+@require_GET
+@condition(
+    etag_func=_sales_chart_etag,
+    last_modified_func=_sales_chart_last_modified,
+)
+def sales_chart(request):
+    """
+    Serves the dashboard's sales chart as JSON: the sales totals between
+    ``start`` and ``end`` (ISO dates) summed by ``bucket`` (``day``,
+    ``week`` or ``month``).
+
+    Responses carry an ETag and Last-Modified date derived from the daily
+    totals of the window and must be revalidated, so that the dashboard
+    gets a 304 until a sale in the window changes them.
+    """
+    form, _ = _sales_chart_version(request)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    data = form.cleaned_data
+    series = metrics.sales_series(data["start"], data["end"], data["bucket"])
+    response = JsonResponse({
+        "bucket": data["bucket"],
+        "start": data["start"].isoformat(),
+        "end": data["end"].isoformat(),
+        "labels": [day.isoformat() for day, _, _ in series],
+        "totals": [float(total) for _, total, _ in series],
+        "counts": [count for _, _, count in series],
+    })
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ProductListView(
+    LoginRequiredMixin,
+    StreamingExportMixin,
+    CursorPaginationMixin,
+    tables.SingleTableView,
+):
     """
     View class to display a list of products.
 
     Attributes:
     - model: The model associated with the view.
+    - queryset: The items, with the relations the template renders.
     - table_class: The table class used for rendering.
     - template_name: The HTML template used for rendering the view.
     - context_object_name: The variable name for the context object.
     - paginate_by: Number of items per page for pagination.
+    - cursor_ordering: Indexed ordering the pages are keyed on.
     """
 
     model = Item
+    queryset = Item.objects.select_related("category", "vendor")
     table_class = ItemTable
     template_name = "store/productslist.html"
     context_object_name = "items"
     paginate_by = 10
+    cursor_ordering = ("name", "id")
+    paginate_count = True
+    export_class = ItemExport
     SingleTableView.table_pagination = False
 
 
@@ -127,12 +219,7 @@ class ItemSearchListView(ProductListView):
 
         query = self.request.GET.get("q")
         if query:
-            query_list = query.split()
-            result = result.filter(
-                reduce(
-                    operator.and_, (Q(name__icontains=q) for q in query_list)
-                )
-            )
+            result = search_items(result, query)
         return result
 
 
@@ -146,6 +233,7 @@ class ProductDetailView(LoginRequiredMixin, FormMixin, DetailView):
     """
 
     model = Item
+    queryset = Item.objects.select_related("category", "vendor")
     template_name = "store/productdetail.html"
 
     def get_success_url(self):
@@ -176,6 +264,31 @@ class ProductCreateView(LoginRequiredMixin, CreateView):
             return True
 
 
+class ProductImportView(LoginRequiredMixin, FormView):
+    """
+    View class to import products in bulk from a CSV or XLSX upload.
+
+    The import report is shown on the same page; a preview (dry run) is
+    selected by default.
+    """
+
+    template_name = "store/product_import.html"
+    form_class = ItemImportForm
+
+    def form_valid(self, form):
+        upload = form.cleaned_data["file"]
+        try:
+            report = ItemImport(
+                dry_run=form.cleaned_data["dry_run"]
+            ).run(read_rows(upload, file_format(upload.name)))
+        except ValidationError as e:
+            form.add_error("file", e)
+            return self.form_invalid(form)
+        return self.render_to_response(
+            self.get_context_data(form=form, report=report)
+        )
+
+
 class ProductUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     """
     View class to update product information.
@@ -189,9 +302,26 @@ class ProductUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     model = Item
     template_name = "store/productupdate.html"
-    form_class = ItemForm
+    form_class = ItemUpdateForm
     success_url = "/products"
 
+    def form_valid(self, form):
+        """
+        Saves every field but the quantity, which only the stock ledger
+        writes; a typed quantity is recorded as an adjustment instead.
+        """
+        self.object = item = form.save(commit=False)
+        change = form.quantity_change()
+        with transaction.atomic():
+            item.save(update_fields=[
+                name for name in form._meta.fields if name != "quantity"
+            ])
+            if change:
+                ledger.record_movement(
+                    item, change, ledger.ADJUSTMENT, note="Product form"
+                )
+        return redirect(self.get_success_url())
+
     def test_func(self):
         if self.request.user.is_superuser:
             return True
@@ -221,22 +351,31 @@ class ProductDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 
 class DeliveryListView(
-    LoginRequiredMixin, ExportMixin, tables.SingleTableView
+    LoginRequiredMixin,
+    StreamingExportMixin,
+    CursorPaginationMixin,
+    tables.SingleTableView,
 ):
     """
     View class to display a list of deliveries.
 
     Attributes:
     - model: The model associated with the view.
-    - pagination: Number of items per page for pagination.
+    - queryset: The deliveries, with the items the template renders.
+    - paginate_by: Number of items per page for pagination.
+    - cursor_ordering: Indexed ordering the pages are keyed on.
     - template_name: The HTML template used for rendering the view.
     - context_object_name: The variable name for the context object.
     """
 
     model = Delivery
-    pagination = 10
+    queryset = Delivery.objects.select_related("item")
+    paginate_by = 10
+    cursor_ordering = ("date", "id")
+    paginate_count = True
     template_name = "store/deliveries.html"
     context_object_name = "deliveries"
+    export_class = DeliveryExport
 
 
 class DeliverySearchListView(DeliveryListView):
@@ -274,6 +413,7 @@ class DeliveryDetailView(LoginRequiredMixin, DetailView):
     """
 
     model = Delivery
+    queryset = Delivery.objects.select_related("item")
     template_name = "store/deliverydetail.html"
 
 
@@ -322,6 +462,7 @@ class DeliveryDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     """
 
     model = Delivery
+    queryset = Delivery.objects.select_related("item")
     template_name = "store/productdelete.html"
     success_url = "/deliveries"
 
@@ -332,11 +473,12 @@ class DeliveryDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
             return False
 
 
-class CategoryListView(LoginRequiredMixin, ListView):
+class CategoryListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Category
     template_name = 'store/category_list.html'
     context_object_name = 'categories'
     paginate_by = 10
+    cursor_ordering = ('name', 'id')
     login_url = 'login'
 
 
@@ -379,18 +521,23 @@ def is_ajax(request):
     return request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
 
 
+async def item_choices(term):
+    """
+    Returns the sale screen's autocomplete choices for ``term``.
+    """
+    return [item.to_json() for item in await aautocomplete_items(term)]
+
+
 @csrf_exempt
 @require_POST
 @login_required
-def get_items_ajax_view(request):
+async def get_items_ajax_view(request):
     if is_ajax(request):
         try:
             term = request.POST.get("term", "")
-            data = []
-
-            items = Item.objects.filter(name__icontains=term)
-            for item in items[:10]:
-                data.append(item.to_json())
+            data = await caching.acached_results(
+                caching.ITEMS, term, item_choices
+            )
 
             return JsonResponse(data, safe=False)
         except Exception as e:
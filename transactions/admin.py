@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Sale, SaleDetail, Purchase
+from .models import Sale, SaleDetail, Purchase, StockLot, StockMovement
 
 
 @admin.register(Sale)
@@ -19,6 +19,7 @@ class SaleAdmin(admin.ModelAdmin):
     list_filter = ('date_added', 'customer')
     ordering = ('-date_added',)
     readonly_fields = ('date_added',)
+    list_select_related = ('customer',)
     date_hierarchy = 'date_added'
 
     def save_model(self, request, obj, form, change):
@@ -44,6 +45,7 @@ class SaleDetailAdmin(admin.ModelAdmin):
     search_fields = ('sale__id', 'item__name')
     list_filter = ('sale', 'item')
     ordering = ('sale', 'item')
+    list_select_related = ('sale', 'item__category')
 
     def save_model(self, request, obj, form, change):
         """
@@ -72,6 +74,7 @@ class PurchaseAdmin(admin.ModelAdmin):
     list_filter = ('order_date', 'vendor', 'delivery_status')
     ordering = ('-order_date',)
     readonly_fields = ('total_value',)
+    list_select_related = ('item__category', 'vendor')
 
     def save_model(self, request, obj, form, change):
         """
@@ -79,3 +82,62 @@ class PurchaseAdmin(admin.ModelAdmin):
         """
         obj.total_value = obj.price * obj.quantity
         super().save_model(request, obj, form, change)
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """
+    Read-only admin interface for the append-only stock ledger.
+    """
+    list_display = (
+        'created_at',
+        'item',
+        'kind',
+        'quantity',
+        'purchase',
+        'sale',
+        'note'
+    )
+    search_fields = ('item__name', 'note')
+    list_filter = ('kind', 'created_at')
+    ordering = ('-created_at',)
+    list_select_related = ('item', 'item__category', 'purchase__item')
+
+    def has_add_permission(self, request):
+        """
+        Movements are only recorded through the stock ledger.
+        """
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """
+        Movements are never edited once recorded.
+        """
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        """
+        Movements are never deleted once recorded.
+        """
+        return False
+
+
+@admin.register(StockLot)
+class StockLotAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the stock lots, kept by purchases and sales.
+    """
+    list_display = (
+        'id',
+        'item',
+        'purchase',
+        'quantity',
+        'remaining',
+        'expiring_date',
+        'created_at'
+    )
+    search_fields = ('item__name',)
+    list_filter = ('expiring_date', 'created_at')
+    ordering = ('-id',)
+    list_select_related = ('item', 'item__category', 'purchase__item')
+    raw_id_fields = ('item', 'purchase')
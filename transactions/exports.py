@@ -0,0 +1,49 @@
+from store.exports import StreamingExport
+from .models import Sale, Purchase
+
+
+class SaleExport(StreamingExport):
+    model = Sale
+    filename = 'sales'
+    sheet_title = 'Sales'
+    select_related = ('customer',)
+    date_field = 'date_added'
+    filters = {'customer': 'customer'}
+    ordering = ('date_added', 'pk')
+    columns = (
+        ('ID', 'id'),
+        ('Date', 'date_added'),
+        ('Customer', 'customer.phone'),
+        ('Sub Total', 'sub_total'),
+        ('Grand Total', 'grand_total'),
+        ('Tax Amount', 'tax_amount'),
+        ('Tax Percentage', 'tax_percentage'),
+        ('Amount Paid', 'amount_paid'),
+        ('Amount Change', 'amount_change'),
+    )
+
+
+class PurchaseExport(StreamingExport):
+    model = Purchase
+    filename = 'purchases'
+    sheet_title = 'Purchases'
+    select_related = ('item', 'vendor')
+    date_field = 'order_date'
+    filters = {
+        'item': 'item',
+        'vendor': 'vendor',
+        'delivery_status': 'delivery_status',
+    }
+    ordering = ('order_date', 'pk')
+    columns = (
+        ('ID', 'id'),
+        ('Item', 'item.name'),
+        ('Description', 'description'),
+        ('Vendor', 'vendor.name'),
+        ('Order Date', 'order_date'),
+        ('Delivery Date', 'delivery_date'),
+        ('Quantity', 'quantity'),
+        ('Delivery Status', lambda p: p.get_delivery_status_display()),
+        ('Price per item (Ksh)', 'price'),
+        ('Total Value', 'total_value'),
+    )
@@ -20,7 +20,7 @@ class PurchaseForm(BootstrapMixin, forms.ModelForm):
         model = Purchase
         fields = [
             'item',  'price', 'description', 'vendor',
-            'quantity', 'delivery_date', 'delivery_status'
+            'quantity', 'expiring_date', 'delivery_date', 'delivery_status'
         ]
         widgets = {
             'delivery_date': forms.DateInput(
@@ -29,6 +29,12 @@ class PurchaseForm(BootstrapMixin, forms.ModelForm):
                     'type': 'datetime-local'
                 }
             ),
+            'expiring_date': forms.DateInput(
+                attrs={
+                    'class': 'form-control',
+                    'type': 'datetime-local'
+                }
+            ),
             'description': forms.Textarea(
                 attrs={'rows': 1, 'cols': 40}
             ),
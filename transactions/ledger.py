@@ -0,0 +1,177 @@
+"""
+Module: ledger.py
+
+The stock ledger: the only code that changes ``Item.quantity``.
+
+Every change to stock is appended as a ``StockMovement`` and applied to the
+cached on-hand balance (``Item.quantity``) with a single atomic ``F()``
+update, so concurrent writers never lose each other's changes. Balances can
+be recomputed from the movements at any time with ``drifted_items`` (used
+by the ``reconcile_stock`` management command).
+
+Movements are never deleted or edited. Deleting a sale or a purchase
+appends the movements cancelling out its own (``reverse_movements``): a
+deleted sale puts its units back as a ``RETURN``, a deleted purchase takes
+its units back out.
+"""
+
+# Standard library imports
+import operator
+from collections import OrderedDict
+from functools import reduce
+
+# Django core imports
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, When
+from django.db.models.functions import Coalesce
+
+# Local app imports
+from store import metrics
+from store.models import Item
+from .models import StockMovement
+
+PURCHASE = "P"
+SALE = "S"
+RETURN = "R"
+ADJUSTMENT = "A"
+
+
+class InsufficientStock(ValueError):
+    """
+    Raised when a movement would take an item's stock below zero.
+    """
+
+    def __init__(self, item_name):
+        super().__init__(f"Not enough stock for item: {item_name}")
+        self.item_name = item_name
+
+
+def record_movements(movements, check_stock=False):
+    """
+    Appends ``movements`` to the ledger and applies them to the cached
+    balances of their items.
+
+    Runs one ``bulk_create`` and one ``UPDATE`` however many movements
+    and items are involved. With ``check_stock`` the update only matches
+    items that still hold enough stock for their outgoing movements, and
+    ``InsufficientStock`` is raised (rolling everything back) otherwise.
+    """
+    deltas = OrderedDict()
+    for movement in sorted(movements, key=operator.attrgetter("item_id")):
+        deltas[movement.item_id] = (
+            deltas.get(movement.item_id, 0) + movement.quantity
+        )
+    if not deltas:
+        return []
+
+    with transaction.atomic():
+        movements = StockMovement.objects.bulk_create(movements)
+
+        if check_stock:
+            matches = reduce(operator.or_, (
+                Q(pk=item_id, quantity__gte=-delta) if delta < 0
+                else Q(pk=item_id)
+                for item_id, delta in deltas.items()
+            ))
+        else:
+            matches = Q(pk__in=deltas)
+        updated = Item.objects.filter(matches).update(
+            quantity=Case(
+                *(
+                    When(pk=item_id, then=F("quantity") + delta)
+                    for item_id, delta in deltas.items()
+                ),
+                output_field=IntegerField(),
+            )
+        )
+        if check_stock and updated != len(deltas):
+            short = Item.objects.filter(pk__in=deltas).exclude(matches)
+            raise InsufficientStock(
+                short.values_list("name", flat=True).first()
+            )
+
+        metrics.bump(metrics.ITEMS_QUANTITY, sum(deltas.values()))
+    return movements
+
+
+def record_movement(item, quantity, kind, **kwargs):
+    """
+    Appends a single movement for ``item`` and applies it to the item's
+    balance. Extra keyword arguments are stored on the movement.
+    """
+    movement = StockMovement(
+        item_id=getattr(item, "pk", item),
+        quantity=quantity,
+        kind=kind,
+        **kwargs
+    )
+    return record_movements([movement])[0]
+
+
+def reverse_movements(kind, note="", **source):
+    """
+    Appends and applies the movements cancelling out those recorded for
+    ``source`` (``sale=`` or ``purchase=``), one per item whose balance
+    from them is not zero.
+    """
+    balances = (
+        StockMovement.objects.filter(**source)
+        .values("item_id")
+        .annotate(balance=Sum("quantity"))
+        .exclude(balance=0)
+        .order_by("item_id")
+    )
+    return record_movements([
+        StockMovement(
+            item_id=row["item_id"],
+            quantity=-row["balance"],
+            kind=kind,
+            note=note,
+            **source
+        )
+        for row in balances
+    ])
+
+
+def log_adjustment(item, quantity, note=""):
+    """
+    Appends an adjustment for a change already saved on the item itself
+    (e.g. a quantity saved directly on the item), leaving the balance
+    untouched.
+    """
+    return StockMovement.objects.create(
+        item=item, quantity=quantity, kind=ADJUSTMENT, note=note
+    )
+
+
+def log_adjustments(adjustments, note=""):
+    """
+    Bulk version of ``log_adjustment`` for ``(item, quantity)`` pairs
+    (e.g. the opening balances of imported items).
+    """
+    return StockMovement.objects.bulk_create([
+        StockMovement(
+            item_id=getattr(item, "pk", item),
+            quantity=quantity,
+            kind=ADJUSTMENT,
+            note=note,
+        )
+        for item, quantity in adjustments
+    ])
+
+
+def drifted_items():
+    """
+    Returns the items whose cached balance disagrees with their ledger,
+    annotated with the ledger balance as ``ledger_quantity``.
+
+    The ledger is summed for every item in one grouped query.
+    """
+    return (
+        Item.objects.annotate(
+            ledger_quantity=Coalesce(Sum("stock_movements__quantity"), 0)
+        )
+        .exclude(quantity=F("ledger_quantity"))
+        .only("id", "name", "quantity")
+        .order_by("pk")
+    )
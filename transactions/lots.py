@@ -0,0 +1,161 @@
+"""
+Module: lots.py
+
+Keeps the stock lots of items in step with purchases and sales.
+
+A purchase that adds to stock gets a lot holding its quantity and expiry,
+which follows later changes to the purchase; new items get a lot for
+their opening balance. ``consume`` takes the units of a sale from the
+lots of each item first-expired-first-out: a window query finds the lots
+each item's units come out of and a single ``UPDATE`` takes them, however
+many items and lots are involved. Callers hold the items' rows locked
+(``commit_sale`` does), so concurrent sales cannot take the same units.
+
+Units sold beyond what an item's lots hold (stock typed in on the product
+form, say) are simply not tracked by lot, and neither are the units a
+deleted sale puts back, whose expiry is not known. The lot of a deleted
+purchase is emptied. ``reconcile`` brings the lots of every item back
+under its stock, first-expired-first-out.
+
+``expiring`` lists the lots in stock expiring within a number of days
+from a partial index on the expiry of lots in stock. Changes to the lots
+drop the cached dashboard widgets, which list them.
+"""
+
+# Standard library imports
+from datetime import timedelta
+
+# Django core imports
+from django.db.models import (
+    Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+# Local app imports
+from store import fragments
+from store.models import Item
+from .models import StockLot
+
+# Lots with an expiry go first, soonest first, then the oldest lots.
+FEFO = [F("expiring_date").asc(nulls_last=True), F("id").asc()]
+
+
+def lot_for(item, quantity, expiring_date=None, purchase=None):
+    """
+    Returns an unsaved lot of ``quantity`` units of ``item``.
+    """
+    return StockLot(
+        item_id=getattr(item, "pk", item),
+        purchase=purchase,
+        quantity=quantity,
+        remaining=quantity,
+        expiring_date=expiring_date,
+    )
+
+
+def sync_purchase(purchase, quantity, delta):
+    """
+    Brings the lot of ``purchase`` in step with it after a save.
+    ``quantity`` is what the purchase now adds to stock and ``delta`` how
+    much that changed.
+    """
+    fragments.invalidate(fragments.DASHBOARD)
+    updated = StockLot.objects.filter(purchase=purchase).update(
+        item=purchase.item_id,
+        quantity=quantity,
+        remaining=Greatest(F("remaining") + delta, 0),
+        expiring_date=purchase.expiring_date,
+    )
+    if not updated and quantity:
+        lot_for(
+            purchase.item_id, quantity, purchase.expiring_date, purchase
+        ).save()
+
+
+def drop_purchase(purchase):
+    """
+    Empties the lot of ``purchase``, whose units leave stock with it.
+    """
+    fragments.invalidate(fragments.DASHBOARD)
+    StockLot.objects.filter(purchase=purchase).update(
+        quantity=0, remaining=0
+    )
+
+
+def consume(quantities):
+    """
+    Takes ``quantities`` (a mapping of item ids to units) from the lots
+    of the items, first-expired-first-out.
+    """
+    quantities = {
+        item_id: units for item_id, units in quantities.items() if units > 0
+    }
+    if not quantities:
+        return
+    wanted = Case(
+        *(
+            When(item_id=item_id, then=Value(units))
+            for item_id, units in quantities.items()
+        ),
+        output_field=IntegerField(),
+    )
+    # Lots an item's units are taken from: those whose earlier lots do
+    # not already hold them all.
+    lots = (
+        StockLot.objects.filter(item_id__in=quantities, remaining__gt=0)
+        .annotate(
+            running=Window(
+                Sum("remaining"), partition_by=F("item_id"), order_by=FEFO
+            ),
+            wanted=wanted,
+        )
+        .filter(running__lt=F("wanted") + F("remaining"))
+        .values_list("pk", "running", "wanted", "remaining")
+    )
+    taken = {
+        pk: min(remaining, wanted - (running - remaining))
+        for pk, running, wanted, remaining in lots
+    }
+    if taken:
+        fragments.invalidate(fragments.DASHBOARD)
+        StockLot.objects.filter(pk__in=taken).update(
+            remaining=F("remaining") - Case(
+                *(
+                    When(pk=pk, then=Value(units))
+                    for pk, units in taken.items()
+                ),
+                output_field=IntegerField(),
+            )
+        )
+
+
+def reconcile():
+    """
+    Takes out of the lots of every item what they hold beyond the item's
+    stock, first-expired-first-out, and returns the units taken per item.
+    """
+    in_lots = (
+        StockLot.objects.filter(item=OuterRef("pk"), remaining__gt=0)
+        .values("item").annotate(total=Sum("remaining")).values("total")
+    )
+    excess = dict(
+        Item.objects.annotate(
+            in_lots=Coalesce(Subquery(in_lots), 0),
+        ).filter(in_lots__gt=Greatest(F("quantity"), 0)).values_list(
+            "pk", F("in_lots") - Greatest(F("quantity"), 0)
+        )
+    )
+    consume(excess)
+    return excess
+
+
+def expiring(days, now=None):
+    """
+    Returns the lots in stock that expire within ``days`` days (or have
+    expired), soonest first.
+    """
+    now = now or timezone.now()
+    return StockLot.objects.filter(
+        remaining__gt=0, expiring_date__lt=now + timedelta(days=days),
+    ).order_by("expiring_date", "id")
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, When
+
+from store import metrics
+from store.models import Item
+from transactions import lots
+from transactions.ledger import drifted_items
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute item stock balances from the stock ledger and correct '
+        'any that have drifted, then trim stock lots holding more than '
+        'their item. Safe to run periodically (e.g. from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted balances without correcting them.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(drifted_items())
+        corrections = {}
+        for item in drifted:
+            self.stdout.write(
+                f'{item.name} (ID {item.pk}): '
+                f'cached {item.quantity}, ledger {item.ledger_quantity}'
+            )
+            corrections[item.pk] = item.ledger_quantity - item.quantity
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All balances match.'))
+            self.trim_lots(options['dry_run'])
+            return
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} balance(s) drifted.')
+            return
+
+        # Apply the corrections as deltas so that sales committed since
+        # the ledger was summed are not overwritten.
+        with transaction.atomic():
+            Item.objects.filter(pk__in=corrections).update(
+                quantity=Case(
+                    *(
+                        When(pk=pk, then=F('quantity') + delta)
+                        for pk, delta in corrections.items()
+                    ),
+                    output_field=IntegerField(),
+                )
+            )
+            # Whatever bypassed the ledger also bypassed the dashboard.
+            metrics.reset(
+                metrics.ITEMS_QUANTITY,
+                Item.objects.aggregate(total=Sum('quantity'))['total'] or 0,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(drifted)} balance(s) corrected.'
+        ))
+        self.trim_lots(options['dry_run'])
+
+    def trim_lots(self, dry_run):
+        # Stock taken outside of sales (adjustments, corrections) leaves
+        # lots holding units the items no longer have.
+        if dry_run:
+            return
+        with transaction.atomic():
+            trimmed = lots.reconcile()
+        if trimmed:
+            self.stdout.write(
+                f'{sum(trimmed.values())} unit(s) trimmed from the lots of '
+                f'{len(trimmed)} item(s).'
+            )
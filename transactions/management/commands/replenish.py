@@ -0,0 +1,76 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Vendor
+from transactions.replenishment import (
+    COVER_DAYS, HISTORY_DAYS, SERVICE_FACTOR, create_drafts, plan,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute the reorder point of every item from its sales and its '
+        'purchases\' lead times, and save draft purchases, grouped by '
+        'vendor, for the items at or below it. Safe to run periodically '
+        '(e.g. from cron): open drafts count as on order.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history-days', type=int, default=HISTORY_DAYS,
+            help='Days of sales the demand is measured over.',
+        )
+        parser.add_argument(
+            '--cover-days', type=int, default=COVER_DAYS,
+            help='Days of demand ordered beyond the lead time.',
+        )
+        parser.add_argument(
+            '--service-factor', type=float, default=SERVICE_FACTOR,
+            help='Standard deviations of demand kept as safety stock.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the suggestions without saving drafts.',
+        )
+
+    def handle(self, *args, **options):
+        suggestions = plan(
+            history_days=options['history_days'],
+            cover_days=options['cover_days'],
+            service_factor=options['service_factor'],
+        )
+        if not suggestions:
+            self.stdout.write(self.style.SUCCESS('Nothing to reorder.'))
+            return
+
+        vendors = dict(Vendor.objects.filter(
+            pk__in={suggestion.vendor_id for suggestion in suggestions}
+        ).values_list('pk', 'name'))
+        for vendor_id, group in groupby(
+            suggestions, key=lambda suggestion: suggestion.vendor_id
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                vendors.get(vendor_id, 'No vendor')
+            ))
+            for suggestion in group:
+                self.stdout.write(
+                    f'  {suggestion.name} (ID {suggestion.item_id}): '
+                    f'order {suggestion.quantity}, stock '
+                    f'{suggestion.on_hand}, drafted {suggestion.on_order}, '
+                    f'reorder point {suggestion.reorder_point} '
+                    f'({suggestion.daily_demand:.1f}/day, '
+                    f'{suggestion.lead_days:.1f} day lead time)'
+                )
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(suggestions)} item(s) to reorder.')
+            return
+        with transaction.atomic():
+            drafts = create_drafts(suggestions)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(drafts)} draft purchase(s) created for '
+            f'{len({draft.vendor_id for draft in drafts})} vendor(s).'
+        ))
@@ -0,0 +1,56 @@
+# Generated by Django 5.1 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    Item = apps.get_model('store', 'Item')
+    StockMovement = apps.get_model('transactions', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(
+                item_id=item_id,
+                kind='A',
+                quantity=quantity,
+                note='Opening balance',
+            )
+            for item_id, quantity in Item.objects.exclude(
+                quantity=0
+            ).values_list('id', 'quantity').iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_dashboard_metrics'),
+        ('transactions', '0003_alter_purchase_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('P', 'Purchase'), ('S', 'Sale'), ('R', 'Return'), ('A', 'Adjustment')], max_length=1)),
+                ('quantity', models.IntegerField()),
+                ('note', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='store.item')),
+                ('purchase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='transactions.purchase')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='transactions.sale')),
+            ],
+            options={
+                'verbose_name': 'Stock Movement',
+                'verbose_name_plural': 'Stock Movements',
+                'db_table': 'stock_movements',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.RunPython(
+            record_opening_balances, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_list_ordering_indexes'),
+        ('store', '0004_list_ordering_indexes'),
+        ('transactions', '0004_stock_movements'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['order_date', 'id'], name='purchase_order_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date_added', 'id'], name='sales_date_added_id_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_list_ordering_indexes'),
+        ('store', '0006_filter_indexes'),
+        ('transactions', '0005_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['delivery_status', 'order_date', 'id'], name='purchase_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['vendor', 'order_date', 'id'], name='purchase_vendor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', 'date_added', 'id'], name='sales_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at', 'id'], name='stock_movement_created_idx'),
+        ),
+    ]
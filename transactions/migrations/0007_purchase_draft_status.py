@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchase',
+            name='delivery_status',
+            field=models.CharField(choices=[('D', 'Draft'), ('P', 'Pending'), ('S', 'Successful')], default='P', max_length=1, verbose_name='Delivery Status'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_opening_lots(apps, schema_editor):
+    # The stock on hand becomes one lot per item, expiring when the item
+    # does.
+    Item = apps.get_model('store', 'Item')
+    StockLot = apps.get_model('transactions', 'StockLot')
+    StockLot.objects.bulk_create(
+        (
+            StockLot(
+                item_id=item_id,
+                quantity=quantity,
+                remaining=quantity,
+                expiring_date=expiring_date,
+            )
+            for item_id, quantity, expiring_date in Item.objects.filter(
+                quantity__gt=0
+            ).values_list('id', 'quantity', 'expiring_date').iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_daily_sales_updated_at'),
+        ('transactions', '0007_purchase_draft_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='expiring_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Expiring Date'),
+        ),
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('remaining', models.PositiveIntegerField()),
+                ('expiring_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='store.item')),
+                ('purchase', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lot', to='transactions.purchase')),
+            ],
+            options={
+                'verbose_name': 'Stock Lot',
+                'verbose_name_plural': 'Stock Lots',
+                'db_table': 'stock_lots',
+                'indexes': [models.Index(condition=models.Q(('expiring_date__isnull', False), ('remaining__gt', 0)), fields=['expiring_date', 'id'], name='stock_lot_expiring_idx'), models.Index(condition=models.Q(('remaining__gt', 0)), fields=['item', 'expiring_date', 'id'], name='stock_lot_fefo_idx')],
+            },
+        ),
+        migrations.RunPython(
+            create_opening_lots, migrations.RunPython.noop
+        ),
+    ]
@@ -4,7 +4,17 @@ from django_extensions.db.fields import AutoSlugField
 from store.models import Item
 from accounts.models import Vendor, Customer
 
-DELIVERY_CHOICES = [("P", "Pending"), ("S", "Successful")]
+# Draft purchases are suggestions (see ``transactions.replenishment``) and
+# only add to stock once confirmed as pending or delivered.
+DRAFT = "D"
+DELIVERY_CHOICES = [(DRAFT, "Draft"), ("P", "Pending"), ("S", "Successful")]
+
+MOVEMENT_CHOICES = [
+    ("P", "Purchase"),
+    ("S", "Sale"),
+    ("R", "Return"),
+    ("A", "Adjustment"),
+]
 
 
 class Sale(models.Model):
@@ -52,6 +62,15 @@ class Sale(models.Model):
         db_table = "sales"
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
+        indexes = [
+            models.Index(
+                fields=["date_added", "id"], name="sales_date_added_id_idx"
+            ),
+            models.Index(
+                fields=["customer", "date_added", "id"],
+                name="sales_customer_date_idx",
+            ),
+        ]
 
     def __str__(self):
         """
@@ -66,8 +85,18 @@ class Sale(models.Model):
     def sum_products(self):
         """
         Returns the total quantity of products in the sale.
+
+        Uses the prefetched details when there are some, and a single
+        aggregate query otherwise.
         """
-        return sum(detail.quantity for detail in self.saledetail_set.all())
+        prefetched = getattr(self, "_prefetched_objects_cache", {})
+        if "saledetail_set" in prefetched:
+            return sum(
+                detail.quantity for detail in prefetched["saledetail_set"]
+            )
+        return self.saledetail_set.aggregate(
+            total=models.Sum("quantity")
+        )["total"] or 0
 
 
 class SaleDetail(models.Model):
@@ -104,7 +133,7 @@ class SaleDetail(models.Model):
         """
         return (
             f"Detail ID: {self.id} | "
-            f"Sale ID: {self.sale.id} | "
+            f"Sale ID: {self.sale_id} | "
             f"Quantity: {self.quantity}"
         )
 
@@ -115,7 +144,9 @@ class Purchase(models.Model):
     including vendor details and delivery status.
     """
 
-    slug = AutoSlugField(unique=True, populate_from="vendor")
+    slug = AutoSlugField(
+        unique=True, populate_from="vendor", overwrite_on_add=False
+    )
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     description = models.TextField(max_length=300, blank=True, null=True)
     vendor = models.ForeignKey(
@@ -126,6 +157,9 @@ class Purchase(models.Model):
         blank=True, null=True, verbose_name="Delivery Date"
     )
     quantity = models.PositiveIntegerField(default=0)
+    expiring_date = models.DateTimeField(
+        blank=True, null=True, verbose_name="Expiring Date"
+    )
     delivery_status = models.CharField(
         choices=DELIVERY_CHOICES,
         max_length=1,
@@ -140,15 +174,24 @@ class Purchase(models.Model):
     )
     total_value = models.DecimalField(max_digits=10, decimal_places=2)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded item, quantity and status so that the stock
+        ledger can record what a later save changed.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_item_id = instance.__dict__.get("item_id")
+        instance._loaded_quantity = instance.__dict__.get("quantity")
+        instance._loaded_status = instance.__dict__.get("delivery_status")
+        return instance
+
     def save(self, *args, **kwargs):
         """
         Calculates the total value before saving the Purchase instance.
         """
         self.total_value = self.price * self.quantity
         super().save(*args, **kwargs)
-        # Update the item quantity
-        self.item.quantity += self.quantity
-        self.item.save()
 
     def __str__(self):
         """
@@ -158,3 +201,128 @@ class Purchase(models.Model):
 
     class Meta:
         ordering = ["order_date"]
+        indexes = [
+            models.Index(
+                fields=["order_date", "id"], name="purchase_order_date_id_idx"
+            ),
+            models.Index(
+                fields=["delivery_status", "order_date", "id"],
+                name="purchase_status_date_idx",
+            ),
+            models.Index(
+                fields=["vendor", "order_date", "id"],
+                name="purchase_vendor_date_idx",
+            ),
+        ]
+
+
+class StockLot(models.Model):
+    """
+    Represents a batch of an item received together, with its own expiry.
+
+    Purchases create a lot when they add to stock, and so do the opening
+    balances of new items. ``remaining`` is what is left of the lot; sales
+    take units from the lots of an item that expire first (lots without an
+    expiry last, oldest first) through ``transactions.lots``.
+    """
+
+    item = models.ForeignKey(
+        Item, on_delete=models.CASCADE, related_name="lots"
+    )
+    purchase = models.OneToOneField(
+        Purchase,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="lot"
+    )
+    quantity = models.PositiveIntegerField()
+    remaining = models.PositiveIntegerField()
+    expiring_date = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "stock_lots"
+        verbose_name = "Stock Lot"
+        verbose_name_plural = "Stock Lots"
+        indexes = [
+            # Lots in stock by expiry, for the expiring stock query.
+            models.Index(
+                fields=["expiring_date", "id"],
+                condition=models.Q(
+                    remaining__gt=0, expiring_date__isnull=False
+                ),
+                name="stock_lot_expiring_idx",
+            ),
+            # Lots in stock of each item in the order sales take them.
+            models.Index(
+                fields=["item", "expiring_date", "id"],
+                condition=models.Q(remaining__gt=0),
+                name="stock_lot_fefo_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the StockLot instance.
+        """
+        return (
+            f"Lot {self.pk} | "
+            f"Item ID: {self.item_id} | "
+            f"Remaining: {self.remaining}/{self.quantity}"
+        )
+
+
+class StockMovement(models.Model):
+    """
+    Represents a single change to the stock of an item.
+
+    Movements are only ever appended; ``Item.quantity`` is the cached
+    running balance of an item's movements and is kept in step by
+    ``transactions.ledger``.
+    """
+
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.CASCADE,
+        related_name="stock_movements"
+    )
+    kind = models.CharField(choices=MOVEMENT_CHOICES, max_length=1)
+    quantity = models.IntegerField()
+    purchase = models.ForeignKey(
+        Purchase,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="stock_movements"
+    )
+    sale = models.ForeignKey(
+        Sale,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="stock_movements"
+    )
+    note = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "stock_movements"
+        ordering = ["created_at", "id"]
+        verbose_name = "Stock Movement"
+        verbose_name_plural = "Stock Movements"
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="stock_movement_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the StockMovement instance.
+        """
+        return (
+            f"{self.get_kind_display()} | "
+            f"Item ID: {self.item_id} | "
+            f"Quantity: {self.quantity:+d}"
+        )
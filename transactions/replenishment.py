@@ -0,0 +1,206 @@
+"""
+Module: replenishment.py
+
+Works out what to re-buy, and from which vendor, before items run out.
+
+For every item of the catalogue:
+- Demand is the mean and standard deviation of the units sold per day
+  over the last ``history_days``, read from the daily item sales rollups
+  of ``reports`` rather than from the sale lines.
+- Lead time is the mean time from ``order_date`` to ``delivery_date`` of
+  the item's delivered purchases, or of its vendor's when the item has
+  none, or ``DEFAULT_LEAD_DAYS``.
+- The reorder point is the demand over the lead time plus a safety stock
+  of ``service_factor`` standard deviations of that demand.
+- An item whose stock plus open drafts is at or below its reorder point
+  is ordered up to the demand over the lead time and ``cover_days`` more,
+  plus the safety stock.
+
+``plan`` computes the suggestions for the whole catalogue from a handful
+of grouped queries, and ``create_drafts`` saves them as draft purchases
+(grouped by vendor) with one bulk insert. Drafts do not add to stock
+until they are confirmed; they count as on order, so running the plan
+again does not suggest the same units twice.
+"""
+
+# Standard library imports
+import math
+from collections import namedtuple
+from datetime import timedelta
+
+# Django core imports
+from django.db.models import (
+    Avg, DurationField, ExpressionWrapper, F, IntegerField, OuterRef,
+    Subquery, Sum,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# Local app imports
+from reports.models import ItemSales
+from store.metrics import DAY
+from store.models import Item
+from store.slugs import allocate_slugs
+from .models import DRAFT, Purchase
+
+# Days of sales the demand is measured over.
+HISTORY_DAYS = 90
+
+# Days of demand ordered beyond the lead time.
+COVER_DAYS = 14
+
+# Standard deviations of demand kept as safety stock (about 95% of lead
+# times covered).
+SERVICE_FACTOR = 1.65
+
+# Lead time of items whose vendor never delivered a purchase.
+DEFAULT_LEAD_DAYS = 7
+
+# Purchases the lead times are measured over.
+LEAD_TIME_DAYS = 365
+
+Suggestion = namedtuple('Suggestion', [
+    'item_id', 'name', 'vendor_id', 'price', 'on_hand', 'on_order',
+    'daily_demand', 'lead_days', 'reorder_point', 'quantity',
+])
+
+
+def demand(since, days):
+    """
+    Returns the mean and standard deviation of the units of every item
+    sold per day since ``since``, over ``days`` days.
+    """
+    rows = (
+        ItemSales.objects.filter(period=DAY, start__gte=since)
+        .values('item')
+        .annotate(
+            units=Sum('quantity'),
+            squares=Sum(F('quantity') * F('quantity')),
+        )
+        .values_list('item', 'units', 'squares')
+        .order_by()
+    )
+    stats = {}
+    for item_id, units, squares in rows:
+        mean = units / days
+        variance = max(squares / days - mean * mean, 0)
+        stats[item_id] = (mean, math.sqrt(variance))
+    return stats
+
+
+def lead_times(since):
+    """
+    Returns the mean lead times in days of the purchases delivered since
+    ``since``, per item and per vendor.
+    """
+    delivered = Purchase.objects.filter(
+        order_date__gte=since, delivery_date__isnull=False,
+    ).exclude(delivery_status=DRAFT)
+    lead = Avg(ExpressionWrapper(
+        F('delivery_date') - F('order_date'), output_field=DurationField()
+    ))
+    per_key = []
+    for key in ('item', 'vendor'):
+        rows = delivered.values(key).annotate(lead=lead).order_by()
+        per_key.append({
+            row[key]: max(row['lead'].total_seconds() / 86400, 0)
+            for row in rows
+        })
+    return per_key
+
+
+def plan(history_days=HISTORY_DAYS, cover_days=COVER_DAYS,
+         service_factor=SERVICE_FACTOR, today=None):
+    """
+    Returns the ``Suggestion`` of every item at or below its reorder
+    point, ordered by vendor. Items that were never bought and have no
+    vendor have a ``vendor_id`` of ``None``.
+    """
+    today = today or timezone.localdate()
+    since = today - timedelta(days=history_days - 1)
+    stats = demand(since, history_days)
+    item_leads, vendor_leads = lead_times(
+        timezone.now() - timedelta(days=LEAD_TIME_DAYS)
+    )
+    on_order = dict(
+        Purchase.objects.filter(delivery_status=DRAFT)
+        .values('item').annotate(units=Sum('quantity'))
+        .values_list('item', 'units').order_by()
+    )
+    latest = Purchase.objects.filter(item=OuterRef('pk')).order_by(
+        '-order_date', '-pk'
+    )
+    items = (
+        Item.objects.filter(pk__in=ItemSales.objects.filter(
+            period=DAY, start__gte=since,
+        ).values('item'))
+        .annotate(
+            supplier=Coalesce(
+                'vendor', Subquery(latest.values('vendor')[:1]),
+                output_field=IntegerField(),
+            ),
+            last_price=Subquery(latest.values('price')[:1]),
+        )
+        .values_list('pk', 'name', 'quantity', 'supplier', 'last_price')
+    )
+
+    suggestions = []
+    for item_id, name, on_hand, vendor_id, price in items:
+        daily, deviation = stats.get(item_id, (0, 0))
+        if not daily:
+            continue
+        lead = item_leads.get(
+            item_id, vendor_leads.get(vendor_id, DEFAULT_LEAD_DAYS)
+        )
+        safety = service_factor * deviation * math.sqrt(lead)
+        reorder_point = math.ceil(daily * lead + safety)
+        position = max(on_hand, 0) + on_order.get(item_id, 0)
+        if position > reorder_point:
+            continue
+        target = daily * (lead + cover_days) + safety
+        suggestions.append(Suggestion(
+            item_id=item_id,
+            name=name,
+            vendor_id=vendor_id,
+            price=price or 0,
+            on_hand=on_hand,
+            on_order=on_order.get(item_id, 0),
+            daily_demand=daily,
+            lead_days=lead,
+            reorder_point=reorder_point,
+            # Always past the reorder point, so the drafts are not
+            # suggested again.
+            quantity=max(
+                math.ceil(target - position), reorder_point + 1 - position
+            ),
+        ))
+    suggestions.sort(key=lambda suggestion: (
+        suggestion.vendor_id is None, suggestion.vendor_id or 0,
+        suggestion.item_id,
+    ))
+    return suggestions
+
+
+def create_drafts(suggestions):
+    """
+    Saves the suggestions that have a vendor as draft purchases, with one
+    bulk insert, and returns them.
+    """
+    drafts = [
+        Purchase(
+            item_id=suggestion.item_id,
+            vendor_id=suggestion.vendor_id,
+            description=(
+                f'Replenishment: {suggestion.daily_demand:.1f} sold a day, '
+                f'{suggestion.lead_days:.1f} day lead time, reorder point '
+                f'{suggestion.reorder_point}.'
+            ),
+            quantity=suggestion.quantity,
+            delivery_status=DRAFT,
+            price=suggestion.price,
+            total_value=suggestion.price * suggestion.quantity,
+        )
+        for suggestion in suggestions
+        if suggestion.vendor_id is not None
+    ]
+    return Purchase.objects.bulk_create(allocate_slugs(drafts))
@@ -0,0 +1,129 @@
+"""
+Module: services.py
+
+Contains the sale commit path used by the point-of-sale view.
+
+``commit_sale`` records a sale and all of its lines with a fixed number of
+queries regardless of basket size: the sold items are locked in a single
+``select_for_update`` query, every ``SaleDetail`` is inserted with one
+``bulk_create`` and the stock ledger records the sale with one more
+``bulk_create`` and a single conditional ``UPDATE`` that only succeeds
+when every line still has enough stock. The sold units are then taken
+from the items' stock lots, first-expired-first-out, with one query to
+find the lots and one ``UPDATE`` (see ``transactions.lots``). The sales
+reports are updated in the same transaction with two queries per rollup
+table (see ``reports.rollups``). The dashboard's sales counter and daily
+total are only updated once the sale is committed (see ``store.metrics``).
+"""
+
+# Standard library imports
+import operator
+from collections import OrderedDict
+
+# Django core imports
+from django.db import transaction
+
+# Local app imports
+from reports import rollups
+from store.models import Item
+from . import ledger, lots
+from .ledger import InsufficientStock
+from .models import Sale, SaleDetail, StockMovement
+
+REQUIRED_LINE_FIELDS = ("id", "price", "quantity", "total_item")
+
+
+def _parse_lines(lines):
+    """
+    Validates the cart lines and returns them with numeric values.
+    """
+    if not isinstance(lines, list):
+        raise ValueError("Items should be a list")
+
+    parsed = []
+    for line in lines:
+        if not all(k in line for k in REQUIRED_LINE_FIELDS):
+            raise ValueError("Item is missing required fields")
+        quantity = int(line["quantity"])
+        if quantity < 1:
+            raise ValueError("Item quantity must be at least 1")
+        parsed.append({
+            "item_id": int(line["id"]),
+            "price": float(line["price"]),
+            "quantity": quantity,
+            "total_detail": float(line["total_item"]),
+        })
+    return parsed
+
+
+def commit_sale(sale_attributes, lines):
+    """
+    Creates a sale with its details and takes the sold units out of stock.
+
+    ``sale_attributes`` are the keyword arguments for the ``Sale`` and
+    ``lines`` is the list of cart lines posted by the sale screen. The
+    whole sale is rolled back if an item does not exist
+    (``Item.DoesNotExist``) or is short of stock (``InsufficientStock``).
+    """
+    parsed = _parse_lines(lines)
+
+    # Quantities per item, in primary key order so that concurrent
+    # sales always lock rows in the same order.
+    wanted = OrderedDict()
+    for line in sorted(parsed, key=operator.itemgetter("item_id")):
+        wanted[line["item_id"]] = (
+            wanted.get(line["item_id"], 0) + line["quantity"]
+        )
+
+    with transaction.atomic():
+        sale = Sale.objects.create(**sale_attributes)
+
+        items = {
+            item.pk: item
+            for item in Item.objects.select_for_update()
+            .filter(pk__in=wanted)
+            .order_by("pk")
+            .only("id", "name", "quantity", "category_id")
+        }
+        for item_id, quantity in wanted.items():
+            if item_id not in items:
+                raise Item.DoesNotExist(f"Item {item_id} does not exist")
+            if items[item_id].quantity < quantity:
+                raise InsufficientStock(items[item_id].name)
+
+        SaleDetail.objects.bulk_create([
+            SaleDetail(
+                sale=sale,
+                item=items[line["item_id"]],
+                price=line["price"],
+                quantity=line["quantity"],
+                total_detail=line["total_detail"],
+            )
+            for line in parsed
+        ])
+
+        ledger.record_movements(
+            [
+                StockMovement(
+                    item_id=item_id,
+                    kind=ledger.SALE,
+                    quantity=-quantity,
+                    sale=sale,
+                )
+                for item_id, quantity in wanted.items()
+            ],
+            check_stock=True,
+        )
+        lots.consume(wanted)
+
+        rollups.record_sale(sale, [
+            (
+                line["item_id"],
+                items[line["item_id"]].category_id,
+                line["quantity"],
+                line["total_detail"],
+            )
+            for line in parsed
+        ])
+
+    return sale
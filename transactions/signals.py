@@ -1,14 +1,97 @@
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import Purchase
+from store.models import Category, Item
+from . import ledger, lots
+from .models import DRAFT, Purchase, Sale
+
+
+def counted(quantity, status):
+    """
+    Returns the units a purchase adds to stock: none while it is a draft.
+    """
+    return 0 if status == DRAFT else quantity
 
 
 @receiver(post_save, sender=Purchase)
-def update_item_quantity(sender, instance, created, **kwargs):
+def update_item_quantity(sender, instance, created, raw=False, **kwargs):
     """
-    Signal to update item quantity when a purchase is made.
+    Signal to record a purchase, or a change to one, in the stock ledger.
     """
+    if raw:
+        return
+    quantity = counted(instance.quantity, instance.delivery_status)
     if created:
-        instance.item.quantity += instance.quantity
-        instance.item.save()
+        if quantity:
+            ledger.record_movement(
+                instance.item_id, quantity, ledger.PURCHASE,
+                purchase=instance
+            )
+            lots.lot_for(
+                instance.item_id, quantity, instance.expiring_date, instance
+            ).save()
+    else:
+        loaded_item_id = getattr(instance, "_loaded_item_id", None)
+        loaded_quantity = getattr(instance, "_loaded_quantity", None)
+        if loaded_item_id is None or loaded_quantity is None:
+            return
+        loaded_status = getattr(instance, "_loaded_status", None)
+        loaded_quantity = counted(loaded_quantity, loaded_status)
+        lots.sync_purchase(instance, quantity, quantity - loaded_quantity)
+        if loaded_item_id != instance.item_id:
+            if loaded_quantity:
+                ledger.record_movement(
+                    loaded_item_id, -loaded_quantity, ledger.PURCHASE,
+                    purchase=instance, note="Moved to another item"
+                )
+            if quantity:
+                ledger.record_movement(
+                    instance.item_id, quantity, ledger.PURCHASE,
+                    purchase=instance
+                )
+        elif loaded_quantity != quantity:
+            if loaded_status == DRAFT:
+                note = "Draft confirmed"
+            elif instance.delivery_status == DRAFT:
+                note = "Turned back into a draft"
+            else:
+                note = "Purchase quantity changed"
+            ledger.record_movement(
+                instance.item_id, quantity - loaded_quantity,
+                ledger.PURCHASE, purchase=instance, note=note
+            )
+    instance._loaded_item_id = instance.item_id
+    instance._loaded_quantity = instance.quantity
+    instance._loaded_status = instance.delivery_status
+
+
+def deletes_items(origin):
+    """
+    Returns whether a deletion started from ``origin`` (an instance or a
+    queryset) takes items, and so their whole ledger, with it.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Item, Category))
+
+
+@receiver(pre_delete, sender=Purchase)
+def reverse_deleted_purchase(sender, instance, origin=None, **kwargs):
+    """
+    Signal to take the units of a deleted purchase back out of stock,
+    unless its item is being deleted too.
+    """
+    if deletes_items(origin):
+        return
+    ledger.reverse_movements(
+        ledger.PURCHASE, note="Purchase deleted", purchase=instance
+    )
+    lots.drop_purchase(instance)
+
+
+@receiver(pre_delete, sender=Sale)
+def return_deleted_sale(sender, instance, **kwargs):
+    """
+    Signal to put the units of a deleted sale back in stock.
+    """
+    ledger.reverse_movements(ledger.RETURN, note="Sale deleted", sale=instance)
@@ -1,3 +1,543 @@
-from django.test import TestCase
+import csv
+import io
+import threading
+import time
+from datetime import datetime, timedelta
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from accounts.models import Customer, Vendor
+from store.models import Category, Item
+from store.testing import QueryBudgetMixin
+from . import ledger, lots, replenishment
+from .exports import PurchaseExport, SaleExport
+from .models import (
+    DRAFT, Purchase, Sale, SaleDetail, StockLot, StockMovement,
+)
+from .services import InsufficientStock, commit_sale
+
+
+def make_items(count, quantity):
+    category = Category.objects.create(name="Groceries")
+    return [
+        Item.objects.create(
+            name=f"Item {n}", description="Test item",
+            category=category, quantity=quantity, price=10
+        )
+        for n in range(count)
+    ]
+
+
+def cart(items, quantity=1):
+    return [
+        {"id": item.pk, "price": 10, "quantity": quantity,
+         "total_item": 10 * quantity}
+        for item in items
+    ]
+
+
+class CommitSaleTests(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Jane", last_name="Doe"
+        )
+
+    def sale_attributes(self):
+        return {
+            "customer": self.customer, "sub_total": 0, "grand_total": 0,
+            "amount_paid": 0, "amount_change": 0,
+        }
+
+    def test_query_count_does_not_grow_with_basket(self):
+        items = make_items(51, quantity=5)
+        # Warm up so that the daily totals row already exists.
+        commit_sale(self.sale_attributes(), cart(items[:1]))
+        with CaptureQueriesContext(connection) as small:
+            commit_sale(self.sale_attributes(), cart(items[1:2]))
+        with CaptureQueriesContext(connection) as large:
+            commit_sale(self.sale_attributes(), cart(items[2:]))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(SaleDetail.objects.count(), 51)
+        self.assertEqual(
+            set(Item.objects.values_list("quantity", flat=True)), {4}
+        )
+
+    def test_short_stock_rolls_back_whole_sale(self):
+        items = make_items(2, quantity=1)
+        with self.assertRaises(InsufficientStock):
+            commit_sale(self.sale_attributes(), cart(items, quantity=2))
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(SaleDetail.objects.exists())
+        self.assertEqual(
+            set(Item.objects.values_list("quantity", flat=True)), {1}
+        )
+
+
+class StockLedgerTests(TestCase):
+
+    def test_purchase_is_counted_once(self):
+        item = make_items(1, quantity=2)[0]
+        vendor = Vendor.objects.create(name="Acme")
+        Purchase.objects.create(item=item, vendor=vendor, quantity=3)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(
+            list(item.stock_movements.values_list("kind", "quantity")),
+            [("A", 2), ("P", 3)],
+        )
+
+    def test_reconcile_restores_ledger_balance(self):
+        item = make_items(1, quantity=4)[0]
+        Item.objects.filter(pk=item.pk).update(quantity=40)
+        call_command("reconcile_stock", stdout=io.StringIO())
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 4)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def sell(self, items, quantity):
+        customer = Customer.objects.create(first_name="Jane")
+        return commit_sale({
+            "customer": customer, "sub_total": 0, "grand_total": 0,
+            "amount_paid": 0, "amount_change": 0,
+        }, cart(items, quantity))
+
+    def test_deleted_sale_is_returned(self):
+        items = make_items(2, quantity=5)
+        sale = self.sell(items, quantity=2)
+        self.sell(items[:1], quantity=1)
+        sale.delete()
+        self.assertEqual(
+            list(Item.objects.order_by("pk").values_list(
+                "quantity", flat=True
+            )),
+            [4, 5],
+        )
+        self.assertEqual(
+            list(items[1].stock_movements.values_list(
+                "kind", "quantity", "note"
+            )),
+            [("A", 5, "Opening balance"), ("S", -2, ""),
+             ("R", 2, "Sale deleted")],
+        )
+        self.assertFalse(ledger.drifted_items().exists())
+
+    def test_deleted_purchase_is_taken_back_out(self):
+        item, other = make_items(2, quantity=2)
+        vendor = Vendor.objects.create(name="Acme")
+        purchase = Purchase.objects.create(
+            item=item, vendor=vendor, quantity=3
+        )
+        # Moved to another item and changed, then partly sold.
+        purchase = Purchase.objects.get(pk=purchase.pk)
+        purchase.item = other
+        purchase.quantity = 4
+        purchase.save()
+        self.sell([other], quantity=1)
+        lot = purchase.lot
+        purchase.delete()
+        self.assertEqual(
+            list(Item.objects.order_by("pk").values_list(
+                "quantity", flat=True
+            )),
+            [2, 1],
+        )
+        self.assertEqual(
+            other.stock_movements.last().note, "Purchase deleted"
+        )
+        lot.refresh_from_db()
+        self.assertEqual((lot.purchase, lot.remaining), (None, 0))
+        self.assertFalse(ledger.drifted_items().exists())
+
+    def test_vendor_deletion_takes_its_purchases_out(self):
+        item = make_items(1, quantity=2)[0]
+        vendor = Vendor.objects.create(name="Acme")
+        Purchase.objects.create(item=item, vendor=vendor, quantity=3)
+        vendor.delete()
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+        self.assertFalse(ledger.drifted_items().exists())
+
+    def test_item_deletion_takes_its_purchases(self):
+        item = make_items(1, quantity=2)[0]
+        vendor = Vendor.objects.create(name="Acme")
+        Purchase.objects.create(item=item, vendor=vendor, quantity=3)
+        item.delete()
+        Purchase.objects.create(
+            item=make_items(1, quantity=0)[0], vendor=vendor, quantity=1
+        )
+        Category.objects.all().delete()
+        self.assertFalse(Purchase.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
+
+    def update_product(self, item, shown, **changes):
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="x")
+        )
+        data = {
+            "name": item.name, "description": item.description,
+            "category": item.category_id, "quantity": shown,
+            "price": item.price, "vendor": Vendor.objects.create(
+                name="Acme"
+            ).pk,
+            "shown_quantity": shown,
+        }
+        data.update(changes)
+        return self.client.post(
+            reverse("product-update", args=[item.slug]), data
+        )
+
+    def test_product_form_keeps_concurrent_sales(self):
+        item = make_items(1, quantity=5)[0]
+        # Sold after the form was shown with 5, before it was submitted.
+        self.sell([item], quantity=2)
+        response = self.update_product(
+            item, shown=5, name="Renamed", quantity=8
+        )
+        self.assertRedirects(
+            response, "/products", fetch_redirect_response=False
+        )
+        item.refresh_from_db()
+        self.assertEqual((item.name, item.quantity), ("Renamed", 6))
+        self.assertEqual(
+            list(item.stock_movements.values_list(
+                "kind", "quantity", "note"
+            )),
+            [("A", 5, "Opening balance"), ("S", -2, ""),
+             ("A", 3, "Product form")],
+        )
+        self.assertFalse(ledger.drifted_items().exists())
+
+    def test_product_form_without_quantity_change(self):
+        item = make_items(1, quantity=5)[0]
+        self.sell([item], quantity=2)
+        self.update_product(item, shown=5, name="Renamed")
+        item.refresh_from_db()
+        self.assertEqual((item.name, item.quantity), ("Renamed", 3))
+        self.assertEqual(item.stock_movements.count(), 2)
+        self.assertFalse(ledger.drifted_items().exists())
+
+
+class DraftPurchaseTests(TestCase):
+
+    def test_draft_adds_stock_once_confirmed(self):
+        item = make_items(1, quantity=2)[0]
+        vendor = Vendor.objects.create(name="Acme")
+        purchase = Purchase.objects.create(
+            item=item, vendor=vendor, quantity=3, delivery_status=DRAFT
+        )
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+
+        purchase.delivery_status = "P"
+        purchase.save()
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 5)
+
+        purchase.delivery_status = DRAFT
+        purchase.save()
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+        self.assertEqual(
+            list(item.stock_movements.values_list("note", "quantity")),
+            [("Opening balance", 2), ("Draft confirmed", 3),
+             ("Turned back into a draft", -3)],
+        )
+
+
+class StockLotTests(TestCase):
+
+    def setUp(self):
+        self.item = make_items(1, quantity=2)[0]
+        self.vendor = Vendor.objects.create(name="Acme")
+        self.customer = Customer.objects.create(
+            first_name="Jane", last_name="Doe"
+        )
+
+    def buy(self, quantity, days, **kwargs):
+        return Purchase.objects.create(
+            item=self.item, vendor=self.vendor, quantity=quantity,
+            expiring_date=timezone.now() + timedelta(days=days), **kwargs
+        )
+
+    def sell(self, quantity):
+        commit_sale({
+            "customer": self.customer, "sub_total": 0, "grand_total": 0,
+            "amount_paid": 0, "amount_change": 0,
+        }, cart([self.item], quantity=quantity))
+
+    def remaining(self):
+        return list(
+            StockLot.objects.order_by(*lots.FEFO)
+            .values_list("purchase", "remaining")
+        )
+
+    def test_sales_take_lots_first_expired_first_out(self):
+        later = self.buy(3, days=10)
+        sooner = self.buy(4, days=5)
+        self.sell(5)
+        # The opening balance has no expiry and goes last.
+        self.assertEqual(
+            self.remaining(), [(sooner.pk, 0), (later.pk, 2), (None, 2)]
+        )
+        self.sell(3)
+        self.assertEqual(
+            self.remaining(), [(sooner.pk, 0), (later.pk, 0), (None, 1)]
+        )
+
+    def test_lot_follows_purchase(self):
+        purchase = self.buy(3, days=10)
+        purchase.quantity = 5
+        purchase.save()
+        purchase.lot.refresh_from_db()
+        self.assertEqual(purchase.lot.remaining, 5)
+
+        purchase.delivery_status = DRAFT
+        purchase.save()
+        purchase.lot.refresh_from_db()
+        self.assertEqual(
+            (purchase.lot.quantity, purchase.lot.remaining), (0, 0)
+        )
+
+    def test_expiring_lots(self):
+        sooner = self.buy(3, days=5)
+        self.buy(4, days=40)
+        self.assertEqual(list(lots.expiring(7)), [sooner.lot])
+
+        User.objects.create_user("admin", password="secret")
+        self.client.login(username="admin", password="secret")
+        widgets = self.client.get(reverse("dashboard")).context["widgets"]
+        self.assertEqual(widgets["expiring_lots"], [sooner.lot])
+        self.assertEqual(widgets["expiring_units"], 3)
+
+    def test_reconcile_trims_lots_to_stock(self):
+        self.buy(3, days=5)
+        ledger.record_movement(self.item, -4, ledger.ADJUSTMENT)
+        self.assertEqual(lots.reconcile(), {self.item.pk: 4})
+        self.assertEqual(
+            [remaining for _, remaining in self.remaining()], [0, 1]
+        )
+        self.assertEqual(lots.reconcile(), {})
+
+
+class ReplenishmentTests(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(first_name="Jane")
+        self.vendor = Vendor.objects.create(name="Acme")
+        self.fast, self.slow = make_items(2, quantity=10)
+        self.slow.vendor = self.vendor
+        self.slow.save()
+        purchase = Purchase.objects.create(
+            item=self.fast, vendor=self.vendor, quantity=5, price=4,
+            delivery_status="S",
+        )
+        now = timezone.now()
+        Purchase.objects.filter(pk=purchase.pk).update(
+            order_date=now - timedelta(days=10),
+            delivery_date=now - timedelta(days=6),
+        )
+        for item, quantity in ((self.fast, 14), (self.slow, 1)):
+            commit_sale({
+                "customer": self.customer, "sub_total": 0,
+                "grand_total": 0, "amount_paid": 0, "amount_change": 0,
+            }, cart([item], quantity=quantity))
+
+    def test_low_stock_items_are_drafted_once(self):
+        [suggestion] = replenishment.plan()
+        self.assertEqual(suggestion.item_id, self.fast.pk)
+        # No vendor on the item: the one it was last bought from.
+        self.assertEqual(suggestion.vendor_id, self.vendor.pk)
+        self.assertEqual(suggestion.on_hand, 1)
+        self.assertAlmostEqual(suggestion.lead_days, 4)
+        self.assertEqual(suggestion.reorder_point, 6)
+        self.assertEqual(suggestion.quantity, 7)
+
+        call_command("replenish", stdout=io.StringIO())
+        draft = Purchase.objects.get(delivery_status=DRAFT)
+        self.assertEqual(
+            (draft.item_id, draft.quantity, draft.total_value),
+            (self.fast.pk, 7, 28),
+        )
+        self.fast.refresh_from_db()
+        self.assertEqual(self.fast.quantity, 1)
+        self.assertEqual(replenishment.plan(), [])
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        self.jane = Customer.objects.create(first_name="Jane", phone="0711")
+        self.john = Customer.objects.create(first_name="John", phone="0722")
+        for customer, day, total in [
+            (self.jane, 2, 100), (self.john, 3, 50), (self.jane, 4, 75),
+        ]:
+            sale = Sale.objects.create(
+                customer=customer, sub_total=total, grand_total=total,
+                amount_paid=total, amount_change=0,
+            )
+            Sale.objects.filter(pk=sale.pk).update(
+                date_added=timezone.make_aware(datetime(2024, 1, day, 12))
+            )
+        item = make_items(1, quantity=0)[0]
+        vendor = Vendor.objects.create(name="Acme")
+        Purchase.objects.create(
+            item=item, vendor=vendor, quantity=4, price=3,
+            delivery_status="S",
+        )
+
+    def export(self, name, querystring=""):
+        return self.client.get(f"{reverse(name)}?{querystring}")
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(body)))
+
+    def test_sales_default_to_xlsx(self):
+        response = self.export("sales-export")
+        body = b"".join(response.streaming_content)
+        worksheet = load_workbook(io.BytesIO(body), read_only=True).active
+        rows = list(worksheet.iter_rows(values_only=True))
+        self.assertEqual(worksheet.title, "Sales")
+        self.assertEqual(list(rows[0]), SaleExport().headers)
+        self.assertEqual(
+            [(row[1], row[2], row[4]) for row in rows[1:]],
+            [(datetime(2024, 1, day, 12), phone, total)
+             for day, phone, total in [
+                 (2, "0711", 100), (3, "0722", 50), (4, "0711", 75),
+             ]],
+        )
+
+    def test_sales_csv_filters(self):
+        rows = self.read_csv(self.export(
+            "sales-export", f"format=csv&customer={self.jane.pk}"
+            "&start=2024-01-03&end=2024-01-04"
+        ))
+        self.assertEqual(rows[0], SaleExport().headers)
+        self.assertEqual([row[2] for row in rows[1:]], ["0711"])
+        self.assertEqual(rows[1][4], "75.00")
+
+    def test_purchases_csv(self):
+        rows = self.read_csv(self.export(
+            "purchases-export", "format=csv&delivery_status=S"
+        ))
+        self.assertEqual(rows[0], PurchaseExport().headers)
+        self.assertEqual([row[1] for row in rows[1:]], ["Item 0"])
+        self.assertEqual(rows[1][7:], ["Successful", "3.00", "12.00"])
+
+    def test_rejects_bad_parameters(self):
+        for name, querystring in [
+            ("sales-export", "format=pdf"),
+            ("sales-export", "start=01/02/2024"),
+            ("sales-export", "format=csv&customer=jane"),
+            ("purchases-export", "end=2024-13-01"),
+        ]:
+            with self.subTest(name=name, querystring=querystring):
+                response = self.export(name, querystring)
+                self.assertEqual(response.status_code, 400)
+
+
+class TransactionsQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user("clerk", password="secret")
+        self.client.force_login(user)
+        self.items = make_items(1, quantity=0)
+        self.serial = 0
+
+    def add_sales(self, count):
+        for _ in range(count):
+            self.serial += 1
+            Sale.objects.create(customer=Customer.objects.create(
+                first_name=f"Customer {self.serial}", last_name="Doe"
+            ))
+
+    def add_purchases(self, count):
+        for _ in range(count):
+            self.serial += 1
+            Purchase.objects.create(
+                item=make_items(1, quantity=0)[0],
+                vendor=Vendor.objects.create(name=f"V{self.serial}"),
+                quantity=1, price=10, total_value=10,
+            )
+
+    def test_sale_list(self):
+        self.assertQueryBudget(reverse("saleslist"), self.add_sales, 6)
+
+    def test_sale_detail(self):
+        sale = Sale.objects.create(customer=Customer.objects.create(
+            first_name="Jane", last_name="Doe"
+        ))
+
+        def add_details(count):
+            SaleDetail.objects.bulk_create([
+                SaleDetail(sale=sale, item=self.items[0], price=10,
+                           quantity=1, total_detail=10)
+                for _ in range(count)
+            ])
+
+        self.assertQueryBudget(
+            reverse("sale-detail", args=[sale.pk]), add_details, 4
+        )
+
+    def test_purchase_list(self):
+        self.assertQueryBudget(
+            reverse("purchaseslist"), self.add_purchases, 6
+        )
+
+
+class ConcurrentSaleTests(TransactionTestCase):
+
+    def test_parallel_sales_never_oversell(self):
+        stock, cashiers = 5, 12
+        item = make_items(1, quantity=stock)[0]
+        customer = Customer.objects.create(first_name="Jane", last_name="Doe")
+        barrier = threading.Barrier(cashiers)
+        outcomes = []
+
+        def sell():
+            barrier.wait()
+            try:
+                # Retry like a till would when the database is busy
+                # (SQLite reports table locks instead of waiting).
+                for _ in range(200):
+                    try:
+                        commit_sale(
+                            {"customer": customer, "sub_total": 10,
+                             "grand_total": 10, "amount_paid": 10,
+                             "amount_change": 0},
+                            cart([item]),
+                        )
+                        outcomes.append("sold")
+                        return
+                    except OperationalError:
+                        time.sleep(0.01)
+                    except InsufficientStock:
+                        outcomes.append("short")
+                        return
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sell) for _ in range(cashiers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        item.refresh_from_db()
+        self.assertEqual(outcomes.count("sold"), stock)
+        self.assertEqual(outcomes.count("short"), cashiers - stock)
+        self.assertEqual(item.quantity, 0)
+        self.assertEqual(SaleDetail.objects.count(), stock)
+        self.assertEqual(Sale.objects.count(), stock)
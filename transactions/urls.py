@@ -1,7 +1,5 @@
 # Django core imports
 from django.urls import path
-from django.conf import settings
-from django.conf.urls.static import static
 
 # Local app imports
 from .views import (
@@ -54,6 +52,3 @@ urlpatterns = [
     path('purchases/export/', export_purchases_to_excel,
          name='purchases-export'),
 ]
-
-# Static media files configuration for development
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
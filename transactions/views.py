@@ -3,26 +3,28 @@ import json
 import logging
 
 # Django core imports
-from django.http import JsonResponse, HttpResponse
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
 from django.urls import reverse
 from django.shortcuts import render
-from django.db import transaction
 
 # Class-based views
 from django.views.generic import DetailView, ListView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 
 # Authentication and permissions
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 
-# Third-party packages
-from openpyxl import Workbook
-
 # Local app imports
+from store.exports import XLSX
+from store.pagination import CursorPaginationMixin
 from store.models import Item
 from accounts.models import Customer
-from .models import Sale, Purchase, SaleDetail
+from .models import Sale, Purchase
+from .exports import SaleExport, PurchaseExport
 from .forms import PurchaseForm
+from .services import commit_sale
 
 
 logger = logging.getLogger(__name__)
@@ -32,117 +34,38 @@ def is_ajax(request):
     return request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
 
 
+@login_required
 def export_sales_to_excel(request):
-    # Create a workbook and select the active worksheet.
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = 'Sales'
-
-    # Define the column headers
-    columns = [
-        'ID', 'Date', 'Customer', 'Sub Total',
-        'Grand Total', 'Tax Amount', 'Tax Percentage',
-        'Amount Paid', 'Amount Change'
-    ]
-    worksheet.append(columns)
-
-    # Fetch sales data
-    sales = Sale.objects.all()
-
-    for sale in sales:
-        # Convert timezone-aware datetime to naive datetime
-        if sale.date_added.tzinfo is not None:
-            date_added = sale.date_added.replace(tzinfo=None)
-        else:
-            date_added = sale.date_added
-
-        worksheet.append([
-            sale.id,
-            date_added,
-            sale.customer.phone,
-            sale.sub_total,
-            sale.grand_total,
-            sale.tax_amount,
-            sale.tax_percentage,
-            sale.amount_paid,
-            sale.amount_change
-        ])
-
-    # Set up the response to send the file
-    response = HttpResponse(
-        content_type=(
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-    )
-    response['Content-Disposition'] = 'attachment; filename=sales.xlsx'
-    workbook.save(response)
-
-    return response
+    """
+    Stream the sales matching the request's date range and filters as
+    XLSX (or CSV with ``?format=csv``).
+    """
+    export_format = request.GET.get('format', XLSX)
+    return SaleExport(request.GET).response(export_format)
 
 
+@login_required
 def export_purchases_to_excel(request):
-    # Create a workbook and select the active worksheet.
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = 'Purchases'
-
-    # Define the column headers
-    columns = [
-        'ID', 'Item', 'Description', 'Vendor', 'Order Date',
-        'Delivery Date', 'Quantity', 'Delivery Status',
-        'Price per item (Ksh)', 'Total Value'
-    ]
-    worksheet.append(columns)
-
-    # Fetch purchases data
-    purchases = Purchase.objects.all()
-
-    for purchase in purchases:
-        # Convert timezone-aware datetime to naive datetime
-        delivery_tzinfo = purchase.delivery_date.tzinfo
-        order_tzinfo = purchase.order_date.tzinfo
-
-        if delivery_tzinfo or order_tzinfo is not None:
-            delivery_date = purchase.delivery_date.replace(tzinfo=None)
-            order_date = purchase.order_date.replace(tzinfo=None)
-        else:
-            delivery_date = purchase.delivery_date
-            order_date = purchase.order_date
-        worksheet.append([
-            purchase.id,
-            purchase.item.name,
-            purchase.description,
-            purchase.vendor.name,
-            order_date,
-            delivery_date,
-            purchase.quantity,
-            purchase.get_delivery_status_display(),
-            purchase.price,
-            purchase.total_value
-        ])
-
-    # Set up the response to send the file
-    response = HttpResponse(
-        content_type=(
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-    )
-    response['Content-Disposition'] = 'attachment; filename=purchases.xlsx'
-    workbook.save(response)
-
-    return response
+    """
+    Stream the purchases matching the request's date range and filters as
+    XLSX (or CSV with ``?format=csv``).
+    """
+    export_format = request.GET.get('format', XLSX)
+    return PurchaseExport(request.GET).response(export_format)
 
 
-class SaleListView(LoginRequiredMixin, ListView):
+class SaleListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """
     View to list all sales with pagination.
     """
 
     model = Sale
+    queryset = Sale.objects.select_related("customer")
     template_name = "transactions/sales_list.html"
     context_object_name = "sales"
     paginate_by = 10
-    ordering = ['date_added']
+    cursor_ordering = ("date_added", "id")
+    paginate_count = True
 
 
 class SaleDetailView(LoginRequiredMixin, DetailView):
@@ -151,13 +74,19 @@ class SaleDetailView(LoginRequiredMixin, DetailView):
     """
 
     model = Sale
+    queryset = Sale.objects.select_related("customer")
     template_name = "transactions/saledetail.html"
 
 
-def SaleCreateView(request):
+async def SaleCreateView(request):
+    """
+    Renders the sale screen and records the sales it posts.
+
+    The sale is committed in ``commit_sale``'s transaction on a worker
+    thread, since transactions cannot span async code.
+    """
     context = {
         "active_icon": "sales",
-        "customers": [c.to_select2() for c in Customer.objects.all()]
     }
 
     if request.method == 'POST':
@@ -178,7 +107,9 @@ def SaleCreateView(request):
 
                 # Create sale attributes
                 sale_attributes = {
-                    "customer": Customer.objects.get(id=int(data['customer'])),
+                    "customer": await Customer.objects.aget(
+                        id=int(data['customer'])
+                    ),
                     "sub_total": float(data["sub_total"]),
                     "grand_total": float(data["grand_total"]),
                     "tax_amount": float(data.get("tax_amount", 0.0)),
@@ -187,42 +118,10 @@ def SaleCreateView(request):
                     "amount_change": float(data["amount_change"]),
                 }
 
-                # Use a transaction to ensure atomicity
-                with transaction.atomic():
-                    # Create the sale
-                    new_sale = Sale.objects.create(**sale_attributes)
-                    logger.info(f"Sale created: {new_sale}")
-
-                    # Create sale details and update item quantities
-                    items = data["items"]
-                    if not isinstance(items, list):
-                        raise ValueError("Items should be a list")
-
-                    for item in items:
-                        if not all(
-                            k in item for k in [
-                                "id", "price", "quantity", "total_item"
-                            ]
-                        ):
-                            raise ValueError("Item is missing required fields")
-
-                        item_instance = Item.objects.get(id=int(item["id"]))
-                        if item_instance.quantity < int(item["quantity"]):
-                            raise ValueError(f"Not enough stock for item: {item_instance.name}")
-
-                        detail_attributes = {
-                            "sale": new_sale,
-                            "item": item_instance,
-                            "price": float(item["price"]),
-                            "quantity": int(item["quantity"]),
-                            "total_detail": float(item["total_item"])
-                        }
-                        SaleDetail.objects.create(**detail_attributes)
-                        logger.info(f"Sale detail created: {detail_attributes}")
-
-                        # Reduce item quantity
-                        item_instance.quantity -= int(item["quantity"])
-                        item_instance.save()
+                new_sale = await sync_to_async(commit_sale)(
+                    sale_attributes, data["items"]
+                )
+                logger.info(f"Sale created: {new_sale}")
 
                 return JsonResponse(
                     {
@@ -268,7 +167,9 @@ def SaleCreateView(request):
                         )
                     }, status=500)
 
-    return render(request, "transactions/sale_create.html", context=context)
+    return await sync_to_async(render)(
+        request, "transactions/sale_create.html", context=context
+    )
 
 
 class SaleDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
@@ -292,15 +193,18 @@ class SaleDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return self.request.user.is_superuser
 
 
-class PurchaseListView(LoginRequiredMixin, ListView):
+class PurchaseListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """
     View to list all purchases with pagination.
     """
 
     model = Purchase
+    queryset = Purchase.objects.select_related("item", "vendor")
     template_name = "transactions/purchases_list.html"
     context_object_name = "purchases"
     paginate_by = 10
+    cursor_ordering = ("order_date", "id")
+    paginate_count = True
 
 
 class PurchaseDetailView(LoginRequiredMixin, DetailView):
@@ -309,6 +213,7 @@ class PurchaseDetailView(LoginRequiredMixin, DetailView):
     """
 
     model = Purchase
+    queryset = Purchase.objects.select_related("item", "vendor")
     template_name = "transactions/purchasedetail.html"
 
 